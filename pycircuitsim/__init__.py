@@ -1,2 +1 @@
-
-print("test")
+__version__ = "0.0.1"
@@ -0,0 +1,477 @@
+"""
+Instruction level CDP1802 model.
+
+CDP1802Core keeps the registers in plain ints and executes whole
+instructions through a 256 entry dispatch table, one handler per opcode.
+Handlers take the cpu and the low nibble N of the opcode; the fetch (and
+the R(P) increment) is done by the run loop before calling them.
+
+Timing: every instruction takes 2 machine cycles (fetch and execute),
+except the long branches and long skips (0xC0-0xCF) which take 3. CYCLES
+is shared with the gate-level CDP1802.step, so both models count the same
+machine cycles for the same program.
+
+source: http://bitsavers.trailing-edge.com/components/rca/cosmac/MPM-201A_User_Manual_for_the_CDP1802_COSMAC_Microprocessor_1976.pdf
+"""
+from typing import List, Dict, Any, Callable, Optional, Sequence
+
+
+CYCLES = [3 if 0xC0 <= opcode <= 0xCF else 2 for opcode in range(256)]
+
+# the 8 bit and flag registers, besides R0-RF
+REGISTERS = ['D', 'DF', 'P', 'X', 'N', 'I', 'T', 'Q', 'IE', 'A']
+
+
+def copy_memory(source: Sequence[int], destination) -> None:
+	""" copy a memory image into destination, raise ValueError if the
+	part that does not fit is not all zeros """
+	size = min(len(source), len(destination))
+	if any(source[size:]):
+		raise ValueError(f"memory image of {len(source)} bytes does not fit in {len(destination)} bytes")
+	destination[:size] = source[:size]
+
+
+class CDP1802Core:
+	"""CDP1802 executing whole instructions over a byte memory.
+	on_output(port, value) is called by OUT 1-7, on_input(port) by INP 1-7
+	(reading 0 when it is None). EF holds the four EF input flags."""
+	__slots__ = ('R', 'D', 'DF', 'P', 'X', 'N', 'I', 'T', 'Q', 'IE', 'A', 'EF',
+		'memory', 'cycles', 'instructions', 'idle', 'on_output', 'on_input')
+
+	def __init__(self, memory=None, memory_size: int = 0x10000):
+		self.memory = bytearray(memory_size) if memory is None else memory
+		self.on_output: Optional[Callable[[int, int], None]] = None
+		self.on_input: Optional[Callable[[int], int]] = None
+		self.reset()
+
+	def reset(self) -> None:
+		""" the state after a reset: I, N, Q, X, P and R0 cleared, interrupts enabled """
+		self.R: List[int] = [0] * 16
+		self.D = 0
+		self.DF = 0
+		self.P = 0
+		self.X = 0
+		self.N = 0
+		self.I = 0
+		self.T = 0
+		self.Q = 0
+		self.IE = 1
+		self.A = 0  # address of the last fetch
+		self.EF = [False] * 4
+		self.cycles = 0
+		self.instructions = 0
+		self.idle = False
+
+	def load(self, program: Sequence[int], address: int = 0) -> None:
+		""" copy program bytes to memory starting from address """
+		self.memory[address:address + len(program)] = bytes(program)
+
+	def export_state(self) -> Dict[str, Any]:
+		""" return the registers, flags, counters and a memory image """
+		state = {name: getattr(self, name) for name in REGISTERS}
+		state.update(R=list(self.R), EF=list(self.EF), memory=bytes(self.memory),
+			cycles=self.cycles, instructions=self.instructions, idle=self.idle)
+		return state
+
+	def import_state(self, state: Dict[str, Any]) -> None:
+		""" load a state returned by export_state of either CDP1802 model """
+		for name in REGISTERS:
+			setattr(self, name, int(state[name]))
+		self.R[:] = [int(value) for value in state['R']]
+		self.EF[:] = state['EF']
+		copy_memory(state['memory'], self.memory)
+		self.cycles = state['cycles']
+		self.instructions = state['instructions']
+		self.idle = state['idle']
+
+	def interrupt(self) -> bool:
+		""" raise an interrupt: if IE is set, save X,P in T and jump to R1
+		with X=2. Return True if the interrupt was taken """
+		if not self.IE:
+			return False
+		self.T = self.X << 4 | self.P
+		self.P = 1
+		self.X = 2
+		self.IE = 0
+		self.idle = False
+		return True
+
+	def step(self) -> int:
+		""" execute one instruction, return its machine cycles """
+		R = self.R
+		p = self.P
+		address = R[p]
+		opcode = self.memory[address]
+		R[p] = (address + 1) & 0xFFFF
+		self.A = address
+		self.I = opcode >> 4
+		self.N = opcode & 0xF
+		DISPATCH[opcode](self, opcode & 0xF)
+		self.instructions += 1
+		self.cycles += CYCLES[opcode]
+		return CYCLES[opcode]
+
+	def run(self, max_instructions: int) -> int:
+		""" execute up to max_instructions instructions, stopping at IDL.
+		Return the number of instructions executed """
+		R = self.R
+		memory = self.memory
+		dispatch = DISPATCH
+		cycles = CYCLES
+		count = 0
+		elapsed = 0
+		while count < max_instructions and not self.idle:
+			p = self.P
+			address = R[p]
+			opcode = memory[address]
+			R[p] = (address + 1) & 0xFFFF
+			dispatch[opcode](self, opcode & 0xF)
+			elapsed += cycles[opcode]
+			count += 1
+		if count:
+			self.A = address
+			self.I = opcode >> 4
+			self.N = opcode & 0xF
+		self.instructions += count
+		self.cycles += elapsed
+		return count
+
+
+# memory reference
+
+def _idl(cpu, n):
+	cpu.idle = True
+
+
+def _ldn(cpu, n):
+	cpu.D = cpu.memory[cpu.R[n]]
+
+
+def _inc(cpu, n):
+	cpu.R[n] = (cpu.R[n] + 1) & 0xFFFF
+
+
+def _dec(cpu, n):
+	cpu.R[n] = (cpu.R[n] - 1) & 0xFFFF
+
+
+def _lda(cpu, n):
+	R = cpu.R
+	cpu.D = cpu.memory[R[n]]
+	R[n] = (R[n] + 1) & 0xFFFF
+
+
+def _str(cpu, n):
+	cpu.memory[cpu.R[n]] = cpu.D
+
+
+def _irx(cpu, n):
+	cpu.R[cpu.X] = (cpu.R[cpu.X] + 1) & 0xFFFF
+
+
+def _ldxa(cpu, n):
+	R = cpu.R
+	x = cpu.X
+	cpu.D = cpu.memory[R[x]]
+	R[x] = (R[x] + 1) & 0xFFFF
+
+
+def _stxd(cpu, n):
+	R = cpu.R
+	x = cpu.X
+	cpu.memory[R[x]] = cpu.D
+	R[x] = (R[x] - 1) & 0xFFFF
+
+
+def _ldx(cpu, n):
+	cpu.D = cpu.memory[cpu.R[cpu.X]]
+
+
+def _ldi(cpu, n):
+	R = cpu.R
+	p = cpu.P
+	cpu.D = cpu.memory[R[p]]
+	R[p] = (R[p] + 1) & 0xFFFF
+
+
+# register operations
+
+def _glo(cpu, n):
+	cpu.D = cpu.R[n] & 0xFF
+
+
+def _ghi(cpu, n):
+	cpu.D = cpu.R[n] >> 8
+
+
+def _plo(cpu, n):
+	cpu.R[n] = (cpu.R[n] & 0xFF00) | cpu.D
+
+
+def _phi(cpu, n):
+	cpu.R[n] = (cpu.R[n] & 0x00FF) | cpu.D << 8
+
+
+def _sep(cpu, n):
+	cpu.P = n
+
+
+def _sex(cpu, n):
+	cpu.X = n
+
+
+# input/output and control
+
+def _out(cpu, n):
+	R = cpu.R
+	x = cpu.X
+	value = cpu.memory[R[x]]
+	R[x] = (R[x] + 1) & 0xFFFF
+	if cpu.on_output is not None:
+		cpu.on_output(n, value)
+
+
+def _inp(cpu, n):
+	value = 0 if cpu.on_input is None else cpu.on_input(n - 8) & 0xFF
+	cpu.memory[cpu.R[cpu.X]] = value
+	cpu.D = value
+
+
+def _nop(cpu, n):
+	pass
+
+
+def _return(enable: int):
+	def ret(cpu, n):
+		R = cpu.R
+		x = cpu.X
+		value = cpu.memory[R[x]]
+		R[x] = (R[x] + 1) & 0xFFFF
+		cpu.X = value >> 4
+		cpu.P = value & 0xF
+		cpu.IE = enable
+	return ret
+
+
+def _sav(cpu, n):
+	cpu.memory[cpu.R[cpu.X]] = cpu.T
+
+
+def _mark(cpu, n):
+	cpu.T = cpu.X << 4 | cpu.P
+	cpu.memory[cpu.R[2]] = cpu.T
+	cpu.X = cpu.P
+	cpu.R[2] = (cpu.R[2] - 1) & 0xFFFF
+
+
+def _req(cpu, n):
+	cpu.Q = 0
+
+
+def _seq(cpu, n):
+	cpu.Q = 1
+
+
+# arithmetic and logic. Subtraction adds the complement: DF is 1 when
+# there is no borrow
+
+def _immediate(cpu) -> int:
+	R = cpu.R
+	p = cpu.P
+	value = cpu.memory[R[p]]
+	R[p] = (R[p] + 1) & 0xFFFF
+	return value
+
+
+def _alu(op: Callable[[object, int], None], immediate: bool):
+	if immediate:
+		def run(cpu, n):
+			op(cpu, _immediate(cpu))
+	else:
+		def run(cpu, n):
+			op(cpu, cpu.memory[cpu.R[cpu.X]])
+	return run
+
+
+def _or(cpu, m):
+	cpu.D |= m
+
+
+def _and(cpu, m):
+	cpu.D &= m
+
+
+def _xor(cpu, m):
+	cpu.D ^= m
+
+
+def _add(cpu, m):
+	result = cpu.D + m
+	cpu.D = result & 0xFF
+	cpu.DF = result >> 8
+
+
+def _adc(cpu, m):
+	result = cpu.D + m + cpu.DF
+	cpu.D = result & 0xFF
+	cpu.DF = result >> 8
+
+
+def _sd(cpu, m):
+	result = m + (cpu.D ^ 0xFF) + 1
+	cpu.D = result & 0xFF
+	cpu.DF = result >> 8
+
+
+def _sdb(cpu, m):
+	result = m + (cpu.D ^ 0xFF) + cpu.DF
+	cpu.D = result & 0xFF
+	cpu.DF = result >> 8
+
+
+def _sm(cpu, m):
+	result = cpu.D + (m ^ 0xFF) + 1
+	cpu.D = result & 0xFF
+	cpu.DF = result >> 8
+
+
+def _smb(cpu, m):
+	result = cpu.D + (m ^ 0xFF) + cpu.DF
+	cpu.D = result & 0xFF
+	cpu.DF = result >> 8
+
+
+def _shr(cpu, n):
+	cpu.DF = cpu.D & 1
+	cpu.D >>= 1
+
+
+def _shrc(cpu, n):
+	d = cpu.D
+	cpu.D = d >> 1 | cpu.DF << 7
+	cpu.DF = d & 1
+
+
+def _shl(cpu, n):
+	d = cpu.D << 1
+	cpu.D = d & 0xFF
+	cpu.DF = d >> 8
+
+
+def _shlc(cpu, n):
+	d = cpu.D << 1 | cpu.DF
+	cpu.D = d & 0xFF
+	cpu.DF = d >> 8
+
+
+# branches: the condition is selected by the low 3 bits of N, N >= 8
+# negates it (so 0x38 and 0xC8, "never branch", are the skips)
+
+_SHORT_CONDITIONS = [
+	lambda cpu: True,
+	lambda cpu: cpu.Q,
+	lambda cpu: cpu.D == 0,
+	lambda cpu: cpu.DF,
+	lambda cpu: cpu.EF[0],
+	lambda cpu: cpu.EF[1],
+	lambda cpu: cpu.EF[2],
+	lambda cpu: cpu.EF[3],
+]
+
+
+def _short_branch(condition, negate: bool):
+	def branch(cpu, n):
+		R = cpu.R
+		p = cpu.P
+		address = R[p]
+		if bool(condition(cpu)) != negate:
+			R[p] = (address & 0xFF00) | cpu.memory[address]
+		else:
+			R[p] = (address + 1) & 0xFFFF
+	return branch
+
+
+def _long_branch(condition, negate: bool):
+	def branch(cpu, n):
+		R = cpu.R
+		p = cpu.P
+		address = R[p]
+		if bool(condition(cpu)) != negate:
+			memory = cpu.memory
+			R[p] = memory[address] << 8 | memory[(address + 1) & 0xFFFF]
+		else:
+			R[p] = (address + 2) & 0xFFFF
+	return branch
+
+
+def _long_skip(condition):
+	def skip(cpu, n):
+		if condition(cpu):
+			R = cpu.R
+			R[cpu.P] = (R[cpu.P] + 2) & 0xFFFF
+	return skip
+
+
+def _build_dispatch() -> List[Callable]:
+	table: List[Callable] = [_nop] * 256
+	for n in range(16):
+		table[0x00 + n] = _ldn
+		table[0x10 + n] = _inc
+		table[0x20 + n] = _dec
+		table[0x30 + n] = _short_branch(_SHORT_CONDITIONS[n & 7], n >= 8)
+		table[0x40 + n] = _lda
+		table[0x50 + n] = _str
+		table[0x80 + n] = _glo
+		table[0x90 + n] = _ghi
+		table[0xA0 + n] = _plo
+		table[0xB0 + n] = _phi
+		table[0xD0 + n] = _sep
+		table[0xE0 + n] = _sex
+	table[0x00] = _idl
+
+	table[0x60] = _irx
+	for n in range(1, 8):
+		table[0x60 + n] = _out
+		table[0x68 + n] = _inp
+	table[0x68] = _nop  # not an 1802 instruction
+	table[0x70] = _return(1)  # RET
+	table[0x71] = _return(0)  # DIS
+	table[0x72] = _ldxa
+	table[0x73] = _stxd
+	table[0x74] = _alu(_adc, False)
+	table[0x75] = _alu(_sdb, False)
+	table[0x76] = _shrc
+	table[0x77] = _alu(_smb, False)
+	table[0x78] = _sav
+	table[0x79] = _mark
+	table[0x7A] = _req
+	table[0x7B] = _seq
+	table[0x7C] = _alu(_adc, True)
+	table[0x7D] = _alu(_sdb, True)
+	table[0x7E] = _shlc
+	table[0x7F] = _alu(_smb, True)
+
+	long_conditions = _SHORT_CONDITIONS[:4]
+	for n in range(4):
+		table[0xC0 + n] = _long_branch(long_conditions[n], False)
+		table[0xC8 + n] = _long_branch(long_conditions[n], True)
+	table[0xC4] = _nop
+	table[0xC5] = _long_skip(lambda cpu: not cpu.Q)  # LSNQ
+	table[0xC6] = _long_skip(lambda cpu: cpu.D != 0)  # LSNZ
+	table[0xC7] = _long_skip(lambda cpu: not cpu.DF)  # LSNF
+	table[0xCC] = _long_skip(lambda cpu: cpu.IE)  # LSIE
+	table[0xCD] = _long_skip(lambda cpu: cpu.Q)  # LSQ
+	table[0xCE] = _long_skip(lambda cpu: cpu.D == 0)  # LSZ
+	table[0xCF] = _long_skip(lambda cpu: cpu.DF)  # LSDF
+
+	table[0xF0] = _ldx
+	table[0xF8] = _ldi
+	for low, op in [(1, _or), (2, _and), (3, _xor), (4, _add), (5, _sd), (7, _sm)]:
+		table[0xF0 + low] = _alu(op, False)
+		table[0xF8 + low] = _alu(op, True)
+	table[0xF6] = _shr
+	table[0xFE] = _shl
+	return table
+
+
+DISPATCH = _build_dispatch()
@@ -1,8 +1,42 @@
 
 
+from typing import Dict, Any
+
 from ..core.chip import ClockedChip
-from ..hardware.memory import Register, RAM
+from ..hardware.memory import RegisterFile, RAM
 from ..hardware.clock import Clock
+from .cdp1802core import CDP1802Core, CYCLES, DISPATCH, REGISTERS, copy_memory
+
+
+class _MemoryBus:
+	"""Memory accesses of an instruction, routed through the mem part of a CDP1802"""
+	__slots__ = ('chip',)
+
+	def __init__(self, chip):
+		self.chip = chip
+
+	def __getitem__(self, address):
+		mem = self.chip.parts['mem']
+		mem.set_pin('address', address)
+		mem.set_pin('load', False)
+		self.chip.propagate_tick('mem')
+		return mem.pin('out')
+
+	def __setitem__(self, address, value):
+		mem = self.chip.parts['mem']
+		mem.set_pin('address', address)
+		mem.set_pin('in', value)
+		mem.set_pin('load', True)
+		self.chip.propagate_tick('mem')
+		mem.set_pin('load', False)
+
+
+# registers of the CDP1802 besides N, I, P, X, A and R0-R15
+_STATE_REGISTERS = ['D', 'DF', 'T', 'Q', 'IE']
+
+# position of the registers besides R0-R15 in the S register file, and their widths
+_SCRATCH = {name: pos for pos, name in enumerate(REGISTERS)}
+_WIDTHS = {'D': 8, 'DF': 1, 'P': 4, 'X': 4, 'N': 4, 'I': 4, 'T': 8, 'Q': 1, 'IE': 1, 'A': 16}
 
 class CDP1802(ClockedChip):
 	""" CDP1802 implementation 
@@ -10,24 +44,28 @@ class CDP1802(ClockedChip):
 	source: http://bitsavers.trailing-edge.com/components/rca/cosmac/MPM-201A_User_Manual_for_the_CDP1802_COSMAC_Microprocessor_1976.pdf
 
 	"""
-	def __init__(self, input_pins, output_pins):
-		super().__init__(input_pins, output_pins)
-		self.add_part("N", Register(4))
-		self.add_part("I", Register(4))
-		self.add_part("P", Register(4))
-		self.add_part("X", Register(4))
-
-		self.add_part("A", Register(16))
+	__slots__ = ('R', 'S', 'mpc', 'cycles', 'instructions', 'EF', 'idle', 'core')
+	state_slots = ('mpc', 'cycles', 'instructions', 'EF', 'idle')
 
-		self.R = []
-		for i in range(16):
-			r = Register(16)
-			self.add_part(f"R{i}", r)
-			self.R.append(r)
-
-		self.add_part("mem", RAM(100))
+	def __init__(self, input_pins, output_pins, memory_size: int = 100):
+		super().__init__(input_pins, output_pins)
+		# N, I, P, X, A, D, DF, T, Q and IE
+		self.S = RegisterFile(len(REGISTERS), [_WIDTHS[name] for name in REGISTERS])
+		self.add_part("S", self.S)
+		# R0-R15
+		self.R = RegisterFile(16, 16)
+		self.add_part("R", self.R)
+
+		self.add_part("mem", RAM(memory_size, word_bits=8))
 		self.mpc = 0
 
+		self.cycles = 0  # machine cycles executed by step()
+		self.instructions = 0
+		self.EF = [False] * 4
+		self.idle = False
+		# runs the instruction handlers of step() over the parts
+		self.core = CDP1802Core(memory=_MemoryBus(self))
+
 
 	def connect_to_clock(self, clock: Clock):
 		clock.subscribe_to_tick(self)
@@ -36,64 +74,148 @@ class CDP1802(ClockedChip):
 		pass
 
 	def on_tick(self, params=None):
-		self.propagate_tick('N')
-		self.propagate_tick('P')
-		self.propagate_tick('X')
-		self.propagate_tick('I')
-		self.propagate_tick('A')
-		for i in range(16):
-			self.propagate_tick(f"R{i}")
+		self.propagate_tick('S')
+		self.propagate_tick('R')
 
 	def boot(self):
-		self.parts['N'].set_value(0)
-		self.parts['I'].set_value(0)
-		self.parts['P'].set_value(0)
-		self.parts['X'].set_value(0)
-		self.parts['A'].set_value(0)
+		for name in ['N', 'I', 'P', 'X', 'A'] + _STATE_REGISTERS:
+			self.set_register(name, 1 if name == 'IE' else 0)
+
+	def register(self, name: str) -> int:
+		""" value of one of the REGISTERS """
+		return self.S.get_value(_SCRATCH[name])
+
+	def set_register(self, name: str, value: int) -> None:
+		""" load value into one of the REGISTERS on the next tick """
+		self.S.set_value(_SCRATCH[name], value)
 
 	@property
 	def N(self) -> int:
-		return self.pin("N.out")
+		return self.register('N')
 
 	@N.setter
 	def N(self, v):
-		self.parts['N'].set_value(v)
+		self.set_register('N', v)
 
 	@property
 	def I(self) -> int:
-		return self.pin("I.out")
+		return self.register('I')
 
 	@I.setter
 	def I(self, v):
-		self.parts['I'].set_value(v)
+		self.set_register('I', v)
 
 	@property
 	def P(self) -> int:
-		return self.pin("P.out")
+		return self.register('P')
 
 	@P.setter
 	def P(self, v):
-		self.parts['P'].set_value(v)
+		self.set_register('P', v)
 
 	@property
 	def A(self) -> int:
-		return self.pin("A.out")
+		return self.register('A')
 
 	@A.setter
 	def A(self, v):
-		self.parts['A'].set_value(v)
+		self.set_register('A', v)
+
+	@property
+	def on_output(self):
+		""" called with (port, value) by OUT 1-7, see CDP1802Core """
+		return self.core.on_output
+
+	@on_output.setter
+	def on_output(self, hook):
+		self.core.on_output = hook
+
+	@property
+	def on_input(self):
+		""" called with port by INP 1-7, see CDP1802Core """
+		return self.core.on_input
+
+	@on_input.setter
+	def on_input(self, hook):
+		self.core.on_input = hook
 
 	def getR(self, n):
-		return self.R[n].get_value()
+		return self.R.get_value(n)
 
 	def setR(self, n,v):
-		return self.R[n].set_value(v)
+		return self.R.set_value(n, v)
+
+	def _load_register(self, name: str, value: int) -> None:
+		self.set_register(name, value)
+		self.propagate_tick('S')
+
+	def step(self) -> int:
+		""" fetch and execute one instruction through the register and memory
+		parts, return its machine cycles. Instructions are executed by the
+		CDP1802Core handlers of self.core over the part values: both models
+		read their cycles from the shared cdp1802core.CYCLES table, so the
+		counts match by construction and are not checked against each
+		other """
+		cpu = self.core
+		bus = cpu.memory
+		p = self.P
+		self._load_register('A', self.getR(p))
+		opcode = bus[self.A]
+		self.setR(p, (self.A + 1) & 0xFFFF)
+		self.propagate_tick('R')
+		self.set_register('I', opcode >> 4)
+		self.set_register('N', opcode & 0xF)
+		self.propagate_tick('S')
+
+		cpu.R[:] = [int(value) for value in self.R.values()]
+		for name in ['P', 'X', 'N', 'I'] + _STATE_REGISTERS:
+			setattr(cpu, name, int(self.register(name)))
+		cpu.EF = self.EF
+		cpu.idle = False
+		DISPATCH[opcode](cpu, opcode & 0xF)
+
+		for i, value in enumerate(cpu.R):
+			if value != self.getR(i):
+				self.setR(i, value)
+		self.propagate_tick('R')
+		for name in ['P', 'X'] + _STATE_REGISTERS:
+			if getattr(cpu, name) != self.register(name):
+				self.set_register(name, getattr(cpu, name))
+		self.propagate_tick('S')
+		self.idle = cpu.idle
+		self.instructions += 1
+		self.cycles += CYCLES[opcode]
+		return CYCLES[opcode]
+
+	def export_state(self) -> Dict[str, Any]:
+		""" return the register part values, flags, counters and a memory
+		image, in the format of CDP1802Core.export_state """
+		state = {name: int(self.register(name)) for name in REGISTERS}
+		state.update(R=[int(value) for value in self.R.values()], EF=list(self.EF),
+			memory=bytes(self.parts['mem'].data), cycles=self.cycles,
+			instructions=self.instructions, idle=self.idle)
+		return state
+
+	def import_state(self, state: Dict[str, Any]) -> None:
+		""" load a state returned by export_state of either CDP1802 model
+		into the register and memory parts """
+		for name in REGISTERS:
+			self.set_register(name, state[name])
+		self.propagate_tick('S')
+		for i, value in enumerate(state['R']):
+			self.setR(i, value)
+		self.propagate_tick('R')
+		self.EF[:] = state['EF']
+		copy_memory(state['memory'], self.parts['mem'].data)
+		self.cycles = state['cycles']
+		self.instructions = state['instructions']
+		self.idle = state['idle']
 
 	def fetch(self):
 		yield 5
 		self.A = self.getR(self.P)
 		yield False
-		self.propagate_tick('A')
+		self.propagate_tick('S')
 		yield self.A
 		mem = self.parts['mem']
 		mem.set_pin('address', self.A)
@@ -0,0 +1,89 @@
+"""
+CDP1802 simulation switching between the behavioural and the gate-level
+model while running.
+
+DualModeCDP1802 owns both a CDP1802Core and a gate-level CDP1802 and runs
+the active one. switch() transfers the registers, flags, counters and the
+memory image to the other model, so a program can be fast-forwarded in
+the behavioural model up to a chosen cycle and then stepped through the
+register and memory parts, and back.
+"""
+from typing import Sequence
+
+from ..hardware.clock import Clock
+from .cdp1802core import CDP1802Core
+from .cdp1802cosmac import CDP1802
+
+
+BEHAVIOURAL = 'behavioural'
+GATE = 'gate'
+
+
+class DualModeCDP1802:
+	"""A CDP1802 running either as CDP1802Core or as the gate-level CDP1802"""
+
+	def __init__(self, memory_size: int = 0x10000, mode: str = BEHAVIOURAL):
+		if mode not in (BEHAVIOURAL, GATE):
+			raise ValueError(f"unknown mode {mode!r}")
+		self.core = CDP1802Core(memory_size=memory_size)
+		self.gate = CDP1802([], [], memory_size)
+		self.clock = Clock()
+		self.gate.connect_to_clock(self.clock)
+		self.gate.boot()
+		self.clock.tick()
+		self.gate.import_state(self.core.export_state())
+		self.mode = mode
+
+	@property
+	def cpu(self):
+		""" the model currently running """
+		return self.core if self.mode == BEHAVIOURAL else self.gate
+
+	@property
+	def cycles(self) -> int:
+		return self.cpu.cycles
+
+	@property
+	def idle(self) -> bool:
+		return self.cpu.idle
+
+	def switch(self, mode: str) -> None:
+		""" transfer the state to the model of mode and make it the running one """
+		if mode not in (BEHAVIOURAL, GATE):
+			raise ValueError(f"unknown mode {mode!r}")
+		if mode != self.mode:
+			state = self.cpu.export_state()
+			self.mode = mode
+			self.cpu.import_state(state)
+
+	def load(self, program: Sequence[int], address: int = 0) -> None:
+		""" copy program bytes into the memory of the running model """
+		if self.mode == BEHAVIOURAL:
+			self.core.load(program, address)
+		else:
+			self.gate.parts['mem'].load_image(bytes(program), address)
+
+	def step(self) -> int:
+		""" execute one instruction, return its machine cycles """
+		return self.cpu.step()
+
+	def run(self, max_instructions: int) -> int:
+		""" execute up to max_instructions instructions, stopping at IDL.
+		Return the number of instructions executed """
+		if self.mode == BEHAVIOURAL:
+			return self.core.run(max_instructions)
+		count = 0
+		while count < max_instructions and not self.gate.idle:
+			self.gate.step()
+			count += 1
+		return count
+
+	def run_until(self, cycles: int) -> int:
+		""" execute instructions until at least cycles machine cycles have
+		been run since reset, or IDL. Return the instructions executed """
+		count = 0
+		cpu = self.cpu
+		while cpu.cycles < cycles and not cpu.idle:
+			cpu.step()
+			count += 1
+		return count
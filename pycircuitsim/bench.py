@@ -0,0 +1,159 @@
+"""
+Simulation throughput benchmarks.
+
+Every benchmark builds a circuit once and then times a single operation
+(an evaluation, a memory access, a clock tick) repeatedly. Results are
+printed as JSON so runs of different versions can be compared:
+
+	python -m pycircuitsim.bench -o results.json
+	python -m pycircuitsim.bench "FullAdder*" --min-time 1
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from fnmatch import fnmatch
+from typing import List, Dict, Any, Callable, Tuple, Optional
+
+from . import __version__
+from .arch.cdp1802cosmac import CDP1802
+from .hardware.adder import FullAdder
+from .hardware.clock import Clock
+from .hardware.logic_gates import Xor, AndMultiWay
+from .hardware.memory import RAM
+
+
+def _cycle(values: List[Any]) -> Callable[[], Any]:
+	""" return a function returning the items of values, round robin """
+	state = [0]
+	n = len(values)
+
+	def next_value():
+		pos = state[0]
+		state[0] = (pos + 1) % n
+		return values[pos]
+	return next_value
+
+
+def bench_xor() -> Callable[[], None]:
+	chip = Xor()
+	inputs = _cycle([{'a': a, 'b': b} for a in (False, True) for b in (False, True)])
+	return lambda: chip.evaluate(inputs())
+
+
+def bench_and_multiway(n: int) -> Callable[[], None]:
+	chip = AndMultiWay(n)
+	rnd = random.Random(n)
+	inputs = _cycle([{str(i): rnd.random() < 0.8 for i in range(n)} for j in range(64)])
+	return lambda: chip.evaluate(inputs())
+
+
+def bench_full_adder(n: int) -> Callable[[], None]:
+	chip = FullAdder(n)
+	rnd = random.Random(n)
+	inputs = _cycle([{'in0': rnd.getrandbits(n), 'in1': rnd.getrandbits(n)} for j in range(64)])
+	return lambda: chip.evaluate(inputs())
+
+
+def bench_ram(load: bool, size: int = 1024) -> Callable[[], None]:
+	ram = RAM(size, 64)
+	addresses = _cycle(random.Random(size).sample(range(size), min(size, 256)))
+
+	def access():
+		ram.set_pin('address', addresses())
+		ram.set_pin('in', 0x5a)
+		ram.set_pin('load', load)
+		ram.on_tick(0)
+	return access
+
+
+def bench_cdp1802_tick() -> Callable[[], None]:
+	cpu = CDP1802([], [])
+	clock = Clock()
+	cpu.connect_to_clock(clock)
+	cpu.boot()
+	clock.tick()
+	return clock.tick
+
+
+BENCHMARKS: List[Tuple[str, Callable[[], Callable[[], None]]]] = [
+	("Xor.evaluate", bench_xor),
+	*((f"AndMultiWay({n}).evaluate", lambda n=n: bench_and_multiway(n)) for n in (4, 8, 16)),
+	*((f"FullAdder({n}).evaluate", lambda n=n: bench_full_adder(n)) for n in (4, 8, 16, 32)),
+	("RAM(1024).read", lambda: bench_ram(False)),
+	("RAM(1024).write", lambda: bench_ram(True)),
+	("CDP1802.Clock.tick", bench_cdp1802_tick),
+]
+
+
+def measure(op: Callable[[], None], min_time: float = 0.2, repeat: int = 3) -> Dict[str, Any]:
+	""" time op: every round calls it until min_time seconds have passed,
+	the fastest of repeat rounds is reported """
+	best = None
+	for i in range(repeat):
+		calls = 0
+		batch = 1
+		start = time.perf_counter()
+		elapsed = 0.0
+		while elapsed < min_time:
+			for j in range(batch):
+				op()
+			calls += batch
+			batch *= 2
+			elapsed = time.perf_counter() - start
+		rate = calls / elapsed
+		if best is None or rate > best['ops_per_second']:
+			best = {'ops': calls, 'seconds': elapsed, 'ops_per_second': rate}
+	return best
+
+
+def run(patterns: Optional[List[str]] = None, min_time: float = 0.2, repeat: int = 3) -> Dict[str, Any]:
+	""" run the benchmarks whose name matches one of the fnmatch patterns
+	(all of them by default) and return the JSON-ready results """
+	results = []
+	for name, factory in BENCHMARKS:
+		if patterns and not any(fnmatch(name, pattern) for pattern in patterns):
+			continue
+		result = {'name': name}
+		result.update(measure(factory(), min_time, repeat))
+		results.append(result)
+	return {
+		'pycircuitsim': __version__,
+		'python': platform.python_version(),
+		'implementation': platform.python_implementation(),
+		'machine': platform.machine(),
+		'min_time': min_time,
+		'repeat': repeat,
+		'results': results,
+	}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+	parser = argparse.ArgumentParser(prog='pycircuitsim-bench', description=__doc__.strip().splitlines()[0])
+	parser.add_argument('patterns', nargs='*', help="run only the benchmarks matching these patterns")
+	parser.add_argument('--min-time', type=float, default=0.2, help="seconds of every timing round")
+	parser.add_argument('--repeat', type=int, default=3, help="timing rounds, the fastest is reported")
+	parser.add_argument('-o', '--output', help="write the JSON results to this file")
+	parser.add_argument('--list', action='store_true', help="list the benchmarks and exit")
+	args = parser.parse_args(argv)
+
+	if args.list:
+		for name, factory in BENCHMARKS:
+			print(name)
+		return 0
+	results = run(args.patterns, args.min_time, args.repeat)
+	if not results['results']:
+		parser.error(f"no benchmark matches {' '.join(args.patterns)}")
+	text = json.dumps(results, indent=2)
+	if args.output:
+		with open(args.output, 'w') as fh:
+			fh.write(text + '\n')
+	else:
+		print(text)
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
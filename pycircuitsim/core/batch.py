@@ -0,0 +1,49 @@
+"""
+Helpers for evaluating chips over batches of operands.
+
+NumPy is optional: when it is installed, batches of words up to 64 bits are
+evaluated as uint64 array operations, otherwise as Python int lists.
+"""
+from typing import List, Dict, Any, Callable, Sequence
+
+try:
+	import numpy
+except ImportError:  # pragma: no cover - depends on the environment
+	numpy = None
+
+
+def batch_size(inputs: Dict[str, Sequence]) -> int:
+	""" return the common length of the input columns """
+	sizes = {len(column) for column in inputs.values()}
+	if len(sizes) > 1:
+		raise ValueError(f"input columns have different lengths: {sorted(sizes)}")
+	return sizes.pop() if sizes else 0
+
+
+def column(values: List[Any]):
+	""" return values as an array if NumPy is available """
+	if numpy is not None:
+		return numpy.asarray(values)
+	return values
+
+
+def _as_uint64(values):
+	try:
+		array = numpy.asarray(values)
+		if array.dtype.kind in 'biu':
+			return array.astype(numpy.uint64)
+	except (OverflowError, ValueError, TypeError):
+		pass
+	return None
+
+
+def bitwise(fn: Callable, columns: List[Sequence], bits: int):
+	""" apply fn(*operands, mask) to every row of columns, where mask has the
+	low bits set. fn must only use &, |, ^, ~ and + so that it gives the
+	same result on Python ints and on uint64 arrays. """
+	mask = (1 << bits) - 1
+	if numpy is not None and bits <= 64:
+		arrays = [_as_uint64(c) for c in columns]
+		if all(a is not None for a in arrays):
+			return fn(*arrays, numpy.uint64(mask))
+	return [fn(*[int(v) for v in row], mask) for row in zip(*columns)]
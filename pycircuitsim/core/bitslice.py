@@ -0,0 +1,239 @@
+"""
+Bit-parallel evaluation of combinational chips.
+
+Every signal of the chip netlist (see core.netlist) holds a Python int whose
+bit k is the value of the signal for test vector k, so a single pass over
+the ops evaluates a whole batch of vectors. Only single bit signals can be
+sliced: chips whose netlist carries multi-bit values or opaque ops are
+evaluated one vector at a time instead.
+"""
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Union, Optional
+
+from .chip import AbstractChip
+from .errors import ChipWiringError, IncorrectPinNameError
+from .netlist import Netlist, compile_chip
+
+
+_BOOL = {False: 0, True: 1}
+
+
+def _is_bit(value) -> bool:
+	try:
+		return value in _BOOL
+	except TypeError:
+		return False
+
+
+def _minterm(words, bits, index, mask):
+	""" lanes where the signals in words hold the bits of index """
+	term = mask
+	for pos, x in enumerate(bits):
+		term &= words[x] if index >> pos & 1 else ~words[x]
+	return term
+
+
+def _slice_not(a, o):
+	def run(s, mask):
+		s[o] = ~s[a] & mask
+	return run
+
+
+def _slice_and(a, b, o):
+	def run(s, mask):
+		s[o] = s[a] & s[b]
+	return run
+
+
+def _slice_nand(a, b, o):
+	def run(s, mask):
+		s[o] = ~(s[a] & s[b]) & mask
+	return run
+
+
+def _slice_nor(a, b, o):
+	def run(s, mask):
+		s[o] = ~(s[a] | s[b]) & mask
+	return run
+
+
+def _slice_or(a, b, o):
+	def run(s, mask):
+		s[o] = s[a] | s[b]
+	return run
+
+
+def _slice_xor(a, b, o):
+	def run(s, mask):
+		s[o] = s[a] ^ s[b]
+	return run
+
+
+def _slice_copy(a, o):
+	def run(s, mask):
+		s[o] = s[a]
+	return run
+
+
+def _slice_const(value, o):
+	if not _is_bit(value):
+		return None
+	def run(s, mask):
+		s[o] = mask if value else 0
+	return run
+
+
+def _slice_table(ins, outs, f_map):
+	rows = []
+	for key, values in f_map.items():
+		if len(key) != len(ins) or not all(_is_bit(v) for v in key + tuple(values)):
+			return None
+		rows.append((sum(_BOOL[v] << pos for pos, v in enumerate(key)), values))
+
+	def run(s, mask):
+		covered = 0
+		words = [0] * len(outs)
+		for index, values in rows:
+			term = _minterm(s, ins, index, mask)
+			covered |= term
+			for pos, v in enumerate(values):
+				if v:
+					words[pos] |= term
+		if covered != mask:
+			raise ChipWiringError("Mapping not found")
+		for o, word in zip(outs, words):
+			s[o] = word
+	return run
+
+
+def _slice_mux(sels, ins, o):
+	def run(s, mask):
+		out = 0
+		for index, x in enumerate(ins):
+			out |= s[x] & _minterm(s, sels, index, mask)
+		s[o] = out
+	return run
+
+
+def _slice_demux(i, sels, outs):
+	def run(s, mask):
+		covered = 0
+		for index, o in enumerate(outs):
+			term = _minterm(s, sels, index, mask)
+			covered |= term
+			s[o] = s[i] & term
+		if covered != mask:
+			raise IncorrectPinNameError(f"out{len(outs)}")
+	return run
+
+
+SLICERS = {
+	'not': _slice_not,
+	'and': _slice_and,
+	'iand': _slice_and,
+	'or': _slice_or,
+	'nand': _slice_nand,
+	'nor': _slice_nor,
+	'xor': _slice_xor,
+	'copy': _slice_copy,
+	'const': _slice_const,
+	'table': _slice_table,
+	'mux': _slice_mux,
+	'demux': _slice_demux,
+}
+
+
+class BitSlicedEvaluator:
+	"""Evaluates batches of input vectors on a combinational chip.
+	width is the number of vectors evaluated per pass, None evaluates
+	the whole batch in one pass."""
+
+	def __init__(self, chip: Union[AbstractChip, Netlist], width: Optional[int] = 64):
+		self.netlist = chip if isinstance(chip, Netlist) else compile_chip(chip)
+		self.width = width
+		self.program = self._build()
+
+	def _build(self):
+		""" return the sliced program, or None if the netlist can't be sliced """
+		if not all(_is_bit(v) for v in self.netlist.signals):
+			return None
+		program = []
+		for op in self.netlist.ops:
+			slicer = SLICERS.get(op[0])
+			run = slicer(*op[1:]) if slicer is not None else None
+			if run is None:
+				return None
+			program.append(run)
+		return program
+
+	@property
+	def sliced(self) -> bool:
+		return self.program is not None
+
+	def evaluate(self, vectors: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+		""" evaluate every input assignment of vectors and return the outputs
+		of each one. Inputs missing from an assignment keep the netlist value.
+		Sliced outputs are returned as bools. """
+		results: List[Dict[str, Any]] = []
+		base = {name: self.netlist.pin(name) for name in self.netlist.inputs}
+		vectors = iter(vectors)
+		while True:
+			batch = list(islice(vectors, self.width)) if self.width else list(vectors)
+			if not batch:
+				return results
+			if self.program is not None and all(_is_bit(v) for vector in batch for v in vector.values()):
+				results.extend(self._evaluate_sliced(batch))
+			else:
+				results.extend(self.netlist.evaluate({**base, **vector}) for vector in batch)
+			if not self.width:
+				return results
+
+	def evaluate_words(self, words: Dict[str, int], n: int) -> Dict[str, int]:
+		""" evaluate n vectors given as one word per input, where bit k of
+		a word is the input value in vector k. Return one word per output. """
+		if self.program is None:
+			raise ChipWiringError("this chip can't be evaluated bit-parallel")
+		mask = (1 << n) - 1
+		names = self.netlist.names
+		s = [mask if v else 0 for v in self.netlist.signals]
+		for name, word in words.items():
+			x = names.get(name)
+			if x is None:
+				raise IncorrectPinNameError(name)
+			s[x] = word & mask
+		for run in self.program:
+			run(s, mask)
+		return {name: s[names[name]] for name in self.netlist.outputs}
+
+	def _evaluate_sliced(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+		n = len(batch)
+		words = {}
+		for name in {name for vector in batch for name in vector}:
+			default = self.netlist.pin(name)
+			lanes = ['1' if vector.get(name, default) else '0' for vector in reversed(batch)]
+			words[name] = int(''.join(lanes), 2)
+
+		results: List[Dict[str, Any]] = [{} for vector in batch]
+		for name, word in self.evaluate_words(words, n).items():
+			lanes = bin(word)[2:].zfill(n)[::-1]
+			for result, lane in zip(results, lanes):
+				result[name] = lane == '1'
+		return results
+
+
+def exhaustive_words(names: List[str]) -> Dict[str, int]:
+	""" return the input words of an exhaustive sweep of names: vector k
+	sets names[i] to bit i of k. The sweep has 2 ** len(names) vectors. """
+	n = 1 << len(names)
+	words = {}
+	for pos, name in enumerate(names):
+		block = 1 << pos
+		lanes = ('0' * block + '1' * block) * (n // (2 * block))
+		words[name] = int(lanes[::-1], 2)
+	return words
+
+
+def evaluate_vectors(chip: Union[AbstractChip, Netlist], vectors: Iterable[Dict[str, Any]],
+		width: Optional[int] = 64) -> List[Dict[str, Any]]:
+	""" evaluate a batch of input assignments on chip, see BitSlicedEvaluator """
+	return BitSlicedEvaluator(chip, width).evaluate(vectors)
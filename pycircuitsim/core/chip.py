@@ -4,9 +4,13 @@ In order to create your chip you must override the setup_wiring
 function in order to create your chip wiring.
 """
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Callable, Tuple, Type, Union, TypeVar, Generic
+from typing import List, Dict, Any, Callable, Tuple, Type, Union, TypeVar, Generic, Sequence, Optional
 
 from .errors import IncorrectPinNameError, ChipWiringError
+from .batch import batch_size, column
+from .truth_table import TruthTable
+from .pins import PinLayout, PinView, PinRef
+from .memo import EvaluationCache
 
 from ..hardware.clock import Clock
 
@@ -45,10 +49,23 @@ class AbstractChip(ABC):
 	"""This abstract class represnts a chip. You must inhert and override
 	setup_wiring to create your own chip.
 	It support composition, every chip has multiple
-	parts that are chip on their own"""
+	parts that are chip on their own.
+	Pin values are stored in the pin_values list, at the positions given by
+	the chip PinLayout: inputs first, then outputs"""
+	__slots__ = ('layout', 'pin_values', 'wiring')
+
+	# attributes holding state besides the pins, see core.snapshot
+	state_slots: Tuple[str, ...] = ()
+	# True if on_tick gives the same result when run again with the same
+	# inputs, so that a Clock can skip it when no input changed
+	tick_on_change: bool = False
+
 	class Wiring:
-		def __init__(self, fn):
+		__slots__ = ('fn', 'chip')
+
+		def __init__(self, fn, chip=None):
 			self.fn = fn
+			self.chip = chip  # the owner, for core.profiling
 
 		def resolve(self):
 			return self.fn()
@@ -56,14 +73,22 @@ class AbstractChip(ABC):
 	def __init__(self, input_pins: List[str], output_pins: List[str]):
 		super().__init__()
 
-		self.inPins: Dict[str, bool] = {}
-		for pin in input_pins:
-			self.inPins[pin] = False
-		self.outPins: Dict[str, bool] = {}
-		for pin in output_pins:
-			self.outPins[pin] = False
+		self.layout = PinLayout.get(input_pins, output_pins)
+		self.pin_values: List[Any] = [False] * len(self.layout)
+
+		self.wiring = self.Wiring(self.setup_wiring(), self)
 
-		self.wiring = self.Wiring(self.setup_wiring())
+	@property
+	def inPins(self) -> PinView:
+		""" dict-like view of the input pin values """
+		layout = self.layout
+		return PinView(self.pin_values, layout.inputs, 0, layout.index)
+
+	@property
+	def outPins(self) -> PinView:
+		""" dict-like view of the output pin values """
+		layout = self.layout
+		return PinView(self.pin_values, layout.outputs, layout.n_inputs, layout.index)
 
 	def link_pins(self, pin_from: str, pin_to: str) -> None:
 		self.set_pin(pin_to, self.pin(pin_from))
@@ -76,24 +101,28 @@ class AbstractChip(ABC):
 		""" get pin_name value. You can address input pin,
 		output pin or a chip part pin using the "partname.pinname" name for the pin.
 		Raise exception if it can't fine the requested pin"""
-		if pin_name in self.inPins.keys():
-			return self.inPins[pin_name]
-		elif pin_name in self.outPins.keys():
-			return self.outPins[pin_name]
-		else:
+		pos = self.layout.index.get(pin_name)
+		if pos is None:
 			raise IncorrectPinNameError(pin_name)
+		return self.pin_values[pos]
 
 	def set_pin(self, name, value):
 		""" set pin_name to value. You can address input pin,
 		output pin or a chip part pin using the "partname.pinname"
 		name for the pin name.
 		Raise exception if it can't fine the requested pin"""
-		if name in self.inPins.keys():
-			self.inPins[name] = value
-		elif name in self.outPins.keys():
-			self.outPins[name] = value
-		else:
+		pos = self.layout.index.get(name)
+		if pos is None:
 			raise IncorrectPinNameError(name)
+		self.pin_values[pos] = value
+
+	def pin_ref(self, pin_name: str) -> PinRef:
+		""" return a handle to pin_name, which can be a "partname.pinname" name.
+		Raise exception if it can't fine the requested pin"""
+		pos = self.layout.index.get(pin_name)
+		if pos is None:
+			raise IncorrectPinNameError(pin_name)
+		return PinRef(self, pos, pin_name, False)
 
 
 
@@ -141,6 +170,7 @@ class AbstractChip(ABC):
 # 				raise IncorrectPinNameError(pin_name)
 
 class CompositeChip(AbstractChip):
+	__slots__ = ('parts',)
 
 	def __init__(self, input_pins, output_pins):
 		super().__init__(input_pins, output_pins)
@@ -156,11 +186,10 @@ class CompositeChip(AbstractChip):
 		output pin or a chip part pin using the "partname.pinname"
 		name for the pin name.
 		Raise exception if it can't fine the requested pin"""
-		try:
-			return super().set_pin(name, value)
-		except IncorrectPinNameError as err:
-			pass
-		if '.' in name:  # if is requested a pin from a chip component, get it!
+		pos = self.layout.index.get(name)
+		if pos is not None:
+			self.pin_values[pos] = value
+		elif '.' in name:  # if is requested a pin from a chip component, get it!
 			fields = name.split('.')
 			if fields[0] in self.parts.keys():
 				return self.parts[fields[0]].set_pin(fields[1], value)
@@ -171,15 +200,23 @@ class CompositeChip(AbstractChip):
 		""" get pin_name value. You can address input pin,
 		output pin or a chip part pin using the "partname.pinname" name for the pin.
 		Raise exception if it can't fine the requested pin"""
-		try:
-			return super().pin(pin_name)
-		except IncorrectPinNameError as err:
-			if '.' in pin_name:  # if is requested a pin from a chip component, get it!
-				fields = pin_name.split('.')
-				if fields[0] in self.parts.keys():
-					return self.parts[fields[0]].pin(fields[1])
-			else:
-				raise IncorrectPinNameError(pin_name)
+		pos = self.layout.index.get(pin_name)
+		if pos is not None:
+			return self.pin_values[pos]
+		if '.' in pin_name:  # if is requested a pin from a chip component, get it!
+			fields = pin_name.split('.')
+			if fields[0] in self.parts.keys():
+				return self.parts[fields[0]].pin(fields[1])
+		else:
+			raise IncorrectPinNameError(pin_name)
+
+	def pin_ref(self, pin_name: str) -> PinRef:
+		if pin_name in self.layout.index:
+			return super().pin_ref(pin_name)
+		part, _, name = pin_name.partition('.')
+		if name and part in self.parts:
+			return self.parts[part].pin_ref(name)
+		raise IncorrectPinNameError(pin_name)
 
 
 # class LogicGate(BaseChip, INoClockSynced):
@@ -189,29 +226,121 @@ class CompositeChip(AbstractChip):
 
 
 class NotClockedChip(CompositeChip):
+	__slots__ = ('cache',)
+
 	def __init__(self, input_pins: List[str], output_pins: List[str]):
+		self.cache: Optional[EvaluationCache] = None
 		super().__init__(input_pins, output_pins)
 		self.parts: Dict[str, Type[NotClockedChip]] = {}
 
 	def process(self):
-		self.wiring.resolve()
+		cache = self.cache
+		if cache is None:
+			self.wiring.resolve()
+			return
+		values = self.pin_values
+		n_inputs = self.layout.n_inputs
+		inputs = values[:n_inputs]
+		key = tuple(zip(inputs, map(type, inputs)))  # 1 and True give other outputs
+		try:
+			outputs = cache.get(key)
+		except TypeError:  # unhashable input values
+			self.wiring.resolve()
+			return
+		if outputs is None:
+			self.wiring.resolve()
+			cache.put(key, tuple(values[n_inputs:]))
+		else:
+			values[n_inputs:] = outputs
+
+	def memoize(self, size: Optional[int] = 1024) -> Optional[EvaluationCache]:
+		""" cache the outputs of the last size input combinations, None or 0
+		turns the cache off. On a cache hit only this chip outputs are
+		updated, not the pins of its parts. Chips containing clocked parts
+		have internal state and are never cached: memoize returns None. """
+		self.cache = None
+		if size and not self.is_stateful():
+			self.cache = EvaluationCache(size)
+		return self.cache
+
+	def is_stateful(self) -> bool:
+		""" True if some part of this chip, at any depth, is a ClockedChip """
+		for part in self.parts.values():
+			if isinstance(part, ClockedChip) or (isinstance(part, NotClockedChip) and part.is_stateful()):
+				return True
+		return False
 
 	def set_pin(self, name, value):
-		super().set_pin(name, value)
-		if name in self.inPins.keys(): # if the pin is an input, re-evaluate this chip
+		pos = self.layout.index.get(name)
+		if pos is None:
+			return super().set_pin(name, value)
+		self.pin_values[pos] = value
+		if pos < self.layout.n_inputs: # if the pin is an input, re-evaluate this chip
 			self.process()
 
+	def pin_ref(self, pin_name: str) -> PinRef:
+		pos = self.layout.index.get(pin_name)
+		if pos is None:
+			return super().pin_ref(pin_name)
+		return PinRef(self, pos, pin_name, pos < self.layout.n_inputs)
+
+	def evaluate(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+		""" set all the inputs, evaluate the chip once and return its outputs """
+		layout = self.layout
+		values = self.pin_values
+		for name, value in inputs.items():
+			pos = layout.index.get(name)
+			if pos is None or pos >= layout.n_inputs:
+				raise IncorrectPinNameError(name)
+			values[pos] = value
+		self.process()
+		return dict(zip(layout.outputs, values[layout.n_inputs:]))
+
+	def batch_columns(self, inputs: Dict[str, Sequence], names: List[str]) -> List[Sequence]:
+		""" return the input columns for names, an input missing from inputs
+		repeats the current pin value """
+		size = batch_size(inputs)
+		layout = self.layout
+		for name in inputs:
+			pos = layout.index.get(name)
+			if pos is None or pos >= layout.n_inputs:
+				raise IncorrectPinNameError(name)
+		return [inputs[name] if name in inputs else [self.pin(name)] * size for name in names]
+
+	def evaluate_batch(self, inputs: Dict[str, Sequence]) -> Dict[str, Any]:
+		""" evaluate every row of the input columns and return one column per
+		output (an array when NumPy is installed). The default evaluates the
+		rows one at a time, chips override it with vectorised versions. """
+		names = list(self.layout.inputs)
+		outputs: Dict[str, List[Any]] = {name: [] for name in self.layout.outputs}
+		for row in zip(*self.batch_columns(inputs, names)):
+			for name, value in self.evaluate(dict(zip(names, row))).items():
+				outputs[name].append(value)
+		return {name: column(values) for name, values in outputs.items()}
+
+	def lower(self, builder, prefix: str) -> None:
+		""" emit this chip ops into a netlist builder (see core.netlist).
+		The default traces the wiring, override it for chips whose wiring
+		computes pin values directly """
+		builder.lower_traced(self, prefix)
+
 
 class Chip(NotClockedChip):
-	pass
+	__slots__ = ()
 
 
 class ClockedChip(CompositeChip):
+	__slots__ = ()
+
+	# True if the chip splits on_tick in sample and publish, so that a Clock
+	# can sample every chip before any output changes
+	two_phase: bool = False
+
 	def __init__(self, input_pins: List[str], output_pins: List[str]):
 		super().__init__(input_pins, output_pins)
 
 		self.parts: Dict[str, Type[ClockedChip]] = {}
-		self.wiring = self.Wiring(self.setup_wiring())
+		self.wiring = self.Wiring(self.setup_wiring(), self)
 
 		#self.inPins['clock'] = False
 		#self.clock = clock
@@ -222,11 +351,25 @@ class ClockedChip(CompositeChip):
 	def on_tok(self, params=None):
 		pass
 
+	def sample(self, params=None):
+		""" first phase of a tick: read the inputs and return the next state,
+		without changing any output """
+		return None
+
+	def publish(self, state) -> None:
+		""" second phase of a tick: store state and drive the outputs """
+		pass
+
 	def propagate_tick(self, name, params=None):
 		self.parts[name].on_tick(params)
+
+	def lower_tick(self, builder, prefix: str) -> None:
+		""" emit the ops run by on_tick into a netlist builder (see core.netlist) """
+		builder.lower_traced_tick(self, prefix)
 	
 
 class MultiBitChip(NotClockedChip):
+	__slots__ = ('fn', 'n_bits', 'n_inputs', 'n_outputs')
 
 	def __init__(self, n_bits: int, n_inputs: int, n_outputs: int,  fn: Callable[[NotClockedChip, int], None]):
 		super().__init__([f"in{i}" for i in range(n_inputs)],
@@ -245,23 +388,45 @@ class MultiBitChip(NotClockedChip):
 
 	def setup_wiring(self):
 		def f():
+			values = self.pin_values # fn accumulates into the outputs
+			values[self.n_inputs:] = [0] * self.n_outputs
 			for bit in range(self.n_bits):
 				self.fn(self, bit)
 		return f
 
 
 class BooleanFunctionChip(Chip):
+	__slots__ = ('f_map', 'table')
 
 	def __init__(self, input_pins: List[str], output_pins: List[str], fdata: Dict[ Tuple[Any,...], Tuple[Any,...]]):
 		super().__init__(input_pins, output_pins)
 		self.f_map = fdata
+		# dense table shared by chips with the same mapping, None when
+		# the mapping has non boolean inputs
+		self.table = TruthTable.compile(len(input_pins), fdata)
 
 	def setup_wiring(self):
 		def f():
-			inputs = tuple([self.pin(x) for x in self.inPins.keys()])
+			if self.table is not None:
+				values = self.pin_values
+				n_inputs = self.layout.n_inputs
+				row = self.table.row(values[:n_inputs])
+				if len(row) == len(values) - n_inputs:
+					values[n_inputs:] = row
+				else:
+					for pos, value in zip(range(n_inputs, len(values)), row):
+						values[pos] = value
+				return
+			inputs = tuple([self.pin(x) for x in self.layout.inputs])
 			if inputs in self.f_map.keys():
-				for pos, out_pin in enumerate(self.outPins.keys()):
+				for pos, out_pin in enumerate(self.layout.outputs):
 					self.set_pin(out_pin, self.f_map[inputs][pos])
 			else:
 				raise ChipWiringError("Mapping not found")
 		return f
+
+	def lower(self, builder, prefix: str) -> None:
+		builder.emit('table',
+			builder.pins(self, prefix, self.layout.inputs),
+			builder.pins(self, prefix, self.layout.outputs),
+			self.f_map if self.table is None else self.table)
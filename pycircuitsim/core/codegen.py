@@ -0,0 +1,267 @@
+"""
+Python code generation for combinational chips.
+
+compile_python lowers a chip to its netlist (see core.netlist) and emits a
+straight-line Python function for it: every signal becomes a local
+variable, multi-bit ops become bitwise expressions and truth tables are
+indexed directly. Evaluating the chip is then a single function call.
+
+Generated functions only depend on the shape of the netlist: opaque chips,
+tables and initial signal values are passed in as constants, so chips of
+the same class and parameters (e.g. two FullAdder(16)) share one compiled
+function. Netlists using an op kind without a code template fall back to
+Netlist.evaluate.
+"""
+from typing import List, Dict, Any, Tuple, Optional, Callable
+
+from .errors import IncorrectPinNameError, ChipWiringError
+from .chip import AbstractChip, NotClockedChip
+from .netlist import Netlist, compile_chip, single_assignment, op_signals
+from .truth_table import TruthTable, BIT
+
+
+class _Unsupported(Exception):
+	pass
+
+
+class _Source:
+	"""Lines of a generated function and the constants it refers to.
+	Signal x is the local variable v<x>; copied signals are aliases of
+	their source, which is safe because the netlist is in single
+	assignment form."""
+
+	def __init__(self):
+		self.lines: List[str] = []
+		self.constants: List[Any] = []
+		self.alias: Dict[int, int] = {}
+
+	def v(self, x: int) -> str:
+		return f"v{self.alias.get(x, x)}"
+
+	def targets(self, xs: List[int]) -> str:
+		return ''.join(f"{self.v(x)}, " for x in xs)
+
+	def index(self, ins: List[int]) -> str:
+		return ' | '.join(f"B[{self.v(x)}] << {pos}" if pos else f"B[{self.v(x)}]"
+			for pos, x in enumerate(ins)) or '0'
+
+	def selection(self, sels: List[int]) -> str:
+		return ' | '.join(f"int({self.v(x)}) << {bit}" if bit else f"int({self.v(x)})"
+			for bit, x in enumerate(sels)) or '0'
+
+	def constant(self, value) -> str:
+		self.constants.append(value)
+		return f"k[{len(self.constants) - 1}]"
+
+	def emit(self, line: str) -> None:
+		self.lines.append(line)
+
+
+def _gen_not(src, a, o):
+	src.emit(f"{src.v(o)} = not {src.v(a)}")
+
+
+def _gen_and(src, a, b, o):
+	src.emit(f"{src.v(o)} = {src.v(a)} and {src.v(b)}")
+
+
+def _gen_or(src, a, b, o):
+	src.emit(f"{src.v(o)} = {src.v(a)} or {src.v(b)}")
+
+
+def _gen_nand(src, a, b, o):
+	src.emit(f"{src.v(o)} = not ({src.v(a)} and {src.v(b)})")
+
+
+def _gen_nor(src, a, b, o):
+	src.emit(f"{src.v(o)} = not ({src.v(a)} or {src.v(b)})")
+
+
+def _gen_xor(src, a, b, o):
+	src.emit(f"{src.v(o)} = int({src.v(a)}) ^ int({src.v(b)})")
+
+
+def _gen_iand(src, a, b, o):
+	src.emit(f"{src.v(o)} = int({src.v(a)}) and int({src.v(b)})")
+
+
+def _gen_copy(src, a, o):
+	src.alias[o] = src.alias.get(a, a)
+
+
+def _gen_const(src, value, o):
+	src.emit(f"{src.v(o)} = {src.constant(value)}")
+
+
+def _gen_band(src, a, b, o, mask):
+	src.emit(f"{src.v(o)} = int({src.v(a)}) & int({src.v(b)}) & {int(mask)}")
+
+
+def _gen_bor(src, a, b, o, mask):
+	src.emit(f"{src.v(o)} = (int({src.v(a)}) | int({src.v(b)})) & {int(mask)}")
+
+
+def _gen_bnot(src, a, o, mask):
+	src.emit(f"{src.v(o)} = ~int({src.v(a)}) & {int(mask)}")
+
+
+def _gen_bit(src, a, bit, o):
+	src.emit(f"{src.v(o)} = {src.v(a)} >> {int(bit)} & 1")
+
+
+def _gen_pack(src, bits, o):
+	terms = [f"({src.v(x)} << {pos})" for pos, x in enumerate(bits)]
+	src.emit(f"{src.v(o)} = {' + '.join(terms) or '0'}")
+
+
+def _gen_table(src, ins, outs, table):
+	if isinstance(table, TruthTable):
+		lookup = f"{src.constant(table.rows)}[{src.index(ins)}]"
+	elif isinstance(table, dict):
+		lookup = f"{src.constant(table)}[({src.targets(ins)})]"
+	else:
+		raise _Unsupported(type(table).__name__)
+	src.emit("try:")
+	src.emit(f"\t{src.targets(outs).rstrip() or '_'} = {lookup}")
+	src.emit("except (KeyError, TypeError):")
+	src.emit("\traise ChipWiringError('Mapping not found')")
+
+
+def _gen_mux(src, sels, ins, o):
+	src.emit(f"{src.v(o)} = ({src.targets(ins)})[{src.selection(sels)}]")
+
+
+def _gen_demux(src, i, sels, outs):
+	src.emit(f"sel = {src.selection(sels)}")
+	src.emit(f"if sel >= {len(outs)}:")
+	src.emit("\traise IncorrectPinNameError(f'out{sel}')")
+	for pos, o in enumerate(outs):
+		src.emit(f"{src.v(o)} = {src.v(i)} if sel == {pos} else False")
+
+
+def _gen_call(src, chip, ins, in_names, outs, out_names):
+	index = chip.layout.index
+	values = src.constant(chip.pin_values)
+	for x, name in zip(ins, in_names):
+		src.emit(f"{values}[{index[name]}] = {src.v(x)}")
+	src.emit(f"{src.constant(chip.process)}()")
+	for o, name in zip(outs, out_names):
+		src.emit(f"{src.v(o)} = {values}[{index[name]}]")
+
+
+GENERATORS = {
+	'not': _gen_not,
+	'and': _gen_and,
+	'or': _gen_or,
+	'nand': _gen_nand,
+	'nor': _gen_nor,
+	'xor': _gen_xor,
+	'iand': _gen_iand,
+	'copy': _gen_copy,
+	'const': _gen_const,
+	'band': _gen_band,
+	'bor': _gen_bor,
+	'bnot': _gen_bnot,
+	'bit': _gen_bit,
+	'pack': _gen_pack,
+	'table': _gen_table,
+	'mux': _gen_mux,
+	'demux': _gen_demux,
+	'call': _gen_call,
+}
+
+
+def generate(netlist: Netlist) -> Tuple[str, List[Any]]:
+	""" return (source, constants) for the combinational ops of a netlist
+	in single assignment form. The source defines evaluate(k, *inputs),
+	returning the output values, where k are the constants. Signals read
+	before being written are constants holding their current value.
+	Raise _Unsupported for an op kind without a code template. """
+	src = _Source()
+	inputs = [netlist.names[name] for name in netlist.inputs]
+	known = set(inputs)
+	header: List[str] = []
+
+	def define(xs):
+		for x in xs:
+			if x not in known and x not in src.alias:
+				known.add(x)
+				header.append(f"\tv{x} = {src.constant(netlist.signals[x])}")
+
+	for op in netlist.ops:
+		if op[0] not in GENERATORS:
+			raise _Unsupported(op[0])
+		reads, writes = op_signals(op)
+		define(reads)
+		known.update(writes)
+		GENERATORS[op[0]](src, *op[1:])
+	outputs = [netlist.names[name] for name in netlist.outputs]
+	define(outputs)
+
+	params = ''.join(f", v{x}" for x in inputs)
+	lines = [f"def evaluate(k{params}):"] + header
+	lines.extend('\t' + line for line in src.lines)
+	lines.append(f"\treturn ({src.targets(outputs)})")
+	return '\n'.join(lines) + '\n', src.constants
+
+
+_compiled: Dict[Tuple[type, str], Callable] = {}
+
+
+def _function(cls: type, source: str) -> Callable:
+	""" return the compiled function for source, shared by the chips of cls """
+	fn = _compiled.get((cls, source))
+	if fn is None:
+		scope = {'B': BIT, 'ChipWiringError': ChipWiringError, 'IncorrectPinNameError': IncorrectPinNameError}
+		exec(compile(source, f"<pycircuitsim {cls.__name__}>", 'exec'), scope)
+		fn = _compiled[(cls, source)] = scope['evaluate']
+	return fn
+
+
+class CompiledChip:
+	"""A combinational chip evaluated by a generated Python function.
+	compiled is False when the netlist could not be turned into code and
+	evaluate runs Netlist.evaluate instead."""
+
+	def __init__(self, chip: AbstractChip):
+		if not isinstance(chip, NotClockedChip):
+			raise TypeError(f"{type(chip).__name__} is not a combinational chip")
+		self.netlist = single_assignment(compile_chip(chip))
+		self.inputs = list(self.netlist.inputs)
+		self.outputs = list(self.netlist.outputs)
+		self.values = [self.netlist.pin(name) for name in self.inputs]
+		self._positions = {name: pos for pos, name in enumerate(self.inputs)}
+		try:
+			source, constants = generate(self.netlist)
+		except _Unsupported:
+			self.source: Optional[str] = None
+			self.compiled = False
+			return
+		self.source = source
+		self.compiled = True
+		self.fn = _function(type(chip), source)
+		self.constants = constants
+
+	def __call__(self, *values) -> Tuple[Any, ...]:
+		""" evaluate the chip for the positional input values, in inputs
+		order, and return the output values in outputs order """
+		if self.compiled:
+			return self.fn(self.constants, *values)
+		outputs = self.netlist.evaluate(dict(zip(self.inputs, values)))
+		return tuple(outputs[name] for name in self.outputs)
+
+	def evaluate(self, inputs: Dict[str, Any] = None) -> Dict[str, Any]:
+		""" set inputs and return the outputs. Inputs that are not given
+		keep their last value """
+		if inputs:
+			for name, value in inputs.items():
+				pos = self._positions.get(name)
+				if pos is None:
+					raise IncorrectPinNameError(name)
+				self.values[pos] = value
+		return dict(zip(self.outputs, self(*self.values)))
+
+
+def compile_python(chip: AbstractChip) -> CompiledChip:
+	""" compile a combinational chip to a generated Python function """
+	return CompiledChip(chip)
@@ -0,0 +1,263 @@
+"""
+Declarative chip description.
+
+A chip is described by one expression per output, built from the
+utils.graph nodes: In for the inputs, Var for constants and Fn for
+functions, e.g.
+
+	a, b = inputs('a', 'b')
+	xor = DeclarativeChip({'out': Or(And(a, Not(b)), And(Not(a), b))})
+
+The expressions are compiled once into a Circuit: equal subexpressions are
+shared (common subexpression elimination) and operations on constants are
+folded, e.g. And(x, Const(True)) is x and Xor(x, x) is Const(False).
+"""
+from typing import List, Dict, Any, Tuple, Optional, Sequence
+
+from .chip import NotClockedChip
+from .errors import ChipWiringError
+from ..utils.graph import Graph, Node, Var, In, Fn
+
+
+def _and(a, b):
+	return a and b
+
+
+def _or(a, b):
+	return a or b
+
+
+def _xor(a, b):
+	return bool(a) != bool(b)
+
+
+def _not(a):
+	return not a
+
+
+OPS = {'and': _and, 'or': _or, 'xor': _xor, 'not': _not}
+COMMUTATIVE = {'and', 'or', 'xor'}
+
+
+def Const(value) -> Var:
+	return Var(repr(value), value)
+
+
+def _node(x) -> Node:
+	return x if isinstance(x, Node) else Const(x)
+
+
+def _chain(op: str, args) -> Node:
+	if len(args) < 2:
+		raise ValueError(f"{op} needs at least two arguments")
+	node = _node(args[0])
+	for arg in args[1:]:
+		node = Fn(OPS[op], node, _node(arg), op=op)
+	return node
+
+
+def And(*args) -> Node:
+	return _chain('and', args)
+
+
+def Or(*args) -> Node:
+	return _chain('or', args)
+
+
+def Xor(*args) -> Node:
+	return _chain('xor', args)
+
+
+def Not(a) -> Node:
+	return Fn(_not, _node(a), op='not')
+
+
+def Nand(*args) -> Node:
+	return Not(And(*args))
+
+
+def Nor(*args) -> Node:
+	return Not(Or(*args))
+
+
+def inputs(*names: str) -> Tuple[In, ...]:
+	return tuple(In(name) for name in names)
+
+
+def _is_const(node: Node) -> bool:
+	return isinstance(node, Var)
+
+
+def _negates(a: Node, b: Node) -> bool:
+	""" True if one of a and b is Not(the other) """
+	return (isinstance(a, Fn) and a.op == 'not' and a.args[0] is b) or \
+		(isinstance(b, Fn) and b.op == 'not' and b.args[0] is a)
+
+
+class _Builder:
+	"""Maps expression nodes to canonical nodes: one node per distinct
+	expression, with constant operations folded"""
+
+	def __init__(self):
+		self.table: Dict[Tuple, Node] = {}
+		self.memo: Dict[int, Node] = {}
+		self.keep: List[Node] = []  # keeps the memo ids alive
+
+	def _intern(self, key: Tuple, node: Node) -> Node:
+		return self.table.setdefault(key, node)
+
+	def const(self, value) -> Node:
+		return self._intern(('const', type(value), value), Const(value))
+
+	def fn(self, op: str, args: Sequence[Node]) -> Node:
+		""" return the canonical node of op applied to canonical args """
+		folded = self._fold(op, args)
+		if folded is not None:
+			return folded
+		ids = [id(arg) for arg in args]
+		if op in COMMUTATIVE:
+			ids.sort()
+		return self._intern((op, *ids), Fn(OPS[op], *args, op=op))
+
+	def _fold(self, op: str, args: Sequence[Node]) -> Optional[Node]:
+		if all(_is_const(arg) for arg in args):
+			return self.const(OPS[op](*[arg.value for arg in args]))
+		if op == 'not':
+			x = args[0]
+			return x.args[0] if isinstance(x, Fn) and x.op == 'not' else None
+		a, b = args
+		for x, y in ((a, b), (b, a)):
+			if _is_const(x):
+				if op == 'and':
+					return y if x.value else self.const(False)
+				if op == 'or':
+					return self.const(True) if x.value else y
+				if op == 'xor':
+					return self.fn('not', [y]) if x.value else y
+		if a is b:
+			return self.const(False) if op == 'xor' else a
+		if _negates(a, b):
+			return self.const(op != 'and')
+		return None
+
+	def canonical(self, node: Node) -> Node:
+		found = self.memo.get(id(node))
+		if found is not None:
+			return found
+		if isinstance(node, Var):
+			result = self.const(node.value)
+		elif isinstance(node, In):
+			result = self._intern(('in', node.var_name), node)
+		elif isinstance(node, Fn):
+			args = [self.canonical(arg) for arg in node.args]
+			if node.op in OPS and args:
+				result = self.fn(node.op, args)
+			else:
+				result = self._intern(('fn', id(node.fn), *map(id, args)), Fn(node.fn, *args, op=node.op))
+		else:
+			raise ChipWiringError(f"{node!r} is not an expression node")
+		self.memo[id(node)] = result
+		self.keep.append(node)
+		return result
+
+
+class Circuit:
+	"""Expressions compiled to a list of steps over a value list: the
+	inputs first, then the constants and the function results"""
+
+	def __init__(self, outputs: Dict[str, Node], input_names: Optional[List[str]] = None):
+		builder = _Builder()
+		roots = {name: builder.canonical(_node(expr)) for name, expr in outputs.items()}
+
+		graph = Graph()
+		for root in roots.values():
+			graph.add_node(root)
+		todo = list(roots.values())
+		seen = set()
+		used: List[str] = []
+		while todo:
+			node = todo.pop()
+			if id(node) in seen:
+				continue
+			seen.add(id(node))
+			if isinstance(node, In) and node.var_name not in used:
+				used.append(node.var_name)
+			for arg in getattr(node, 'args', ()):
+				graph.add_link(arg, node)
+				todo.append(arg)
+
+		if input_names is None:
+			input_names = sorted(used)
+		missing = [name for name in used if name not in input_names]
+		if missing:
+			raise ChipWiringError(f"undeclared inputs: {', '.join(missing)}")
+		self.inputs: List[str] = list(input_names)
+		self.output_names: List[str] = list(outputs)
+
+		slot: Dict[int, int] = {}
+		self.template: List[Any] = [False] * len(self.inputs)
+		self.nodes: List[Node] = []
+		self.steps: List[Tuple[Any, Optional[Tuple[int, ...]], int]] = []
+		for node in graph.topological_order():
+			if isinstance(node, In):
+				slot[id(node)] = self.inputs.index(node.var_name)
+				continue
+			slot[id(node)] = len(self.template)
+			self.template.append(node.value if isinstance(node, Var) else False)
+			self.nodes.append(node)
+			if isinstance(node, Fn):
+				args = tuple(slot[id(arg)] for arg in node.args) if node.args else None
+				self.steps.append((node.fn, args, slot[id(node)]))
+		self._slot = slot
+		self.outputs: List[int] = [slot[id(root)] for root in roots.values()]
+		self.roots = roots
+
+	def run(self, values: Sequence[Any]) -> List[Any]:
+		""" return the output values for the input values, in inputs order """
+		s = list(self.template)
+		s[:len(self.inputs)] = values
+		for fn, args, out in self.steps:
+			if args is None:
+				s[out] = fn(dict(zip(self.inputs, values)))
+			else:
+				s[out] = fn(*[s[x] for x in args])
+		return [s[x] for x in self.outputs]
+
+	def evaluate(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+		return dict(zip(self.output_names, self.run([inputs[name] for name in self.inputs])))
+
+	def lowerable(self) -> bool:
+		""" True if every step is an and/or/xor/not op """
+		return all(isinstance(node, Var) or node.op in OPS for node in self.nodes)
+
+
+class DeclarativeChip(NotClockedChip):
+	"""A combinational chip described by one expression per output.
+	Inputs are the In names, sorted, unless input_pins lists them."""
+	__slots__ = ('circuit',)
+
+	def __init__(self, outputs: Dict[str, Node], input_pins: Optional[List[str]] = None):
+		self.circuit = Circuit(outputs, input_pins)
+		super().__init__(self.circuit.inputs, self.circuit.output_names)
+
+	def setup_wiring(self):
+		def f():
+			values = self.pin_values
+			n_inputs = self.layout.n_inputs
+			values[n_inputs:] = self.circuit.run(values[:n_inputs])
+		return f
+
+	def lower(self, builder, prefix):
+		circuit = self.circuit
+		if not circuit.lowerable():
+			builder.lower_opaque(self, prefix)
+			return
+		signals = builder.pins(self, prefix, circuit.inputs)
+		for pos, node in enumerate(circuit.nodes):
+			signals.append(builder.signal(f"{prefix}#{pos}", circuit.template[len(signals)]))
+			if isinstance(node, Var):
+				builder.emit('const', node.value, signals[-1])
+			else:
+				builder.emit(node.op, *[signals[circuit._slot[id(arg)]] for arg in node.args], signals[-1])
+		for name, x in zip(circuit.output_names, circuit.outputs):
+			builder.emit('copy', signals[x], builder.pin(self, prefix, name))
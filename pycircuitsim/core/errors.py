@@ -13,3 +13,9 @@ class IncorrectPinNameError(ChipError):
 class ChipWiringError(ChipError):
 	def __init__(self, message: str):
 		self.message = message
+
+
+class CombinationalLoopError(ChipWiringError):
+	def __init__(self, loop):
+		super().__init__(f"combinational loop: {' -> '.join(map(str, loop))}")
+		self.loop = loop
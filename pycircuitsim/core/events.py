@@ -0,0 +1,93 @@
+"""
+Event-driven evaluation of combinational chips.
+
+EventSimulator works on the chip netlist (see core.netlist): writing a pin
+with an unchanged value does nothing, and a real change only schedules the
+ops reading that signal. Scheduled ops are run in delta cycles: every op of
+a delta cycle runs in netlist order, and the signals it changes schedule
+their readers for the next delta cycle.
+"""
+from typing import List, Dict, Any, Union
+
+from .chip import AbstractChip
+from .errors import ChipWiringError
+from .netlist import Netlist, compile_chip, single_assignment, op_signals
+
+
+def _same(old, new) -> bool:
+	return old is new or (type(old) is type(new) and old == new)
+
+
+class EventSimulator:
+	"""Runs a combinational chip, re-evaluating only what a pin change affects.
+	max_events bounds the ops run to settle a single change: a circuit that
+	does not settle within it raises ChipWiringError."""
+
+	def __init__(self, chip: Union[AbstractChip, Netlist], max_events: int = 100000):
+		netlist = chip if isinstance(chip, Netlist) else compile_chip(chip)
+		self.netlist = single_assignment(netlist)
+		self.max_events = max_events
+
+		self.evaluations = 0  # ops run so far
+		self.events = 0  # signal changes so far
+
+		self._program = self.netlist._build(self.netlist.ops)
+		self._writes: List[List[int]] = []
+		self._readers: List[List[int]] = [[] for x in self.netlist.signals]
+		for pos, op in enumerate(self.netlist.ops):
+			reads, writes = op_signals(op)
+			for x in set(reads):
+				self._readers[x].append(pos)
+			self._writes.append(writes)
+		self._pending = set()
+
+		self.netlist.evaluate()
+
+	def pin(self, name: str):
+		return self.netlist.pin(name)
+
+	def set_pin(self, name: str, value) -> None:
+		""" write a pin and propagate the change, if any """
+		self._write(self.netlist.slot(name), value)
+		self.settle()
+
+	def set_pins(self, values: Dict[str, Any]) -> None:
+		""" write several pins, then propagate all the changes at once """
+		for name, value in values.items():
+			self._write(self.netlist.slot(name), value)
+		self.settle()
+
+	def evaluate(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+		self.set_pins(inputs)
+		return self.netlist.read_outputs()
+
+	def _write(self, slot: int, value) -> None:
+		s = self.netlist.signals
+		if _same(s[slot], value):
+			return
+		s[slot] = value
+		self.events += 1
+		self._pending.update(self._readers[slot])
+
+	def settle(self) -> None:
+		""" run delta cycles until no op is scheduled """
+		s = self.netlist.signals
+		program = self._program
+		readers = self._readers
+		budget = self.max_events
+		while self._pending:
+			delta = sorted(self._pending)
+			self._pending = set()
+			budget -= len(delta)
+			if budget < 0:
+				self._pending = set()
+				raise ChipWiringError("event queue overflow: the circuit does not settle")
+			for pos in delta:
+				writes = self._writes[pos]
+				old = [s[x] for x in writes]
+				program[pos](s)
+				for x, value in zip(writes, old):
+					if not _same(s[x], value):
+						self.events += 1
+						self._pending.update(readers[x])
+			self.evaluations += len(delta)
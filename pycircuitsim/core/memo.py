@@ -0,0 +1,49 @@
+"""
+Memoised evaluation of combinational chips.
+
+A chip with an EvaluationCache (see NotClockedChip.memoize) looks its input
+values and their types up before running its wiring, and only runs it on a
+miss. The cache keeps the most recently used input combinations up to its
+size.
+"""
+from collections import OrderedDict
+from typing import Any, Tuple, Optional
+
+
+class EvaluationCache:
+	"""Bounded LRU map from input values to output values"""
+	__slots__ = ('size', 'entries', 'hits', 'misses')
+
+	def __init__(self, size: int = 1024):
+		if size < 1:
+			raise ValueError(f"cache size must be positive, not {size}")
+		self.size = size
+		self.entries: 'OrderedDict[Tuple[Any, ...], Tuple[Any, ...]]' = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, key: Tuple[Any, ...]) -> Optional[Tuple[Any, ...]]:
+		""" return the outputs stored for key, or None """
+		outputs = self.entries.get(key)
+		if outputs is None:
+			self.misses += 1
+		else:
+			self.hits += 1
+			self.entries.move_to_end(key)
+		return outputs
+
+	def put(self, key: Tuple[Any, ...], outputs: Tuple[Any, ...]) -> None:
+		self.entries[key] = outputs
+		if len(self.entries) > self.size:
+			self.entries.popitem(last=False)
+
+	def clear(self) -> None:
+		self.entries.clear()
+		self.hits = 0
+		self.misses = 0
+
+	def __len__(self) -> int:
+		return len(self.entries)
+
+	def __repr__(self) -> str:
+		return f"EvaluationCache(size={self.size}, entries={len(self)}, hits={self.hits}, misses={self.misses})"
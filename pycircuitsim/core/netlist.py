@@ -0,0 +1,564 @@
+"""
+Flat netlist representation of a chip hierarchy.
+
+compile_chip lowers a chip tree into a single integer-indexed signal array
+and an ordered list of primitive ops. Evaluating the netlist runs the ops
+over the signal array, without any pin-name lookup or part traversal.
+
+Every op is a tuple whose first item is the op kind, e.g.
+('and', a, b, out), where a, b and out are signal indexes.
+Chips describe their lowering by overriding NotClockedChip.lower or
+ClockedChip.lower_tick. Chips whose wiring only uses link_pins,
+process_chip and propagate_tick are lowered automatically by tracing
+their wiring; any other chip becomes an opaque 'call'/'tick_call' op
+which evaluates the original chip instance.
+"""
+from typing import List, Dict, Any, Iterator, Tuple, Optional
+
+from .errors import IncorrectPinNameError, ChipWiringError
+from .chip import AbstractChip, NotClockedChip, ClockedChip
+from .truth_table import TruthTable
+
+
+class _NotStructural(Exception):
+	"""Raised while tracing a wiring that reads or writes pin values directly"""
+	pass
+
+
+# id(chip): the list recording the calls of a chip being traced. The
+# tracing classes have no room for an attribute, they must keep the
+# instance layout to be assigned to __class__
+_recorders: Dict[int, List[Tuple]] = {}
+_tracing_classes: Dict[type, type] = {}
+
+
+def _tracing_class(cls: type) -> type:
+	""" return a subclass of cls that records structural wiring calls
+	into the recorder of the chip instead of executing them """
+	traced = _tracing_classes.get(cls)
+	if traced is None:
+		def link_pins(self, pin_from, pin_to):
+			_recorders[id(self)].append(('link', pin_from, pin_to))
+
+		def process_chip(self, name):
+			_recorders[id(self)].append(('process', name))
+
+		def propagate_tick(self, name, params=None):
+			_recorders[id(self)].append(('tick', name))
+
+		def pin(self, pin_name):
+			raise _NotStructural(pin_name)
+
+		def set_pin(self, name, value):
+			raise _NotStructural(name)
+
+		def pin_ref(self, pin_name):
+			raise _NotStructural(pin_name)
+
+		traced = type(f"_Traced{cls.__name__}", (cls,), {
+			'__slots__': (),
+			'link_pins': link_pins,
+			'process_chip': process_chip,
+			'propagate_tick': propagate_tick,
+			'pin': pin,
+			'set_pin': set_pin,
+			'pin_ref': pin_ref,
+		})
+		_tracing_classes[cls] = traced
+	return traced
+
+
+def _chip_tree(chip: AbstractChip) -> Iterator[AbstractChip]:
+	yield chip
+	for part in getattr(chip, 'parts', {}).values():
+		yield from _chip_tree(part)
+
+
+def _trace(chip: AbstractChip, run) -> Optional[List[Tuple]]:
+	""" run run() with chip switched to its tracing class.
+	Return the recorded calls, or None if the wiring is not structural.
+	Different chips can be traced at the same time, not the same chip """
+	if id(chip) in _recorders:
+		raise ChipWiringError(f"{type(chip).__name__} is already being traced")
+	cls = chip.__class__
+	# pin handles taken before tracing bypass the tracing class: a wiring
+	# that changes pin values through them, at any depth, is not structural
+	chips = list(_chip_tree(chip))
+	saved = [list(c.pin_values) for c in chips]
+	calls: List[Tuple] = []
+	_recorders[id(chip)] = calls
+	chip.__class__ = _tracing_class(cls)
+	try:
+		run()
+	except _NotStructural:
+		return None
+	finally:
+		chip.__class__ = cls
+		del _recorders[id(chip)]
+	if any(c.pin_values != values for c, values in zip(chips, saved)):
+		for c, values in zip(chips, saved):
+			c.pin_values[:] = values
+		return None
+	return calls
+
+
+def _selection(signals, sels) -> int:
+	sel_value = 0
+	for bit, x in enumerate(sels):
+		sel_value |= int(signals[x]) << bit
+	return sel_value
+
+
+def _run_not(netlist, a, o):
+	def run(s):
+		s[o] = not s[a]
+	return run
+
+
+def _run_and(netlist, a, b, o):
+	def run(s):
+		s[o] = s[a] and s[b]
+	return run
+
+
+def _run_or(netlist, a, b, o):
+	def run(s):
+		s[o] = s[a] or s[b]
+	return run
+
+
+def _run_nand(netlist, a, b, o):
+	def run(s):
+		s[o] = not (s[a] and s[b])
+	return run
+
+
+def _run_nor(netlist, a, b, o):
+	def run(s):
+		s[o] = not (s[a] or s[b])
+	return run
+
+
+def _run_xor(netlist, a, b, o):
+	def run(s):
+		s[o] = int(s[a]) ^ int(s[b])
+	return run
+
+
+def _run_iand(netlist, a, b, o):
+	def run(s):
+		s[o] = int(s[a]) and int(s[b])
+	return run
+
+
+def _run_copy(netlist, a, o):
+	def run(s):
+		s[o] = s[a]
+	return run
+
+
+def _run_const(netlist, value, o):
+	def run(s):
+		s[o] = value
+	return run
+
+
+def _run_band(netlist, a, b, o, mask):
+	def run(s):
+		s[o] = int(s[a]) & int(s[b]) & mask
+	return run
+
+
+def _run_bor(netlist, a, b, o, mask):
+	def run(s):
+		s[o] = (int(s[a]) | int(s[b])) & mask
+	return run
+
+
+def _run_bnot(netlist, a, o, mask):
+	def run(s):
+		s[o] = ~int(s[a]) & mask
+	return run
+
+
+def _run_bit(netlist, a, bit, o):
+	def run(s):
+		s[o] = s[a] >> bit & 1
+	return run
+
+
+def _run_pack(netlist, bits, o):
+	def run(s):
+		out = 0
+		for pos, x in enumerate(bits):
+			out += s[x] << pos
+		s[o] = out
+	return run
+
+
+def _run_table(netlist, ins, outs, table):
+	if isinstance(table, TruthTable):
+		row = table.row
+		def run(s):
+			for o, v in zip(outs, row([s[x] for x in ins])):
+				s[o] = v
+		return run
+
+	def run(s):
+		inputs = tuple([s[x] for x in ins])
+		if inputs not in table:
+			raise ChipWiringError("Mapping not found")
+		for o, v in zip(outs, table[inputs]):
+			s[o] = v
+	return run
+
+
+def _run_mux(netlist, sels, ins, o):
+	def run(s):
+		s[o] = s[ins[_selection(s, sels)]]
+	return run
+
+
+def _run_demux(netlist, i, sels, outs):
+	def run(s):
+		sel_value = _selection(s, sels)
+		for o in outs:
+			s[o] = False
+		if sel_value >= len(outs):
+			raise IncorrectPinNameError(f"out{sel_value}")
+		s[outs[sel_value]] = s[i]
+	return run
+
+
+def _pin_positions(chip, ins, in_names, outs, out_names):
+	index = chip.layout.index
+	return list(zip(ins, [index[name] for name in in_names])), \
+		list(zip(outs, [index[name] for name in out_names]))
+
+
+def _run_call(netlist, chip, ins, in_names, outs, out_names):
+	values = chip.pin_values
+	inputs, outputs = _pin_positions(chip, ins, in_names, outs, out_names)
+	def run(s):
+		for x, pos in inputs:
+			values[pos] = s[x]
+		chip.process()
+		for o, pos in outputs:
+			s[o] = values[pos]
+	return run
+
+
+def _run_tick_call(netlist, chip, ins, in_names, outs, out_names):
+	values = chip.pin_values
+	inputs, outputs = _pin_positions(chip, ins, in_names, outs, out_names)
+	def run(s):
+		for x, pos in inputs:
+			values[pos] = s[x]
+		chip.on_tick(netlist.time)
+		for o, pos in outputs:
+			s[o] = values[pos]
+	return run
+
+
+RUNNERS = {
+	'not': _run_not,
+	'and': _run_and,
+	'or': _run_or,
+	'nand': _run_nand,
+	'nor': _run_nor,
+	'xor': _run_xor,
+	'iand': _run_iand,
+	'copy': _run_copy,
+	'const': _run_const,
+	'band': _run_band,
+	'bor': _run_bor,
+	'bnot': _run_bnot,
+	'bit': _run_bit,
+	'pack': _run_pack,
+	'table': _run_table,
+	'mux': _run_mux,
+	'demux': _run_demux,
+	'call': _run_call,
+	'tick_call': _run_tick_call,
+}
+
+
+# argument layout of every op kind: 'r'/'w' is a signal read/written by the
+# op, 'R'/'W' a list of them and '-' a constant
+OP_LAYOUT = {
+	'not': 'rw',
+	'and': 'rrw',
+	'or': 'rrw',
+	'nand': 'rrw',
+	'nor': 'rrw',
+	'xor': 'rrw',
+	'iand': 'rrw',
+	'copy': 'rw',
+	'const': '-w',
+	'band': 'rrw-',
+	'bor': 'rrw-',
+	'bnot': 'rw-',
+	'bit': 'r-w',
+	'pack': 'Rw',
+	'table': 'RW-',
+	'mux': 'RRw',
+	'demux': 'rRW',
+	'call': '-R-W-',
+	'tick_call': '-R-W-',
+}
+
+
+def op_signals(op: Tuple) -> Tuple[List[int], List[int]]:
+	""" return the (read, written) signal indexes of op """
+	reads: List[int] = []
+	writes: List[int] = []
+	for kind, arg in zip(OP_LAYOUT[op[0]], op[1:]):
+		if kind == 'r':
+			reads.append(arg)
+		elif kind == 'R':
+			reads.extend(arg)
+		elif kind == 'w':
+			writes.append(arg)
+		elif kind == 'W':
+			writes.extend(arg)
+	return reads, writes
+
+
+def map_op(op: Tuple, read, write) -> Tuple:
+	""" return a copy of op where every read signal x is replaced by read(x)
+	and every written signal by write(x). Reads are mapped first. """
+	layout = OP_LAYOUT[op[0]]
+	args = list(op[1:])
+	for pos, kind in enumerate(layout):
+		if kind == 'r':
+			args[pos] = read(args[pos])
+		elif kind == 'R':
+			args[pos] = [read(x) for x in args[pos]]
+	for pos, kind in enumerate(layout):
+		if kind == 'w':
+			args[pos] = write(args[pos])
+		elif kind == 'W':
+			args[pos] = [write(x) for x in args[pos]]
+	return (op[0], *args)
+
+
+class Netlist:
+	"""A flattened chip: a signal array plus ordered op lists.
+	ops are run by evaluate(), tick_ops by tick()."""
+
+	def __init__(self):
+		self.signals: List[Any] = []
+		self.names: Dict[str, int] = {}
+		self.inputs: List[str] = []
+		self.outputs: List[str] = []
+		self.ops: List[Tuple] = []
+		self.tick_ops: List[Tuple] = []
+		self.time = 0
+
+		self._program = None
+		self._tick_program = None
+
+	def slot(self, name: str) -> int:
+		""" return the signal index of pin name ("a", "and1.out", ...) """
+		try:
+			return self.names[name]
+		except KeyError:
+			raise IncorrectPinNameError(name)
+
+	def pin(self, name: str):
+		return self.signals[self.slot(name)]
+
+	def set_pin(self, name: str, value) -> None:
+		""" write a signal without evaluating the netlist """
+		self.signals[self.slot(name)] = value
+
+	def invalidate(self) -> None:
+		""" drop the executable programs, call it after editing ops """
+		self._program = None
+		self._tick_program = None
+
+	def _build(self, ops):
+		return [RUNNERS[op[0]](self, *op[1:]) for op in ops]
+
+	def _apply(self, inputs):
+		if inputs:
+			s = self.signals
+			for name, value in inputs.items():
+				s[self.slot(name)] = value
+
+	def read_outputs(self) -> Dict[str, Any]:
+		s = self.signals
+		names = self.names
+		return {name: s[names[name]] for name in self.outputs}
+
+	def evaluate(self, inputs: Dict[str, Any] = None) -> Dict[str, Any]:
+		""" set inputs, run the combinational ops and return the outputs """
+		if self._program is None:
+			self._program = self._build(self.ops)
+		self._apply(inputs)
+		s = self.signals
+		for run in self._program:
+			run(s)
+		return self.read_outputs()
+
+	def tick(self, value=None, inputs: Dict[str, Any] = None) -> Dict[str, Any]:
+		""" set inputs, run the clocked ops and return the outputs """
+		if self._tick_program is None:
+			self._tick_program = self._build(self.tick_ops)
+		self.time = self.time + 1 if value is None else value
+		self._apply(inputs)
+		s = self.signals
+		for run in self._tick_program:
+			run(s)
+		return self.read_outputs()
+
+
+class NetlistBuilder:
+	"""Helper used by chips to lower themselves into a Netlist"""
+
+	def __init__(self):
+		self.netlist = Netlist()
+		self.stream = self.netlist.ops
+
+	def signal(self, name: str, value=False) -> int:
+		""" return the index of signal name, allocating it with value """
+		names = self.netlist.names
+		idx = names.get(name)
+		if idx is None:
+			idx = len(self.netlist.signals)
+			self.netlist.signals.append(value)
+			names[name] = idx
+		return idx
+
+	def pin(self, chip: AbstractChip, prefix: str, pin_name: str) -> int:
+		""" return the signal index of chip pin_name, pin_name can be a
+		"partname.pinname" name """
+		return self.signal(prefix + pin_name, chip.pin(pin_name))
+
+	def pins(self, chip: AbstractChip, prefix: str, pin_names) -> List[int]:
+		return [self.pin(chip, prefix, name) for name in pin_names]
+
+	def emit(self, *op) -> None:
+		self.stream.append(op)
+
+	def lower(self, chip: AbstractChip, prefix: str = '') -> None:
+		""" emit the ops that evaluate chip once """
+		if not isinstance(chip, NotClockedChip):
+			raise ChipWiringError(f"{type(chip).__name__} can only be lowered on a clock tick")
+		chip.lower(self, prefix)
+
+	def lower_tick(self, chip: AbstractChip, prefix: str = '') -> None:
+		""" emit the ops that run chip on a clock tick """
+		if not isinstance(chip, ClockedChip):
+			raise ChipWiringError(f"{type(chip).__name__} is not a clocked chip")
+		chip.lower_tick(self, prefix)
+
+	def lower_opaque(self, chip: AbstractChip, prefix: str, kind: str = 'call') -> None:
+		""" emit an op that evaluates chip itself """
+		in_names = list(chip.layout.inputs)
+		out_names = list(chip.layout.outputs)
+		self.emit(kind, chip,
+			self.pins(chip, prefix, in_names), in_names,
+			self.pins(chip, prefix, out_names), out_names)
+
+	def lower_traced(self, chip: AbstractChip, prefix: str) -> None:
+		""" lower chip by tracing its wiring, fall back to an opaque op """
+		calls = _trace(chip, chip.wiring.resolve)
+		if calls is None:
+			self.lower_opaque(chip, prefix, 'call')
+		else:
+			self._replay(chip, prefix, calls)
+
+	def lower_traced_tick(self, chip: AbstractChip, prefix: str) -> None:
+		""" lower chip on_tick by tracing it, fall back to an opaque op """
+		calls = _trace(chip, lambda: chip.on_tick(None))
+		if calls is None:
+			self.lower_opaque(chip, prefix, 'tick_call')
+		else:
+			self._replay(chip, prefix, calls)
+
+	def _split(self, chip: AbstractChip, name: str):
+		""" return (part name, part) for a "partname.pinname" name, or (None, None)
+		for one of chip own pins """
+		if name in chip.layout.index:
+			return None, None
+		fields = name.split('.')
+		if len(fields) > 1 and fields[0] in chip.parts:
+			return fields[0], chip.parts[fields[0]]
+		raise IncorrectPinNameError(name)
+
+	def _replay(self, chip: AbstractChip, prefix: str, calls: List[Tuple]) -> None:
+		# combinational parts whose outputs may not match their inputs yet
+		dirty = {name for name, part in chip.parts.items() if isinstance(part, NotClockedChip)}
+
+		def lower_part(name):
+			self.lower(chip.parts[name], f"{prefix}{name}.")
+			dirty.discard(name)
+
+		for call in calls:
+			if call[0] == 'link':
+				_, pin_from, pin_to = call
+				name, part = self._split(chip, pin_from)
+				if name in dirty:
+					lower_part(name)
+				src = self.pin(chip, prefix, pin_from)
+				name, part = self._split(chip, pin_to)
+				self.emit('copy', src, self.pin(chip, prefix, pin_to))
+				if name is not None and isinstance(part, NotClockedChip) \
+					and part.layout.index.get(pin_to.split('.')[1], part.layout.n_inputs) < part.layout.n_inputs:
+					dirty.add(name)
+			elif call[0] == 'process':
+				if call[1] in dirty:
+					lower_part(call[1])
+			else:
+				self.lower_tick(chip.parts[call[1]], f"{prefix}{call[1]}.")
+
+		for name in list(chip.parts):
+			if name in dirty:
+				lower_part(name)
+
+
+def compile_chip(chip: AbstractChip) -> Netlist:
+	""" lower chip and all of its parts to a flat Netlist. Combinational chips
+	are evaluated with Netlist.evaluate, clocked chips with Netlist.tick """
+	builder = NetlistBuilder()
+	netlist = builder.netlist
+	netlist.inputs = list(chip.layout.inputs)
+	netlist.outputs = list(chip.layout.outputs)
+	builder.pins(chip, '', netlist.inputs)
+	builder.pins(chip, '', netlist.outputs)
+	if isinstance(chip, ClockedChip):
+		builder.stream = netlist.tick_ops
+		builder.lower_tick(chip)
+	else:
+		builder.lower(chip)
+	return netlist
+
+
+def single_assignment(netlist: Netlist) -> Netlist:
+	""" return a copy of netlist combinational ops where every signal is
+	written by at most one op: a signal that is written again, or written
+	after being read, gets a new index. Pin names refer to the last value
+	written. tick_ops are not copied. """
+	result = Netlist()
+	result.signals = list(netlist.signals)
+	result.inputs = list(netlist.inputs)
+	result.outputs = list(netlist.outputs)
+	current = list(range(len(netlist.signals)))
+	used = set()
+
+	def read(x):
+		used.add(x)
+		return current[x]
+
+	def write(x):
+		if x not in used:
+			used.add(x)
+			return x
+		current[x] = len(result.signals)
+		result.signals.append(netlist.signals[x])
+		return current[x]
+
+	result.ops = [map_op(op, read, write) for op in netlist.ops]
+	result.names = {name: current[idx] for name, idx in netlist.names.items()}
+	return result
@@ -0,0 +1,298 @@
+"""
+Netlist optimisation.
+
+optimize rewrites the combinational ops of a chip netlist (see
+core.netlist) into an equivalent, smaller op list:
+
+- constant propagation: ops whose inputs are all constants are evaluated
+  once, and ops with some constant inputs are simplified: an 'and' with a
+  False input is False, a truth table with a constant input (like the
+  carry_in of bit 0 of a FullAdder) becomes a smaller table, ...
+- copy propagation: 'copy' ops are dropped, their readers read the source
+- gate merging: 'and' or 'or' followed by 'not' become one 'nand' or
+  'nor', and the two 'and' plus 'or' structure of a Xor becomes one 'xor'
+- dead op elimination: ops that the outputs do not depend on are dropped
+
+The result keeps the pin names of the inputs, of the outputs and of the
+internal pins whose value is still computed. optimize_chip wraps it in a
+NetlistChip, a flat chip that can replace the original one.
+"""
+from collections import Counter
+from itertools import permutations
+from typing import List, Dict, Any, Tuple, Optional, Union
+
+from .chip import AbstractChip, NotClockedChip
+from .errors import ChipError
+from .netlist import Netlist, RUNNERS, compile_chip, single_assignment, op_signals, map_op
+from .truth_table import TruthTable
+
+
+# op kinds counted as gates by the report
+GATES = {'not', 'and', 'or', 'nand', 'nor', 'xor', 'iand', 'band', 'bor', 'bnot', 'table', 'mux', 'demux', 'call'}
+
+
+def _gates(ops) -> int:
+	return sum(1 for op in ops if op[0] in GATES)
+
+
+class OptimizationReport:
+	"""What optimize did to a netlist"""
+	__slots__ = ('ops_before', 'ops_after', 'gates_before', 'gates_after', 'folded', 'copies', 'merged', 'dead')
+
+	def __init__(self, ops: List[Tuple]):
+		self.ops_before = len(ops)
+		self.gates_before = _gates(ops)
+		self.ops_after = self.ops_before
+		self.gates_after = self.gates_before
+		self.folded = 0  # ops evaluated or simplified on constant inputs
+		self.copies = 0  # copy ops dropped
+		self.merged = 0  # gates merged into nand, nor and xor ops
+		self.dead = 0  # ops the outputs don't depend on
+
+	@property
+	def removed(self) -> int:
+		""" gates removed """
+		return self.gates_before - self.gates_after
+
+	def __repr__(self) -> str:
+		return f"OptimizationReport(gates {self.gates_before} -> {self.gates_after}, " \
+			f"ops {self.ops_before} -> {self.ops_after}, folded={self.folded}, " \
+			f"copies={self.copies}, merged={self.merged}, dead={self.dead})"
+
+
+def _partial(op: Tuple, const: Dict[int, Any]):
+	""" simplify op when some of its inputs are constants. Return a new op,
+	('alias', x) when op copies signal x, ('value', v) when it writes the
+	constant v, or None """
+	kind = op[0]
+	if kind in ('and', 'or', 'iand', 'xor', 'nand', 'nor'):
+		a, b, o = op[1:]
+		for x, y in ((a, b), (b, a)):
+			if x not in const:
+				continue
+			v = const[x]
+			if kind in ('and', 'iand'):
+				return ('alias', y) if v else ('value', v)
+			if kind == 'or':
+				return ('value', v) if v else ('alias', y)
+			if kind == 'nand':
+				return ('not', y, o) if v else ('value', True)
+			if kind == 'nor':
+				return ('value', False) if v else ('not', y, o)
+			if v in (0, 1):  # xor
+				return ('not', y, o) if v else ('alias', y)
+	elif kind == 'mux':
+		sels, ins, o = op[1:]
+		if all(x in const for x in sels):
+			sel = sum(int(const[x]) << bit for bit, x in enumerate(sels))
+			if sel < len(ins):
+				return ('alias', ins[sel])
+	elif kind == 'table':
+		ins, outs, table = op[1:]
+		fixed = {pos: const[x] for pos, x in enumerate(ins) if x in const}
+		if not fixed:
+			return None
+		f_map = {}
+		for key, values in table.items():
+			if all(key[pos] == value for pos, value in fixed.items()):
+				f_map[tuple(v for pos, v in enumerate(key) if pos not in fixed)] = values
+		if not f_map:
+			return None  # keep the op, it raises when evaluated
+		free = [x for pos, x in enumerate(ins) if pos not in fixed]
+		if isinstance(table, TruthTable):
+			f_map = TruthTable.compile(len(free), f_map) or f_map
+		return ('table', free, outs, f_map)
+	return None
+
+
+def _propagate(netlist: Netlist, report: OptimizationReport) -> Tuple[List[Tuple], Dict[int, int], Dict[int, Any]]:
+	""" constant and copy propagation. Return the ops, the aliases and the
+	constant signals """
+	alias: Dict[int, int] = {}
+	const: Dict[int, Any] = {}
+	signals = netlist.signals
+	ops = []
+
+	def read(x):
+		return alias.get(x, x)
+
+	def value(o, v):
+		const[o] = v
+		signals[o] = v
+
+	for op in netlist.ops:
+		op = map_op(op, read, lambda x: x)
+		kind = op[0]
+		if kind == 'copy':
+			a, o = op[1:]
+			if a in const:
+				value(o, const[a])
+			else:
+				alias[o] = a
+			report.copies += 1
+			continue
+		reads, writes = op_signals(op)
+		if kind not in ('call', 'tick_call') and all(x in const for x in reads):
+			s = {x: const[x] for x in reads}
+			try:
+				RUNNERS[kind](netlist, *op[1:])(s)
+			except ChipError:
+				ops.append(op)  # raises when evaluated
+				continue
+			for o in writes:
+				value(o, s[o])
+			report.folded += 1
+			continue
+		simplified = _partial(op, const)
+		if simplified is None:
+			ops.append(op)
+			continue
+		report.folded += 1
+		if simplified[0] == 'alias':
+			x = simplified[1]
+			if x in const:
+				value(op[-1], const[x])
+			else:
+				alias[op[-1]] = x
+		elif simplified[0] == 'value':
+			value(op[-1], simplified[1])
+		else:
+			ops.append(simplified)
+	return ops, alias, const
+
+
+def _not_of(ops: List[Optional[Tuple]], writer: Dict[int, int], x: int) -> Optional[int]:
+	""" return a if signal x is written by ('not', a, x) """
+	pos = writer.get(x)
+	if pos is not None and ops[pos] is not None and ops[pos][0] == 'not':
+		return ops[pos][1]
+	return None
+
+
+def _merge(netlist: Netlist, ops: List[Tuple], report: OptimizationReport) -> List[Tuple]:
+	""" merge and/or + not into nand/nor, and the Xor structure into xor """
+	ops: List[Optional[Tuple]] = list(ops)
+	writer: Dict[int, int] = {}
+	readers: Counter = Counter()
+	for pos, op in enumerate(ops):
+		reads, writes = op_signals(op)
+		readers.update(reads)
+		for x in writes:
+			writer[x] = pos
+	readers.update(netlist.names[name] for name in netlist.outputs)
+
+	def single(x, kind):
+		""" position of the kind op writing x, if x has no other reader """
+		pos = writer.get(x)
+		if pos is not None and readers[x] == 1 and ops[pos] is not None and ops[pos][0] == kind:
+			return pos
+		return None
+
+	for pos, op in enumerate(ops):
+		if op is None:
+			continue
+		if op[0] == 'not':
+			a, o = op[1:]
+			for kind, merged in (('and', 'nand'), ('or', 'nor')):
+				src = single(a, kind)
+				if src is not None:
+					ops[pos] = (merged, ops[src][1], ops[src][2], o)
+					ops[src] = None
+					report.merged += 1
+					break
+		elif op[0] == 'or':
+			p, q, o = op[1:]
+			p_pos, q_pos = single(p, 'and'), single(q, 'and')
+			if p_pos is None or q_pos is None:
+				continue
+			for x, not_y in permutations(ops[p_pos][1:3]):
+				y = _not_of(ops, writer, not_y)
+				if y is None:
+					continue
+				for not_x, y2 in permutations(ops[q_pos][1:3]):
+					if y2 == y and _not_of(ops, writer, not_x) == x:
+						ops[pos] = ('xor', x, y, o)
+						ops[p_pos] = ops[q_pos] = None
+						report.merged += 2
+						break
+				if ops[pos][0] == 'xor':
+					break
+	return [op for op in ops if op is not None]
+
+
+def _eliminate(netlist: Netlist, ops: List[Tuple], report: OptimizationReport) -> List[Tuple]:
+	""" drop the ops the outputs don't depend on. Opaque ops are kept """
+	live = {netlist.names[name] for name in netlist.outputs}
+	kept = []
+	for op in reversed(ops):
+		reads, writes = op_signals(op)
+		if op[0] in ('call', 'tick_call') or any(x in live for x in writes):
+			kept.append(op)
+			live.update(reads)
+		else:
+			report.dead += 1
+	kept.reverse()
+	return kept
+
+
+def optimize(chip: Union[AbstractChip, Netlist]) -> Tuple[Netlist, OptimizationReport]:
+	""" return an optimised copy of the combinational netlist of chip, and
+	the report of what was removed """
+	netlist = single_assignment(chip if isinstance(chip, Netlist) else compile_chip(chip))
+	report = OptimizationReport(netlist.ops)
+	ops, alias, const = _propagate(netlist, report)
+	netlist.names = {name: alias.get(x, x) for name, x in netlist.names.items()}
+	ops = _merge(netlist, ops, report)
+	ops = _eliminate(netlist, ops, report)
+
+	known = {netlist.names[name] for name in netlist.inputs} | set(const)
+	for op in ops:
+		known.update(op_signals(op)[1])
+	netlist.names = {name: x for name, x in netlist.names.items() if x in known or name in netlist.outputs}
+	netlist.ops = ops
+	netlist.invalidate()
+	report.ops_after = len(ops)
+	report.gates_after = _gates(ops)
+	return netlist, report
+
+
+class NetlistChip(NotClockedChip):
+	"""A combinational chip evaluated by a netlist, without parts"""
+	__slots__ = ('netlist', 'in_slots', 'out_slots')
+
+	def __init__(self, netlist: Netlist):
+		self.netlist = netlist
+		self.in_slots = [netlist.slot(name) for name in netlist.inputs]
+		self.out_slots = [netlist.slot(name) for name in netlist.outputs]
+		super().__init__(list(netlist.inputs), list(netlist.outputs))
+		self.pin_values[:] = [netlist.signals[x] for x in self.in_slots + self.out_slots]
+
+	def setup_wiring(self):
+		def f():
+			s = self.netlist.signals
+			values = self.pin_values
+			for pos, x in enumerate(self.in_slots):
+				s[x] = values[pos]
+			self.netlist.evaluate()
+			values[len(self.in_slots):] = [s[x] for x in self.out_slots]
+		return f
+
+	def lower(self, builder, prefix):
+		netlist = self.netlist
+		mapping = {x: builder.pin(self, prefix, name) for name, x in zip(netlist.inputs, self.in_slots)}
+
+		def signal(x):
+			if x not in mapping:
+				mapping[x] = builder.signal(f"{prefix}#{x}", netlist.signals[x])
+			return mapping[x]
+
+		for op in netlist.ops:
+			builder.emit(*map_op(op, signal, signal))
+		for name, x in zip(netlist.outputs, self.out_slots):
+			builder.emit('copy', signal(x), builder.pin(self, prefix, name))
+
+
+def optimize_chip(chip: AbstractChip) -> Tuple[NetlistChip, OptimizationReport]:
+	""" return a flat chip equivalent to chip, built from its optimised netlist """
+	netlist, report = optimize(chip)
+	return NetlistChip(netlist), report
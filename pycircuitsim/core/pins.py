@@ -0,0 +1,108 @@
+"""
+Compact pin storage.
+
+A chip keeps all its pin values in a single list, inputs first and then
+outputs. The position of every pin name is resolved once in a PinLayout,
+which is shared by all the chips with the same pin names while any of
+them is alive.
+"""
+from collections.abc import MutableMapping
+from weakref import WeakValueDictionary
+from typing import List, Dict, Tuple, Iterator, Any
+
+from .errors import IncorrectPinNameError
+
+
+class PinLayout:
+	"""Positions of the input and output pins of a chip"""
+	__slots__ = ('inputs', 'outputs', 'index', 'n_inputs', '__weakref__')
+
+	_shared: 'WeakValueDictionary[Tuple[Tuple[str, ...], Tuple[str, ...]], PinLayout]' = WeakValueDictionary()
+
+	def __init__(self, inputs: Tuple[str, ...], outputs: Tuple[str, ...]):
+		self.inputs = inputs
+		self.outputs = outputs
+		self.n_inputs = len(inputs)
+		self.index: Dict[str, int] = {}
+		for pos, name in enumerate(inputs + outputs):
+			self.index.setdefault(name, pos)
+
+	@classmethod
+	def get(cls, input_pins: List[str], output_pins: List[str]) -> 'PinLayout':
+		""" return the shared layout for these pin names """
+		key = (tuple(input_pins), tuple(output_pins))
+		layout = cls._shared.get(key)
+		if layout is None:
+			layout = cls._shared[key] = cls(*key)
+		return layout
+
+	def __len__(self) -> int:
+		return self.n_inputs + len(self.outputs)
+
+
+class PinView(MutableMapping):
+	"""Name based dict-like access to the input or output values of a chip,
+	kept for compatibility with the inPins/outPins dicts"""
+	__slots__ = ('values_', 'names', 'offset', 'index')
+
+	def __init__(self, values: List[Any], names: Tuple[str, ...], offset: int, index: Dict[str, int]):
+		self.values_ = values
+		self.names = names
+		self.offset = offset
+		self.index = index
+
+	def _position(self, name: str) -> int:
+		pos = self.index.get(name)
+		if pos is None or not self.offset <= pos < self.offset + len(self.names):
+			raise KeyError(name)
+		return pos
+
+	def __getitem__(self, name: str):
+		return self.values_[self._position(name)]
+
+	def __setitem__(self, name: str, value) -> None:
+		self.values_[self._position(name)] = value
+
+	def __delitem__(self, name: str) -> None:
+		raise IncorrectPinNameError(name)
+
+	def __contains__(self, name) -> bool:
+		pos = self.index.get(name)
+		return pos is not None and self.offset <= pos < self.offset + len(self.names)
+
+	def __iter__(self) -> Iterator[str]:
+		return iter(self.names)
+
+	def __len__(self) -> int:
+		return len(self.names)
+
+	def values(self):
+		return self.values_[self.offset:self.offset + len(self.names)]
+
+
+class PinRef:
+	"""A pin resolved once by AbstractChip.pin_ref. get() and set() skip the
+	name lookup; set() re-evaluates the owning chip like set_pin does when
+	the pin is an input of a combinational chip, write() never does."""
+	__slots__ = ('chip', 'values', 'pos', 'name', 'is_input')
+
+	def __init__(self, chip, pos: int, name: str, is_input: bool):
+		self.chip = chip
+		self.values = chip.pin_values
+		self.pos = pos
+		self.name = name
+		self.is_input = is_input
+
+	def get(self):
+		return self.values[self.pos]
+
+	def set(self, value) -> None:
+		self.values[self.pos] = value
+		if self.is_input:
+			self.chip.process()
+
+	def write(self, value) -> None:
+		self.values[self.pos] = value
+
+	def __repr__(self) -> str:
+		return f"PinRef({type(self.chip).__name__}, {self.name!r})"
@@ -0,0 +1,253 @@
+"""
+Profiling of chip evaluation.
+
+A Profiler wraps the hot paths of the simulator, Wiring.resolve,
+process_chip, propagate_tick and set_pin, and records for every chip
+instance how many times each was called, the cumulative and self time
+spent in the chip and the pin writes that did not change the pin value:
+
+	with Profiler() as profiler:
+		... clock.tick() ...
+	print(profiler.report())
+	profiler.write_collapsed("cpu.folded")
+
+The hooks are installed on enable() and the original methods are put back
+on disable(), so a simulation without an enabled profiler runs the
+unchanged code. Only chip classes defined when the profiler is enabled
+are hooked, and pin writes through pin handles (core.pins) or compiled
+netlists are not seen. Time is charged to a chip from the moment one of
+its hooks is entered until it returns, minus the time of the other chips
+it called: the self times of all the chips add up to the profiled time.
+
+The collapsed-stack file has one "chip;part;part self_ns" line per call
+path, the format read by flamegraph.pl and speedscope.
+"""
+from time import perf_counter_ns
+from typing import List, Dict, Any, Optional, Tuple
+
+from .chip import AbstractChip
+from .errors import ChipError
+from .netlist import _tracing_classes
+
+
+# hooked methods and the name of their counter
+_HOOKS = {'set_pin': 'writes', 'process_chip': 'processes', 'propagate_tick': 'ticks'}
+
+# the enabled profiler
+_active: Optional['Profiler'] = None
+
+
+def _same(old, value) -> bool:
+	""" True if writing value over old does not change the pin """
+	if old is value:
+		return True
+	try:
+		return type(old) is type(value) and bool(old == value)
+	except (TypeError, ValueError):  # e.g. arrays
+		return False
+
+
+def _subclasses(cls: type) -> List[type]:
+	found = []
+	for sub in cls.__subclasses__():
+		found.append(sub)
+		found.extend(_subclasses(sub))
+	return found
+
+
+class ChipStats:
+	"""Counters of one chip instance, or of every instance of a class"""
+	__slots__ = ('label', 'name', 'chip', 'evaluations', 'processes', 'ticks',
+		'writes', 'redundant', 'cumulative', 'self_time', 'active')
+
+	def __init__(self, label: str, name: str, chip=None):
+		self.label = label  # "Class#n" for an instance, the class name otherwise
+		self.name = name  # the class name
+		self.chip = chip
+		self.evaluations = 0  # Wiring.resolve calls
+		self.processes = 0  # process_chip calls on this chip as a part
+		self.ticks = 0  # propagate_tick calls on this chip as a part
+		self.writes = 0  # set_pin calls on its own pins
+		self.redundant = 0  # set_pin calls that left the pin unchanged
+		self.cumulative = 0  # ns, including the parts
+		self.self_time = 0  # ns, excluding the parts
+		self.active = 0  # frames of this chip on the stack
+
+	def add(self, other: 'ChipStats') -> None:
+		for name in ('evaluations', 'processes', 'ticks', 'writes', 'redundant', 'cumulative', 'self_time'):
+			setattr(self, name, getattr(self, name) + getattr(other, name))
+
+
+class Profiler:
+	"""Collects ChipStats for every chip evaluated while enabled"""
+
+	def __init__(self):
+		self.stats: Dict[int, ChipStats] = {}  # id(chip): stats
+		self.stacks: Dict[Tuple[str, ...], int] = {}  # call path: self ns
+		self._stack: List[list] = []  # [stats, child ns, path] frames
+		self._counts: Dict[str, int] = {}  # class name: instances seen
+		self._saved: List[Tuple[type, str, Any]] = []
+
+	@property
+	def enabled(self) -> bool:
+		return _active is self
+
+	def enable(self) -> 'Profiler':
+		""" install the hooks """
+		global _active
+		if _active is self:
+			return self
+		if _active is not None:
+			raise ChipError("another profiler is enabled")
+		traced = set(_tracing_classes.values())
+		wiring = AbstractChip.Wiring
+		self._hook(wiring, 'resolve', self._resolve_hook(wiring.__dict__['resolve']))
+		for cls in [AbstractChip] + _subclasses(AbstractChip):
+			if cls in traced:
+				continue
+			for name in _HOOKS:
+				original = cls.__dict__.get(name)
+				if original is not None:
+					self._hook(cls, name, self._hook_for(name, original))
+		_active = self
+		return self
+
+	def disable(self) -> None:
+		""" put the original methods back """
+		global _active
+		if _active is not self:
+			return
+		for cls, name, original in reversed(self._saved):
+			setattr(cls, name, original)
+		del self._saved[:]
+		del self._stack[:]
+		_active = None
+
+	def __enter__(self) -> 'Profiler':
+		return self.enable()
+
+	def __exit__(self, *exc) -> None:
+		self.disable()
+
+	def reset(self) -> None:
+		""" forget the collected stats """
+		self.stats.clear()
+		self.stacks.clear()
+		self._counts.clear()
+
+	def _hook(self, cls: type, name: str, hook) -> None:
+		self._saved.append((cls, name, cls.__dict__[name]))
+		hook.__name__ = name
+		hook.__doc__ = cls.__dict__[name].__doc__
+		setattr(cls, name, hook)
+
+	def _hook_for(self, name: str, original):
+		call = self._call
+		counter = _HOOKS[name]
+		if name == 'set_pin':
+			def hook(chip, pin_name, value):
+				pos = chip.layout.index.get(pin_name)
+				# writes to a part pin are counted by the part, super() calls
+				# by the overriding method
+				if pos is None or type(chip).set_pin is not hook:
+					return original(chip, pin_name, value)
+				stats = self._chip_stats(chip)
+				stats.writes += 1
+				if _same(chip.pin_values[pos], value):
+					stats.redundant += 1
+				return call(stats, original, chip, pin_name, value)
+		else:
+			def hook(chip, part_name, *args):
+				part = chip.parts.get(part_name)
+				if part is None or getattr(type(chip), name) is not hook:
+					return original(chip, part_name, *args)
+				stats = self._chip_stats(part)
+				setattr(stats, counter, getattr(stats, counter) + 1)
+				return call(stats, original, chip, part_name, *args)
+		return hook
+
+	def _resolve_hook(self, original):
+		def hook(wiring):
+			if wiring.chip is None:
+				return original(wiring)
+			stats = self._chip_stats(wiring.chip)
+			stats.evaluations += 1
+			return self._call(stats, original, wiring)
+		return hook
+
+	def _chip_stats(self, chip) -> ChipStats:
+		stats = self.stats.get(id(chip))
+		if stats is None or stats.chip is not chip:
+			name = type(chip).__name__
+			n = self._counts.get(name, 0)
+			self._counts[name] = n + 1
+			stats = self.stats[id(chip)] = ChipStats(f"{name}#{n}", name, chip)
+		return stats
+
+	def _call(self, stats: ChipStats, fn, *args):
+		""" run fn(*args) charging its time to stats """
+		stack = self._stack
+		if stack and stack[-1][0] is stats:  # still inside the same chip
+			return fn(*args)
+		path = (stack[-1][2] if stack else ()) + (stats.label,)
+		frame = [stats, 0, path]
+		stack.append(frame)
+		stats.active += 1
+		start = perf_counter_ns()
+		try:
+			return fn(*args)
+		finally:
+			elapsed = perf_counter_ns() - start
+			stack.pop()
+			stats.active -= 1
+			own = elapsed - frame[1]
+			stats.self_time += own
+			if not stats.active:  # a chip re-entered through another counts once
+				stats.cumulative += elapsed
+			if stack:
+				stack[-1][1] += elapsed
+			self.stacks[path] = self.stacks.get(path, 0) + own
+
+	def by_class(self) -> Dict[str, ChipStats]:
+		""" the stats summed over the instances of every chip class """
+		classes: Dict[str, ChipStats] = {}
+		for stats in self.stats.values():
+			total = classes.get(stats.name)
+			if total is None:
+				total = classes[stats.name] = ChipStats(stats.name, stats.name)
+			total.add(stats)
+		return classes
+
+	def report(self, limit: Optional[int] = 20) -> str:
+		""" tables of the limit instances and classes with the largest self
+		time, all of them if limit is None """
+		header = f"{'chip':<24} {'evals':>9} {'ticks':>9} {'writes':>9} {'redundant':>9} {'cum ms':>10} {'self ms':>10}"
+
+		def table(title, rows):
+			rows = sorted(rows, key=lambda s: s.self_time, reverse=True)[:limit]
+			lines = [title, header]
+			for s in rows:
+				lines.append(f"{s.label:<24} {s.evaluations:>9} {s.ticks:>9} {s.writes:>9} "
+					f"{s.redundant:>9} {s.cumulative / 1e6:>10.3f} {s.self_time / 1e6:>10.3f}")
+			return lines
+
+		lines = table('instances', self.stats.values()) + [''] + table('classes', self.by_class().values())
+		return '\n'.join(lines)
+
+	def collapsed(self, by_class: bool = False) -> List[str]:
+		""" the collapsed-stack lines, with class names instead of instance
+		labels if by_class """
+		stacks = self.stacks
+		if by_class:
+			names = {stats.label: stats.name for stats in self.stats.values()}
+			stacks = {}
+			for path, ns in self.stacks.items():
+				path = tuple(names.get(label, label) for label in path)
+				stacks[path] = stacks.get(path, 0) + ns
+		return [f"{';'.join(path)} {ns}" for path, ns in sorted(stacks.items()) if ns > 0]
+
+	def write_collapsed(self, path, by_class: bool = False) -> None:
+		""" write the collapsed-stack lines to the file at path """
+		with open(path, 'w') as f:
+			for line in self.collapsed(by_class):
+				f.write(line + '\n')
@@ -0,0 +1,214 @@
+"""
+Levelised evaluation of combinational circuits.
+
+The evaluation order is computed from the dependencies, with a
+utils.graph.Graph, instead of being written by hand:
+
+- LevelisedNetlist ranks the ops of a chip netlist (see core.netlist) and
+  runs every level one op kind at a time, with a single loop per kind.
+- LinkedChip is a chip wired by a list of links only: its parts are
+  evaluated level by level, in the order given by the links.
+
+Both raise CombinationalLoopError for a circuit with a cycle.
+"""
+from typing import List, Dict, Any, Tuple, Union
+
+from .chip import AbstractChip, NotClockedChip
+from .errors import IncorrectPinNameError
+from .netlist import Netlist, RUNNERS, compile_chip, single_assignment, op_signals
+from ..utils.graph import Graph
+
+
+def netlist_graph(netlist: Netlist) -> Graph:
+	""" return the graph of the netlist ops (by position): op b depends on op
+	a if it reads a signal written by a. The netlist must be in single
+	assignment form (see single_assignment) """
+	graph = Graph()
+	writer: Dict[int, int] = {}
+	for pos, op in enumerate(netlist.ops):
+		graph.add_node(pos)
+		for x in op_signals(op)[1]:
+			writer[x] = pos
+	for pos, op in enumerate(netlist.ops):
+		for x in set(op_signals(op)[0]):
+			if x in writer:
+				graph.add_link(writer[x], pos)
+	return graph
+
+
+def _batch_not(netlist, ops):
+	args = [op[1:] for op in ops]
+	def run(s):
+		for a, o in args:
+			s[o] = not s[a]
+	return run
+
+
+def _batch_and(netlist, ops):
+	args = [op[1:] for op in ops]
+	def run(s):
+		for a, b, o in args:
+			s[o] = s[a] and s[b]
+	return run
+
+
+def _batch_or(netlist, ops):
+	args = [op[1:] for op in ops]
+	def run(s):
+		for a, b, o in args:
+			s[o] = s[a] or s[b]
+	return run
+
+
+def _batch_xor(netlist, ops):
+	args = [op[1:] for op in ops]
+	def run(s):
+		for a, b, o in args:
+			s[o] = int(s[a]) ^ int(s[b])
+	return run
+
+
+def _batch_iand(netlist, ops):
+	args = [op[1:] for op in ops]
+	def run(s):
+		for a, b, o in args:
+			s[o] = int(s[a]) and int(s[b])
+	return run
+
+
+def _batch_copy(netlist, ops):
+	args = [op[1:] for op in ops]
+	def run(s):
+		for a, o in args:
+			s[o] = s[a]
+	return run
+
+
+BATCH_RUNNERS = {
+	'not': _batch_not,
+	'and': _batch_and,
+	'or': _batch_or,
+	'xor': _batch_xor,
+	'iand': _batch_iand,
+	'copy': _batch_copy,
+}
+
+
+def _batch(netlist, ops):
+	""" run ops of any kind, one after the other """
+	runs = [RUNNERS[op[0]](netlist, *op[1:]) for op in ops]
+	def run(s):
+		for op_run in runs:
+			op_run(s)
+	return run
+
+
+class LevelisedNetlist:
+	"""Evaluates a combinational chip level by level. The ops of a level do
+	not depend on each other and run grouped by kind."""
+
+	def __init__(self, chip: Union[AbstractChip, Netlist]):
+		netlist = chip if isinstance(chip, Netlist) else compile_chip(chip)
+		self.netlist = single_assignment(netlist)
+		self.graph = netlist_graph(self.netlist)
+		ops = self.netlist.ops
+		self.levels: List[List[Tuple]] = [[ops[pos] for pos in level] for level in self.graph.levels()]
+
+		self._program = []
+		for level in self.levels:
+			kinds: Dict[str, List[Tuple]] = {}
+			for op in level:
+				kinds.setdefault(op[0], []).append(op)
+			for kind, kind_ops in kinds.items():
+				if len(kind_ops) == 1:
+					op = kind_ops[0]
+					self._program.append(RUNNERS[kind](self.netlist, *op[1:]))
+				else:
+					self._program.append(BATCH_RUNNERS.get(kind, _batch)(self.netlist, kind_ops))
+
+	def pin(self, name: str):
+		return self.netlist.pin(name)
+
+	def evaluate(self, inputs: Dict[str, Any] = None) -> Dict[str, Any]:
+		""" set inputs, run the levels and return the outputs """
+		self.netlist._apply(inputs)
+		s = self.netlist.signals
+		for run in self._program:
+			run(s)
+		return self.netlist.read_outputs()
+
+
+class LinkedChip(NotClockedChip):
+	"""A combinational chip wired by (pin_from, pin_to) links between its own
+	pins and the pins of its parts, in any order. The parts are evaluated
+	level by level: a part runs once all the parts it reads from did."""
+	__slots__ = ('links', 'levels', 'schedule')
+
+	def __init__(self, input_pins: List[str], output_pins: List[str],
+		parts: Dict[str, NotClockedChip], links: List[Tuple[str, str]]):
+		self.links = list(links)
+		self.schedule = None
+		super().__init__(input_pins, output_pins)
+		for name, part in parts.items():
+			self.add_part(name, part)
+		self.levels = self._levelise()
+
+	def add_part(self, name: str, chip: Any):
+		""" add or replace a part. The pin handles of the schedule point at
+		the old parts, so it is built again on the next evaluation """
+		super().add_part(name, chip)
+		self.schedule = None
+		if hasattr(self, 'levels'):
+			self.levels = self._levelise()
+
+	def setup_wiring(self):
+		def f():
+			if self.schedule is None:
+				self.schedule = self._schedule()
+			for copies, processes in self.schedule:
+				for src, dst in copies:
+					dst.write(src.get())
+				for process in processes:
+					process()
+		return f
+
+	def _part(self, pin_name: str):
+		""" return the part name of a "partname.pinname" pin, None for a pin
+		of this chip """
+		if pin_name in self.layout.index:
+			return None
+		part, _, name = pin_name.partition('.')
+		if part not in self.parts or not name:
+			raise IncorrectPinNameError(pin_name)
+		return part
+
+	def _levelise(self) -> List[List[str]]:
+		graph = Graph()
+		for name in self.parts:
+			graph.add_node(name)
+		for pin_from, pin_to in self.links:
+			src, dst = self._part(pin_from), self._part(pin_to)
+			if src is not None and dst is not None:
+				graph.add_link(src, dst, (pin_from, pin_to))
+		return graph.levels()
+
+	def _links_to(self, part):
+		return [(pin_from, pin_to) for pin_from, pin_to in self.links if self._part(pin_to) == part]
+
+	def _schedule(self):
+		schedule = []
+		for level in self.levels + [[None]]:
+			copies = [(self.pin_ref(pin_from), self.pin_ref(pin_to))
+				for name in level for pin_from, pin_to in self._links_to(name)]
+			processes = [self.parts[name].process for name in level if name is not None]
+			schedule.append((copies, processes))
+		return schedule
+
+	def lower(self, builder, prefix):
+		for level in self.levels + [[None]]:
+			for name in level:
+				for pin_from, pin_to in self._links_to(name):
+					builder.emit('copy', builder.pin(self, prefix, pin_from), builder.pin(self, prefix, pin_to))
+			for name in level:
+				if name is not None:
+					builder.lower(self.parts[name], f"{prefix}{name}.")
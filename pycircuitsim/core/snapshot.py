@@ -0,0 +1,326 @@
+"""
+Checkpoint and restore of a simulation.
+
+snapshot copies the state of a chip tree: the pin values of every chip,
+the attributes named by the state_slots of its class (DataFlipFlop.data,
+Register.last_out, RAM.data, ...) and, optionally, the value of a clock.
+restore writes it back into the same chip tree, or into a new chip built
+the same way, so one booted chip can be forked into many runs:
+
+	booted = snapshot(cpu, clock)
+	for program in programs:
+		restore(cpu, booted, clock)
+		...
+
+Lists, arrays and memoryviews in the state (RAM contents) are kept as pages of PAGE_SIZE
+words. A snapshot taken with a base snapshot shares the pages that did not
+change with it, and restoring copies whole pages with slice assignments.
+to_bytes encodes a snapshot in a compact binary format, where pages of
+int zeros take one byte and, given a base, unchanged pages only refer to it.
+"""
+from array import array
+from copy import deepcopy
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+from .errors import ChipError
+
+
+PAGE_SIZE = 256
+MAGIC = b'PCSS\x01'
+
+# value tags of the binary format
+_FALSE, _TRUE, _NONE, _INT, _STR, _LIST, _TUPLE, _FLOAT, _PAGES = range(9)
+# page tags
+_ZERO, _BASE, _DATA = range(3)
+
+
+def _same_page(old, new) -> bool:
+	""" True if the pages hold the same values, of the same types for lists """
+	if old is new:
+		return True
+	if old != new:
+		return False
+	return not isinstance(new, list) or all(type(a) is type(b) for a, b in zip(old, new))
+
+
+def _zero_page(page) -> bool:
+	""" True if the page holds only int zeros """
+	if not isinstance(page, list):
+		return not any(page)
+	return all(type(value) is int and value == 0 for value in page)
+
+
+class Pages:
+	"""A list or array cut in pages; typecode is None for a list"""
+	__slots__ = ('pages', 'length', 'typecode')
+
+	def __init__(self, pages: List[Any], length: int, typecode: Optional[str]):
+		self.pages = pages
+		self.length = length
+		self.typecode = typecode
+
+	@classmethod
+	def cut(cls, data, base: Optional['Pages'] = None) -> 'Pages':
+		""" page the values of data, sharing the pages equal to the base ones """
+		typecode = getattr(data, 'typecode', None)
+		pages = [data[start:start + PAGE_SIZE] for start in range(0, len(data), PAGE_SIZE)]
+		if isinstance(data, memoryview):  # slices are views, copy them
+			typecode = data.format
+			pages = [array(typecode, page.tobytes()) for page in pages]
+		if base is not None and base.length == len(data) and base.typecode == typecode:
+			pages = [old if _same_page(old, new) else new for old, new in zip(base.pages, pages)]
+		return cls(pages, len(data), typecode)
+
+	def copy_into(self, data) -> None:
+		""" write the values back into data, which must have the same length """
+		if len(data) != self.length:
+			raise ChipError(f"cannot restore {self.length} values into {len(data)}")
+		for pos, page in enumerate(self.pages):
+			start = pos * PAGE_SIZE
+			data[start:start + len(page)] = page
+
+
+class Snapshot:
+	"""The state of a chip tree: for every chip (by "part.subpart" path, ''
+	for the root) its pin values and state slots, and the clock value"""
+	__slots__ = ('paths', 'pins', 'state', 'clock')
+
+	def __init__(self, paths: List[str], pins: List[Tuple], state: List[Dict[str, Any]], clock: Optional[int]):
+		self.paths = paths
+		self.pins = pins
+		self.state = state
+		self.clock = clock
+
+	def __repr__(self) -> str:
+		return f"Snapshot({len(self.paths)} chips, clock={self.clock})"
+
+	def to_bytes(self, base: Optional['Snapshot'] = None) -> bytes:
+		""" encode the snapshot; pages shared with base are stored as
+		references and need base to be decoded """
+		out = _Writer(self, base)
+		out.raw(MAGIC)
+		out.value(self.clock)
+		out.uint(len(self.paths))
+		for pos, path in enumerate(self.paths):
+			out.str(path)
+			out.value(self.pins[pos])
+			out.uint(len(self.state[pos]))
+			for name, value in self.state[pos].items():
+				out.str(name)
+				out.value(value, (pos, name))
+		return bytes(out.data)
+
+	@classmethod
+	def from_bytes(cls, data: bytes, base: Optional['Snapshot'] = None) -> 'Snapshot':
+		""" decode a snapshot encoded by to_bytes (with the same base) """
+		if data[:len(MAGIC)] != MAGIC:
+			raise ChipError("not a snapshot")
+		src = _Reader(data, len(MAGIC), base)
+		clock = src.value()
+		paths, pins, state = [], [], []
+		for pos in range(src.uint()):
+			paths.append(src.str())
+			pins.append(src.value())
+			slots = {}
+			for k in range(src.uint()):
+				name = src.str()
+				slots[name] = src.value((pos, name))
+			state.append(slots)
+		return cls(paths, pins, state, clock)
+
+
+def _zigzag(n: int) -> int:
+	return n << 1 if n >= 0 else ((-n) << 1) - 1
+
+
+class _Writer:
+	__slots__ = ('data', 'snapshot', 'base')
+
+	def __init__(self, snapshot: Snapshot, base: Optional[Snapshot]):
+		self.data = bytearray()
+		self.snapshot = snapshot
+		self.base = base
+
+	def raw(self, data: bytes) -> None:
+		self.data += data
+
+	def uint(self, n: int) -> None:
+		data = self.data
+		while n > 0x7f:
+			data.append(n & 0x7f | 0x80)
+			n >>= 7
+		data.append(n)
+
+	def str(self, text: str) -> None:
+		encoded = text.encode()
+		self.uint(len(encoded))
+		self.data += encoded
+
+	def value(self, value, slot=None) -> None:
+		if value is False:
+			self.data.append(_FALSE)
+		elif value is True:
+			self.data.append(_TRUE)
+		elif value is None:
+			self.data.append(_NONE)
+		elif isinstance(value, int):
+			self.data.append(_INT)
+			self.uint(_zigzag(value))
+		elif isinstance(value, str):
+			self.data.append(_STR)
+			self.str(value)
+		elif isinstance(value, float):
+			self.data.append(_FLOAT)
+			self.data += array('d', [value]).tobytes()
+		elif isinstance(value, (list, tuple)):
+			self.data.append(_LIST if isinstance(value, list) else _TUPLE)
+			self.uint(len(value))
+			for item in value:
+				self.value(item)
+		elif isinstance(value, Pages):
+			self.pages(value, slot)
+		else:
+			raise TypeError(f"cannot encode {type(value).__name__} values in a snapshot")
+
+	def _base_pages(self, slot) -> Optional[Pages]:
+		base = self.base
+		if base is None or slot is None:
+			return None
+		pos, name = slot
+		if pos < len(base.paths) and base.paths[pos] == self.snapshot.paths[pos]:
+			return base.state[pos].get(name)
+		return None
+
+	def pages(self, pages: Pages, slot) -> None:
+		self.data.append(_PAGES)
+		self.str(pages.typecode or '')
+		self.uint(pages.length)
+		base = self._base_pages(slot)
+		for pos, page in enumerate(pages.pages):
+			if base is not None and pos < len(base.pages) and _same_page(base.pages[pos], page):
+				self.data.append(_BASE)
+			elif _zero_page(page):
+				self.data.append(_ZERO)
+			else:
+				self.data.append(_DATA)
+				self.value(list(page))
+
+
+class _Reader:
+	__slots__ = ('data', 'pos', 'base')
+
+	def __init__(self, data: bytes, pos: int, base: Optional[Snapshot]):
+		self.data = data
+		self.pos = pos
+		self.base = base
+
+	def byte(self) -> int:
+		self.pos += 1
+		return self.data[self.pos - 1]
+
+	def uint(self) -> int:
+		n = shift = 0
+		while True:
+			b = self.byte()
+			n |= (b & 0x7f) << shift
+			if b < 0x80:
+				return n
+			shift += 7
+
+	def str(self) -> str:
+		size = self.uint()
+		self.pos += size
+		return bytes(self.data[self.pos - size:self.pos]).decode()
+
+	def value(self, slot=None):
+		tag = self.byte()
+		if tag == _FALSE:
+			return False
+		if tag == _TRUE:
+			return True
+		if tag == _NONE:
+			return None
+		if tag == _INT:
+			n = self.uint()
+			return n >> 1 if not n & 1 else -((n + 1) >> 1)
+		if tag == _STR:
+			return self.str()
+		if tag == _FLOAT:
+			self.pos += 8
+			return array('d', bytes(self.data[self.pos - 8:self.pos]))[0]
+		if tag in (_LIST, _TUPLE):
+			items = [self.value() for i in range(self.uint())]
+			return items if tag == _LIST else tuple(items)
+		if tag == _PAGES:
+			return self.pages(slot)
+		raise ChipError(f"corrupted snapshot: unknown tag {tag}")
+
+	def pages(self, slot) -> Pages:
+		typecode = self.str() or None
+		length = self.uint()
+		base = None
+		if self.base is not None and slot is not None:
+			pos, name = slot
+			if pos < len(self.base.state):
+				base = self.base.state[pos].get(name)
+		pages = []
+		for start in range(0, length, PAGE_SIZE):
+			size = min(PAGE_SIZE, length - start)
+			tag = self.byte()
+			if tag == _BASE:
+				if base is None:
+					raise ChipError("the snapshot refers to pages of a base snapshot")
+				pages.append(base.pages[start // PAGE_SIZE])
+				continue
+			values = [0] * size if tag == _ZERO else self.value()
+			pages.append(values if typecode is None else array(typecode, values))
+		return Pages(pages, length, typecode)
+
+
+def _walk(chip, path: str = '') -> Iterator[Tuple[str, Any]]:
+	yield path, chip
+	for name, part in getattr(chip, 'parts', {}).items():
+		yield from _walk(part, f"{path}.{name}" if path else name)
+
+
+def snapshot(chip, clock=None, base: Optional[Snapshot] = None) -> Snapshot:
+	""" return the state of chip, its parts and clock. Pages equal to those
+	of base are shared with it """
+	paths, pins, state = [], [], []
+	for pos, (path, part) in enumerate(_walk(chip)):
+		paths.append(path)
+		pins.append(tuple(part.pin_values))
+		old = base.state[pos] if base is not None and pos < len(base.paths) and base.paths[pos] == path else {}
+		slots = {}
+		for name in part.state_slots:
+			value = getattr(part, name)
+			if isinstance(value, (list, array, bytearray, memoryview)):
+				value = Pages.cut(value, old.get(name))
+			else:
+				value = deepcopy(value)
+			slots[name] = value
+		state.append(slots)
+	return Snapshot(paths, pins, state, None if clock is None else clock.value)
+
+
+def restore(chip, snap: Snapshot, clock=None) -> None:
+	""" write a snapshot back into chip, its parts and clock. chip must have
+	the structure of the snapshotted one. The clock is woken up, so that its
+	chips tick on the next edge even if their inputs look unchanged """
+	chips = list(_walk(chip))
+	if [path for path, part in chips] != snap.paths:
+		raise ChipError("the chip does not have the parts of the snapshot")
+	for pos, (path, part) in enumerate(chips):
+		if len(part.pin_values) != len(snap.pins[pos]):
+			raise ChipError(f"{path or 'the chip'} does not have the pins of the snapshot")
+	for pos, (path, part) in enumerate(chips):
+		part.pin_values[:] = snap.pins[pos]
+		for name, value in snap.state[pos].items():
+			if isinstance(value, Pages):
+				value.copy_into(getattr(part, name))
+			else:
+				setattr(part, name, deepcopy(value))
+	if clock is not None:
+		clock.wake()
+		if snap.clock is not None:
+			clock.value = snap.clock
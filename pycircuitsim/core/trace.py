@@ -0,0 +1,215 @@
+"""
+Waveform recording.
+
+A Tracer watches pins of a chip and of its parts, chosen with fnmatch
+patterns on their "partname.pinname" paths, and records only the values
+that changed since the last sample into a fixed size ring buffer:
+
+	tracer = Tracer(register, ['out', 'dff.*'])
+	tracer.attach(clock)
+	tracer.open("register.vcd")
+	... clock.tick() ...
+	tracer.close()
+
+An attached clock samples the tracer after every tick (time 2 * clock
+value) and tok (2 * clock value + 1). The buffer is written to the Value
+Change Dump file when it is full and on flush(); without an open file the
+oldest changes are overwritten and counted in dropped. A clock without a
+tracer only pays one "is None" check per tick.
+"""
+from fnmatch import fnmatchcase
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple, Union
+
+from .errors import ChipError
+
+
+# the value of a pin that was never sampled
+_UNSEEN = object()
+
+
+def _walk(chip, prefix: str = '') -> Iterator[Tuple[str, Any, int]]:
+	""" yield (path, chip, position) for the pins of chip and its parts """
+	for pos, name in enumerate(chip.layout.inputs + chip.layout.outputs):
+		yield prefix + name, chip, pos
+	for name, part in getattr(chip, 'parts', {}).items():
+		yield from _walk(part, f"{prefix}{name}.")
+
+
+def _code(n: int) -> str:
+	""" VCD identifier code number n, from the printable characters """
+	code = ''
+	while True:
+		code += chr(33 + n % 94)
+		n //= 94
+		if not n:
+			return code
+
+
+def _bits(value) -> int:
+	return value.bit_length() if isinstance(value, int) else 1
+
+
+class Tracer:
+	"""Change-only recorder of the pins of chip matching any of patterns.
+	capacity is the number of changes the ring buffer holds. widths gives
+	the VCD width of pins matching a pattern, the others are as wide as
+	the largest value seen before the header is written. Wider values
+	written later are truncated to the declared width."""
+
+	def __init__(self, chip, patterns: Sequence[str] = ('*',), capacity: int = 65536,
+		widths: Optional[Dict[str, int]] = None, scope: str = 'top', timescale: str = '1ns'):
+		if capacity < 1:
+			raise ValueError(f"capacity must be positive, not {capacity}")
+		if isinstance(patterns, str):
+			patterns = [patterns]
+		self.paths: List[str] = []
+		self._watch: List[Tuple[List[Any], int]] = []
+		for path, owner, pos in _walk(chip):
+			if any(fnmatchcase(path, pattern) for pattern in patterns):
+				self.paths.append(path)
+				self._watch.append((owner.pin_values, pos))
+		if not self.paths:
+			raise ChipError(f"no pin matches {', '.join(patterns)}")
+		self.widths = widths or {}
+		self.scope = scope
+		self.timescale = timescale
+		self.capacity = capacity
+		self.dropped = 0  # changes overwritten before being written
+		self._last: List[Any] = [_UNSEEN] * len(self.paths)
+		self._bits: List[int] = [1] * len(self.paths)
+		self._times: List[int] = [0] * capacity
+		self._pins: List[int] = [0] * capacity
+		self._values: List[Any] = [None] * capacity
+		self._start = 0
+		self._count = 0
+		self._file = None
+		self._owned = False
+		self._declared: Optional[List[int]] = None
+		self._time: Optional[int] = None
+		self._clock = None
+
+	def __len__(self) -> int:
+		""" number of changes in the buffer """
+		return self._count
+
+	def attach(self, clock) -> 'Tracer':
+		""" sample now, then after every tick and tok of clock """
+		self.detach()
+		clock.tracer = self
+		self._clock = clock
+		self.sample(2 * clock.value)
+		return self
+
+	def detach(self) -> None:
+		if self._clock is not None and self._clock.tracer is self:
+			self._clock.tracer = None
+		self._clock = None
+
+	def sample(self, time: int) -> None:
+		""" record the watched pins whose value changed since the last sample """
+		last = self._last
+		for i, (values, pos) in enumerate(self._watch):
+			value = values[pos]
+			if value is not last[i] and (type(value) is not type(last[i]) or value != last[i]):
+				last[i] = value
+				self._record(time, i, value)
+
+	def _record(self, time: int, pin: int, value) -> None:
+		if self._count == self.capacity:
+			if self._file is not None:
+				self.flush()
+			else:
+				self._start = (self._start + 1) % self.capacity
+				self._count -= 1
+				self.dropped += 1
+		end = (self._start + self._count) % self.capacity
+		self._times[end] = time
+		self._pins[end] = pin
+		self._values[end] = value
+		self._count += 1
+		if self._declared is None and _bits(value) > self._bits[pin]:
+			self._bits[pin] = _bits(value)
+
+	def changes(self) -> Iterator[Tuple[int, str, Any]]:
+		""" yield the (time, path, value) changes in the buffer, oldest first """
+		for k in range(self._count):
+			pos = (self._start + k) % self.capacity
+			yield self._times[pos], self.paths[self._pins[pos]], self._values[pos]
+
+	def open(self, file: Union[str, Any]) -> 'Tracer':
+		""" start writing to a VCD file, a path or a text file object """
+		self.close()
+		if isinstance(file, str) or hasattr(file, '__fspath__'):
+			self._file = open(file, 'w')
+			self._owned = True
+		else:
+			self._file = file
+			self._owned = False
+		self._declared = None
+		self._time = None
+		return self
+
+	def _width(self, pin: int) -> int:
+		path = self.paths[pin]
+		for pattern, width in self.widths.items():
+			if fnmatchcase(path, pattern):
+				return width
+		return self._bits[pin]
+
+	def _header(self) -> None:
+		self._declared = [self._width(pin) for pin in range(len(self.paths))]
+		lines = [f"$timescale {self.timescale} $end", f"$scope module {self.scope} $end"]
+		scope: List[str] = []
+		for pin, path in sorted(enumerate(self.paths), key=lambda item: item[1].split('.')[:-1]):
+			*parts, name = path.split('.')
+			while scope != parts[:len(scope)]:
+				scope.pop()
+				lines.append("$upscope $end")
+			for part in parts[len(scope):]:
+				scope.append(part)
+				lines.append(f"$scope module {part} $end")
+			lines.append(f"$var wire {self._declared[pin]} {_code(pin)} {name} $end")
+		lines.extend(["$upscope $end"] * (len(scope) + 1))
+		lines.append("$enddefinitions $end")
+		self._file.write('\n'.join(lines) + '\n')
+
+	def _value(self, pin: int, value) -> str:
+		width = self._declared[pin]
+		if not isinstance(value, int):
+			return f"x{_code(pin)}" if width == 1 else f"bx {_code(pin)}"
+		value &= (1 << width) - 1
+		if width == 1:
+			return f"{value}{_code(pin)}"
+		return f"b{value:b} {_code(pin)}"
+
+	def flush(self) -> None:
+		""" write the buffered changes to the open VCD file and empty the buffer """
+		if self._file is None:
+			raise ChipError("the tracer has no open VCD file")
+		if self._declared is None:
+			self._header()
+		out = []
+		for time, pin, value in self._drain():
+			if time != self._time:
+				self._time = time
+				out.append(f"#{time}")
+			out.append(self._value(pin, value))
+		if out:
+			self._file.write('\n'.join(out) + '\n')
+		self._file.flush()
+
+	def _drain(self) -> Iterator[Tuple[int, int, Any]]:
+		while self._count:
+			pos = self._start
+			self._start = (pos + 1) % self.capacity
+			self._count -= 1
+			yield self._times[pos], self._pins[pos], self._values[pos]
+
+	def close(self) -> None:
+		""" flush and close the VCD file """
+		if self._file is None:
+			return
+		self.flush()
+		if self._owned:
+			self._file.close()
+		self._file = None
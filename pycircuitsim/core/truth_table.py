@@ -0,0 +1,77 @@
+"""
+Truth tables compiled to dense lookup tables.
+
+A TruthTable is indexed by the packed inputs (bit i of the index is input i)
+and stores, for every index, the output tuple. Identical tables are shared:
+TruthTable.compile returns the same object for equal mappings.
+"""
+from typing import List, Dict, Any, Tuple, Optional, Iterable
+from weakref import WeakValueDictionary
+
+from .errors import ChipWiringError
+
+
+BIT = {False: 0, True: 1}
+
+
+def _is_bit(value) -> bool:
+	try:
+		return value in BIT
+	except TypeError:
+		return False
+
+
+class TruthTable:
+	"""A boolean function of n_inputs inputs compiled to a dense table"""
+
+	_shared: 'WeakValueDictionary[Any, TruthTable]' = WeakValueDictionary()
+
+	def __init__(self, n_inputs: int, f_map: Dict[Tuple[Any, ...], Tuple[Any, ...]]):
+		self.n_inputs = n_inputs
+		self.rows: List[Optional[Tuple[Any, ...]]] = [None] * (1 << n_inputs)
+		for key, values in f_map.items():
+			if len(key) != n_inputs:
+				continue  # can't match any input
+			index = self.index(key)
+			self.rows[index] = tuple(values)
+
+	@classmethod
+	def compile(cls, n_inputs: int, f_map: Dict[Tuple[Any, ...], Tuple[Any, ...]]) -> Optional['TruthTable']:
+		""" return the shared table for f_map, or None if some f_map input
+		is not a boolean """
+		if not all(_is_bit(v) for key in f_map for v in key):
+			return None
+		try:
+			rows = sorted((sum(BIT[v] << pos for pos, v in enumerate(key)), tuple(values), tuple(map(type, values)))
+				for key, values in f_map.items() if len(key) == n_inputs)
+			key = (n_inputs, tuple(rows))
+			table = cls._shared.get(key)
+		except TypeError:  # unhashable outputs
+			return cls(n_inputs, f_map)
+		if table is None:
+			table = cls(n_inputs, f_map)
+			cls._shared[key] = table
+		return table
+
+	def index(self, values: Iterable[Any]) -> int:
+		""" return the row index of the input values """
+		index = 0
+		try:
+			for pos, value in enumerate(values):
+				index |= BIT[value] << pos
+		except (KeyError, TypeError):
+			raise ChipWiringError("Mapping not found")
+		return index
+
+	def row(self, values: Iterable[Any]) -> Tuple[Any, ...]:
+		""" return the outputs for the input values """
+		row = self.rows[self.index(values)]
+		if row is None:
+			raise ChipWiringError("Mapping not found")
+		return row
+
+	def items(self):
+		""" iterate over (inputs, outputs) of the defined rows """
+		for index, row in enumerate(self.rows):
+			if row is not None:
+				yield tuple(bool(index >> pos & 1) for pos in range(self.n_inputs)), row
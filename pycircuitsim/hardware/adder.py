@@ -2,6 +2,7 @@
 """
 
 from ..core.chip import Chip, MultiBitChip, BooleanFunctionChip
+from ..core.batch import bitwise
 
 
 
@@ -12,7 +13,7 @@ def _twobit_adder_wiring(chip : Chip, bit):
 
 		chip.set_pin(f"adder{bit}.a", a)
 		chip.set_pin(f"adder{bit}.b", b)
-		if bit == 0 or bit == len(chip.parts)-1:
+		if bit == 0:
 			chip.set_pin(f"adder{bit}.carry_in", False)
 	
 		chip.process_chip(f'adder{bit}')
@@ -25,22 +26,47 @@ def _twobit_adder_wiring(chip : Chip, bit):
 		# print(chip.pin('out0'))
 
 
+FULL_ADDER_TABLE = {
+	(False, False, False): (False, False),
+	(True, False, False): (True, False),
+	(False, True, False): (True, False),
+	(True, True, False): (False, True),
+	(False, False, True): (True, False),
+	(True, False, True): (False, True),
+	(False, True, True): (False, True),
+	(True, True, True): (True, True)
+}
+
+
 class FullAdder(MultiBitChip):
+	__slots__ = ()
 
 	def __init__(self, n_bits,):
 		super().__init__(n_bits, 2, 1, _twobit_adder_wiring)
 		
 		for b in range(n_bits):
-			self.add_part(f'adder{b}', BooleanFunctionChip(['a', 'b', 'carry_in'], ['sum', 'carry_out'], {
-				(False, False, False): (False, False),
-				(True, False, False): (True, False),
-				(False, True, False): (True, False),
-				(True, True, False): (False, True),
-				(False, False, True): (True, False),
-				(True, False, True): (False, True),
-				(False, True, True): (False, True),
-				(True, True, True): (True, True)
-			}))
+			self.add_part(f'adder{b}', BooleanFunctionChip(['a', 'b', 'carry_in'], ['sum', 'carry_out'], FULL_ADDER_TABLE))
+
+	def lower(self, builder, prefix):
+		in0, in1, out0 = builder.pins(self, prefix, ['in0', 'in1', 'out0'])
+		sums = []
+		for bit in range(self.n_bits):
+			adder = f"adder{bit}"
+			a, b, carry_in, out_sum = builder.pins(self, prefix,
+				[f"{adder}.a", f"{adder}.b", f"{adder}.carry_in", f"{adder}.sum"])
+			builder.emit('bit', in0, bit, a)
+			builder.emit('bit', in1, bit, b)
+			if bit == 0:
+				builder.emit('const', False, carry_in)
+			else:
+				builder.emit('copy', builder.pin(self, prefix, f"adder{bit-1}.carry_out"), carry_in)
+			builder.lower(self.parts[adder], f"{prefix}{adder}.")
+			sums.append(out_sum)
+		builder.emit('pack', sums, out0)
+
+	def evaluate_batch(self, inputs):
+		columns = self.batch_columns(inputs, ['in0', 'in1'])
+		return {'out0': bitwise(lambda a, b, mask: ((a & mask) + (b & mask)) & mask, columns, self.n_bits)}
 
 
 	
@@ -1,12 +1,37 @@
+import heapq
+
+
+# entry of a chip that did not sample on this tick
+_IDLE = object()
 
 
 class Clock:
-	
+	"""Calls on_tick of the subscribed chips on every tick and on_tok on
+	every tok. A chip whose class sets tick_on_change is skipped when its
+	input pins did not change since its last tick (see AbstractChip).
+
+	A tick has two phases. First every two_phase chip returns its next state
+	from sample(), then the other chips run on_tick in subscription order,
+	then every sampled state is published. The order independence comes
+	from this split alone, there are no swapped state buffers: no two_phase
+	chip subscribed to the clock sees an output changed by the same tick,
+	whatever the subscription order, while a single phase chip sees the
+	outputs of the single phase chips subscribed before it already updated
+	and those of the two_phase chips not updated yet. Parts ticked by a
+	composite chip (propagate_tick) run in the order the composite calls
+	them."""
+
 	def __init__(self):
 		super().__init__()
 		self.tick_subscribed = []
 		self.tok_subscribed = []
 		self.value =  0
+		self.tracer = None  # see core.trace
+		self.skipped = 0  # on_tick calls skipped on idle chips
+		# id(chip): (chip, input values at its last tick). Keeping the chip
+		# keeps its id from being reused by another one
+		self._inputs = {}
+		self._next = []  # scratch list of the states sampled on this tick
 
 	def subscribe_to_tick(self, chip):
 		self.tick_subscribed.append(chip)
@@ -14,11 +39,139 @@ class Clock:
 	def subscribe_to_tok(self, chip):
 		self.tok_subscribed.append(chip)
 
+	def wake(self, chip=None):
+		""" make chip (every chip by default) tick on the next edge even if
+		its inputs did not change, e.g. after its state was restored """
+		if chip is None:
+			self._inputs.clear()
+		else:
+			self._inputs.pop(id(chip), None)
+
+	def _idle(self, chip) -> bool:
+		""" True if the inputs of chip did not change since its last tick """
+		values = chip.pin_values
+		inputs = values[:chip.layout.n_inputs]
+		last = self._inputs.get(id(chip))
+		if last is not None and last[0] is chip:
+			last = last[1]
+			if inputs == last and all(type(a) is type(b) for a, b in zip(inputs, last)):
+				return True
+		self._inputs[id(chip)] = (chip, inputs)
+		return False
+
+	def _tick(self) -> int:
+		""" run the tick edge, return the number of chips that ticked """
+		value = self.value
+		chips = self.tick_subscribed
+		if len(self._next) != len(chips):
+			self._next = [_IDLE] * len(chips)
+		next_state = self._next
+		single_phase = []
+		for pos, chip in enumerate(chips):
+			if chip.tick_on_change and self._idle(chip):
+				next_state[pos] = _IDLE
+			elif chip.two_phase:
+				next_state[pos] = chip.sample(value)
+			else:
+				next_state[pos] = _IDLE
+				single_phase.append(chip)
+		for chip in single_phase:
+			chip.on_tick(value)
+		ticked = len(single_phase)
+		for pos, state in enumerate(next_state):
+			if state is not _IDLE:
+				chips[pos].publish(state)
+				ticked += 1
+		self.skipped += len(chips) - ticked
+		return ticked
+
 	def tick(self):
 		self.value += 1
-		for subscribed in self.tick_subscribed:
-			subscribed.on_tick(self.value)
+		self._tick()
+		if self.tracer is not None:
+			self.tracer.sample(2 * self.value)
 
 	def tok(self):
 		for subscribed in self.tok_subscribed:
-			subscribed.on_tok(self.value)
\ No newline at end of file
+			subscribed.on_tok(self.value)
+		if self.tracer is not None:
+			self.tracer.sample(2 * self.value + 1)
+
+	def run(self, cycles: int) -> None:
+		""" run cycles tick and tok edges. Once every subscribed chip is idle
+		and there are no tok subscribers, nothing can change any more and
+		the remaining cycles are skipped at once """
+		end = self.value + cycles
+		tok = self.tok_subscribed
+		skippable = all(chip.tick_on_change for chip in self.tick_subscribed)
+		while self.value < end:
+			self.value += 1
+			ticked = self._tick()
+			if self.tracer is not None:
+				self.tracer.sample(2 * self.value)
+			if tok:
+				self.tok()
+			elif skippable and not ticked:
+				self.skipped += (end - self.value) * len(self.tick_subscribed)
+				self.value = end
+
+
+class ClockScheduler:
+	"""Runs several clock domains over a shared time line. A domain ticks
+	every period time units from phase, or from the first time after the
+	current one equal to phase modulo period when phase is past: periods
+	1 and 4 give a domain running four times faster than the other.
+	Domains due at the same time tick in the order they were added, each
+	with tick then tok."""
+
+	def __init__(self):
+		self.time = 0
+		self.domains = {}
+		self._queue = []
+
+	def add_domain(self, name: str, period: int = 1, phase: int = 0, clock: Clock = None) -> Clock:
+		""" add a clock domain and return its clock """
+		if period < 1:
+			raise ValueError(f"period must be positive, not {period}")
+		if name in self.domains:
+			raise ValueError(f"clock domain {name} already exists")
+		clock = clock or Clock()
+		if phase > self.time:
+			first = phase
+		else:  # the edges at the current time already ran
+			first = self.time + ((phase - self.time) % period or period)
+		heapq.heappush(self._queue, (first, len(self.domains), period, clock))
+		self.domains[name] = clock
+		return clock
+
+	def __getitem__(self, name: str) -> Clock:
+		return self.domains[name]
+
+	def next_time(self) -> int:
+		""" time of the next edge """
+		return self._queue[0][0]
+
+	def step(self) -> int:
+		""" tick every domain due at the next edge time, return that time """
+		queue = self._queue
+		self.time = time = queue[0][0]
+		while queue and queue[0][0] == time:
+			time, order, period, clock = heapq.heappop(queue)
+			clock.tick()
+			clock.tok()
+			heapq.heappush(queue, (time + period, order, period, clock))
+		return time
+
+	def run(self, until: int) -> None:
+		""" run every edge up to time until. A single domain runs its cycles
+		with Clock.run """
+		if len(self._queue) == 1:
+			time, order, period, clock = self._queue[0]
+			if time <= until:
+				cycles = (until - time) // period + 1
+				clock.run(cycles)
+				self._queue[0] = (time + cycles * period, order, period, clock)
+				self.time = time + (cycles - 1) * period
+			return
+		while self._queue and self._queue[0][0] <= until:
+			self.step()
@@ -1,7 +1,11 @@
 from ..core.chip import  Chip, NotClockedChip
+from ..core.errors import IncorrectPinNameError
+from ..core.batch import bitwise
 
 
 class Not(NotClockedChip):
+	__slots__ = ()
+
 	def __init__(self):
 		super().__init__(input_pins=['a'], output_pins=['out'])
 
@@ -10,8 +14,13 @@ class Not(NotClockedChip):
 			self.set_pin('out', not self.pin('a'))
 		return f
 
+	def lower(self, builder, prefix):
+		builder.emit('not', *builder.pins(self, prefix, ['a', 'out']))
+
 
 class Or(NotClockedChip):
+	__slots__ = ()
+
 	def __init__(self):
 		super().__init__(input_pins=['a', 'b'], output_pins=['out'])
 
@@ -20,10 +29,13 @@ class Or(NotClockedChip):
 			self.set_pin('out', self.pin('a') or self.pin('b'))
 		return f
 
-	def process(self):
-		self.wiring.resolve()
+	def lower(self, builder, prefix):
+		builder.emit('or', *builder.pins(self, prefix, ['a', 'b', 'out']))
+
 
 class And(NotClockedChip):
+	__slots__ = ()
+
 	def __init__(self):
 		super().__init__(input_pins=['a', 'b'], output_pins=['out'])
 
@@ -32,9 +44,12 @@ class And(NotClockedChip):
 			self.set_pin('out', self.pin('a') and self.pin('b'))
 		return f
 
-	def process(self):
-		self.wiring.resolve()
+	def lower(self, builder, prefix):
+		builder.emit('and', *builder.pins(self, prefix, ['a', 'b', 'out']))
+
+
 class Nand(NotClockedChip):
+	__slots__ = ()
 
 	def __init__(self):
 		super().__init__(input_pins=['a', 'b'], output_pins=['out'])
@@ -58,6 +73,8 @@ class Nand(NotClockedChip):
 
 
 class Xor(NotClockedChip):
+	__slots__ = ()
+
 	def __init__(self):
 		super().__init__(input_pins=['a', 'b'], output_pins=['out'])
 		self.add_part('not1', Not())
@@ -114,6 +131,7 @@ class Xor(NotClockedChip):
 
 
 class AndMultiWay(Chip):
+	__slots__ = ('n_bits',)
 
 	def __init__(self, n_bits=2):
 		super().__init__([f"{i}" for i in range(n_bits)], ['out'])
@@ -139,6 +157,8 @@ class AndMultiWay(Chip):
 
 
 class MultiBitAnd(Chip):
+	__slots__ = ('bits',)
+
 	def __init__(self, bits):
 		super().__init__(input_pins=['a', 'b'], output_pins=['out'])
 		self.bits = bits
@@ -154,7 +174,16 @@ class MultiBitAnd(Chip):
 			self.set_pin('out', out)
 		return f
 
+	def lower(self, builder, prefix):
+		builder.emit('band', *builder.pins(self, prefix, ['a', 'b', 'out']), (1 << self.bits) - 1)
+
+	def evaluate_batch(self, inputs):
+		columns = self.batch_columns(inputs, ['a', 'b'])
+		return {'out': bitwise(lambda a, b, mask: a & b & mask, columns, self.bits)}
+
 class MultiBitOr(Chip):
+	__slots__ = ('bits',)
+
 	def __init__(self, bits):
 		super().__init__(input_pins=['a', 'b'], output_pins=['out'])
 		self.bits = bits
@@ -170,7 +199,16 @@ class MultiBitOr(Chip):
 			self.set_pin('out', out)
 		return f
 
+	def lower(self, builder, prefix):
+		builder.emit('bor', *builder.pins(self, prefix, ['a', 'b', 'out']), (1 << self.bits) - 1)
+
+	def evaluate_batch(self, inputs):
+		columns = self.batch_columns(inputs, ['a', 'b'])
+		return {'out': bitwise(lambda a, b, mask: (a | b) & mask, columns, self.bits)}
+
 class MultiBitNot(Chip):
+	__slots__ = ('bits',)
+
 	def __init__(self, bits):
 		super().__init__(input_pins=['a'], output_pins=['out'])
 		self.bits = bits
@@ -187,7 +225,16 @@ class MultiBitNot(Chip):
 			self.set_pin('out', out)
 		return f
 
+	def lower(self, builder, prefix):
+		builder.emit('bnot', *builder.pins(self, prefix, ['a', 'out']), (1 << self.bits) - 1)
+
+	def evaluate_batch(self, inputs):
+		columns = self.batch_columns(inputs, ['a'])
+		return {'out': bitwise(lambda a, mask: ~a & mask, columns, self.bits)}
+
 class HalfAdder(Chip):
+	__slots__ = ()
+
 	def __init__(self):
 		super().__init__(input_pins=['a', 'b'], output_pins=['sum', 'carry'])
 
@@ -200,8 +247,15 @@ class HalfAdder(Chip):
 			self.set_pin('carry', a and b)
 		return f
 
+	def lower(self, builder, prefix):
+		a, b, out_sum, carry = builder.pins(self, prefix, ['a', 'b', 'sum', 'carry'])
+		builder.emit('xor', a, b, out_sum)
+		builder.emit('iand', a, b, carry)
+
 
 class DemuxNWay(Chip):
+	__slots__ = ('n',)
+
 	def __init__(self, n):
 		inputs = ['in']
 		inputs.extend([f"sel{i}" for i in range(n)])
@@ -209,22 +263,32 @@ class DemuxNWay(Chip):
 		self.n = n
 
 	def reset_out_pins(self):
-		for i in range(self.n**2):
-			self.set_pin(f"out{i}", False)
+		self.pin_values[self.n + 1:] = [False] * (self.n**2)
 
 	def setup_wiring(self):
 		def f():
+			values = self.pin_values # in, sel0..selN-1, out0..
 			sel_value = 0
 			for bit in range(self.n):
-				v = int(self.pin(f'sel{bit}'))
+				v = int(values[1 + bit])
 				sel_value |= v << bit
 
 			self.reset_out_pins()
-			self.set_pin(f'out{sel_value}', self.pin("in"))
+			if sel_value >= self.n**2:
+				raise IncorrectPinNameError(f'out{sel_value}')
+			values[self.n + 1 + sel_value] = values[0]
 		return f
 
+	def lower(self, builder, prefix):
+		builder.emit('demux',
+			builder.pin(self, prefix, 'in'),
+			builder.pins(self, prefix, [f"sel{i}" for i in range(self.n)]),
+			builder.pins(self, prefix, [f"out{i}" for i in range(self.n**2)]))
+
 
 class MuxNWay(Chip):
+	__slots__ = ('n',)
+
 	def __init__(self, n):
 		inputs = [f"sel{i}" for i in range(n)]
 		inputs.extend([f"in{i}" for i in range(2**n)])
@@ -232,15 +296,21 @@ class MuxNWay(Chip):
 		self.n = n
 
 	def reset_out_pins(self):
-		for i in range(self.n**2):
-			self.set_pin(f"out", False)
+		self.pin_values[-1] = False
 
 	def setup_wiring(self):
 		def f():
+			values = self.pin_values # sel0..selN-1, in0.., out
 			sel_value = 0
 			for bit in range(self.n):
-				v = int(self.pin(f'sel{bit}'))
+				v = int(values[bit])
 				sel_value |= v << bit
 			self.reset_out_pins()
-			self.set_pin('out', self.pin(f"in{sel_value}"))
+			values[-1] = values[self.n + sel_value]
 		return f
+
+	def lower(self, builder, prefix):
+		builder.emit('mux',
+			builder.pins(self, prefix, [f"sel{i}" for i in range(self.n)]),
+			builder.pins(self, prefix, [f"in{i}" for i in range(2**self.n)]),
+			builder.pin(self, prefix, 'out'))
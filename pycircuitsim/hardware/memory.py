@@ -1,12 +1,18 @@
+import mmap
+import os
 from abc import abstractmethod
-from typing import List, Dict
-from math import log2
+from array import array
+from typing import List, Dict, Optional
 from ..core.chip import   ClockedChip, NotClockedChip
 from ..hardware.logic_gates import MuxNWay
 
 from .clock import Clock
 
 class DataFlipFlop(ClockedChip):
+	__slots__ = ('data', 'wait_for_tick')
+	state_slots = ('data', 'wait_for_tick')
+	tick_on_change = True
+	two_phase = True
 
 	def __init__(self):
 		super().__init__(['in'], ['out'])
@@ -15,8 +21,14 @@ class DataFlipFlop(ClockedChip):
 		self.wait_for_tick = False
 
 	def on_tick(self, value):
+		self.publish(self.sample(value))
+
+	def sample(self, params=None):
+		return self.pin('in')
+
+	def publish(self, state):
 		self.wait_for_tick = False
-		self.data = self.pin('in')
+		self.data = state
 		self.wiring.resolve()
 
 	def setup_wiring(self):
@@ -24,8 +36,15 @@ class DataFlipFlop(ClockedChip):
 			self.set_pin('out', self.data)
 		return f
 
+	def lower_tick(self, builder, prefix):
+		builder.emit('copy', *builder.pins(self, prefix, ['in', 'out']))
+
 
 class Register(ClockedChip):
+	__slots__ = ('nbits', 'last_out')
+	state_slots = ('last_out',)
+	tick_on_change = True
+	two_phase = True
 
 	def __init__(self, nbits = 16):
 		super().__init__(['in', 'load'], ['out'])
@@ -60,39 +79,255 @@ class Register(ClockedChip):
 	def get_value(self):
 		return self.pin('out')
 
+	def sample(self, params=None):
+		""" select the next value with the mux, out does not change """
+		self.set_pin('mux.in0', self.last_out)
+		self.set_pin('mux.in1', self.pin('in'))
+		self.set_pin('mux.sel0', self.pin('load'))
+		self.process_chip('mux')
+		return self.pin('mux.out')
+
+	def publish(self, state):
+		""" store the next value in the flip-flop and drive out """
+		self.set_pin('dff.in', state)
+		self.propagate_tick('dff')
+		self.last_out = self.pin('dff.out')
+		self.link_pins('dff.out', 'out')
+
+	def setup_wiring(self):
+		def f():
+			self.publish(self.sample())
+		return f
+
+	def on_tick(self, value):
+		self.wiring.resolve()
+
+	def lower_tick(self, builder, prefix):
+		inp, load, out = builder.pins(self, prefix, ['in', 'load', 'out'])
+		builder.emit('copy', out, builder.pin(self, prefix, 'mux.in0'))
+		builder.emit('copy', inp, builder.pin(self, prefix, 'mux.in1'))
+		builder.emit('copy', load, builder.pin(self, prefix, 'mux.sel0'))
+		builder.lower(self.parts['mux'], f"{prefix}mux.")
+		builder.emit('copy', builder.pin(self, prefix, 'mux.out'), builder.pin(self, prefix, 'dff.in'))
+		builder.lower_tick(self.parts['dff'], f"{prefix}dff.")
+		builder.emit('copy', builder.pin(self, prefix, 'dff.out'), out)
+
+
+class RegisterFile(ClockedChip):
+	"""n registers of bits bits (an int, or one per register). The register
+	values are the out0..out{n-1} pins, in one contiguous block of the pin
+	values. Bit i of the load pin enables loading in{i} into register i on
+	the next tick, and load stays set as the load pin of a Register does.
+	Each write port k loads wdata{k} into register waddr{k} when wen{k} is
+	set, after the load mask; each read port k drives rdata{k} with the
+	register raddr{k} after the tick. Port addresses outside 0..n-1 raise
+	IndexError; loaded in{i} values and write port data are masked to the
+	register width."""
+	__slots__ = ('n', 'bits', 'masks', 'read_ports', 'write_ports', 'all_loaded')
+	tick_on_change = True
+	two_phase = True
+
+	def __init__(self, n: int, bits=16, read_ports: int = 0, write_ports: int = 0):
+		self.n = n
+		self.bits = list(bits) if isinstance(bits, (list, tuple)) else [bits] * n
+		if len(self.bits) != n:
+			raise ValueError(f"{len(self.bits)} widths for {n} registers")
+		self.masks = [(1 << bits) - 1 for bits in self.bits]
+		self.read_ports = read_ports
+		self.write_ports = write_ports
+		self.all_loaded = (1 << n) - 1
+		inputs = [f"in{i}" for i in range(n)] + ['load']
+		for k in range(write_ports):
+			inputs += [f"waddr{k}", f"wdata{k}", f"wen{k}"]
+		inputs += [f"raddr{k}" for k in range(read_ports)]
+		outputs = [f"out{i}" for i in range(n)] + [f"rdata{k}" for k in range(read_ports)]
+		super().__init__(inputs, outputs)
+		self.pin_values[n] = 0
+		self.pin_values[n + 1:len(inputs)] = [0] * (len(inputs) - n - 1)
+		self.pin_values[len(inputs):] = [0] * len(outputs)
+
+	def get_value(self, i: int):
+		return self.pin_values[self.layout.n_inputs + i]
+
+	def set_value(self, i: int, value: int):
+		""" load value into register i on the next tick """
+		if value < 0 or value >> self.bits[i] > 0:
+			raise OverflowError(f"value {value} don't fit into a {self.bits[i]} bits register")
+		self.set_pin(self.layout.inputs[i], value)
+		self.set_pin('load', self.pin_values[self.n] | 1 << i)
+
+	def values(self) -> list:
+		""" the register values """
+		start = self.layout.n_inputs
+		return self.pin_values[start:start + self.n]
+
+	def _address(self, address, pin: str) -> int:
+		if not 0 <= address < self.n:
+			raise IndexError(f"{pin} {address} out of the {self.n} registers")
+		return address
+
+	def sample(self, params=None):
+		""" latch the loaded inputs and the write ports """
+		values = self.pin_values
+		n = self.n
+		mask = values[n]
+		loads = values[:n] if mask else None
+		writes = []
+		pos = n + 1
+		for k in range(self.write_ports):
+			if values[pos + 2]:
+				address = self._address(values[pos], f"waddr{k}")
+				writes.append((address, values[pos + 1] & self.masks[address]))
+			pos += 3
+		for k in range(self.read_ports):
+			self._address(values[pos + k], f"raddr{k}")
+		return mask, loads, writes
+
+	def publish(self, state):
+		""" update all the loaded registers, then the read ports """
+		mask, loads, writes = state
+		values = self.pin_values
+		n = self.n
+		out = self.layout.n_inputs
+		masks = self.masks
+		if mask == self.all_loaded:
+			values[out:out + n] = [value & width for value, width in zip(loads, masks)]
+		else:
+			while mask:
+				low = mask & -mask
+				i = low.bit_length() - 1
+				values[out + i] = loads[i] & masks[i]
+				mask ^= low
+		for address, data in writes:
+			values[out + address] = data
+		raddr = out - self.read_ports
+		for k in range(self.read_ports):
+			values[out + n + k] = values[out + values[raddr + k]]
+
 	def setup_wiring(self):
 		def f():
-			self.set_pin('mux.in0', self.last_out)
-			self.set_pin('mux.in1', self.pin('in'))
-			self.set_pin('mux.sel0', self.pin('load'))
-			self.process_chip('mux')
-			self.link_pins('mux.out', 'dff.in')
-			#self.process_chip('dff')
-			self.propagate_tick('dff')
-			self.last_out = self.pin('dff.out')
-			self.link_pins('dff.out', 'out')
+			self.publish(self.sample())
 		return f
 
 	def on_tick(self, value):
 		self.wiring.resolve()
-		self.last_out = self.get_value()
+
+	def lower_tick(self, builder, prefix):
+		builder.lower_opaque(self, prefix, 'tick_call')
+
+
+# array typecodes of the RAM words, by maximum word width
+_WORDS = [(16, 'H'), (32, 'I'), (64, 'Q')]
 
 
 class RAM(ClockedChip):
+	"""Memory of size words of word_bits bits. Words are stored in a
+	bytearray (up to 8 bits) or in an array, or in a file mapped in memory
+	when path is given: the file keeps the contents after close().
+	Without word_bits the words are stored unmasked in a list and can
+	hold any value, as raw images cannot."""
+	__slots__ = ('data', 'word_bits', 'mask', 'typecode', 'word_size', 'path', '_mmap')
+	state_slots = ('data',)
+	two_phase = True
 
-	def __init__(self,  size: int):
+	def __init__(self,  size: int, word_bits: Optional[int] = None, path=None):
 		super().__init__(['in', 'load', 'address'], ['out'])
 
-		self.data = [0 for i in range(size)]
+		self.word_bits = word_bits
+		self.path = path
+		self._mmap = None
+		if word_bits is None:
+			if path is not None:
+				raise ValueError("a file backed memory needs word_bits")
+			self.mask = self.typecode = self.word_size = None
+			self.data = [0] * size
+			return
+		if not 0 < word_bits <= 64:
+			raise ValueError(f"word_bits must be between 1 and 64, not {word_bits}")
+		self.mask = (1 << word_bits) - 1
+		self.typecode = 'B' if word_bits <= 8 else next(code for bits, code in _WORDS if word_bits <= bits)
+		self.word_size = array(self.typecode).itemsize  # bytes per stored word
+		if path is not None:
+			self.data = self._map(path, size)
+		elif self.typecode == 'B':
+			self.data = bytearray(size)
+		else:
+			self.data = array(self.typecode, bytes(size * self.word_size))
+
+	def _map(self, path, size: int) -> memoryview:
+		n_bytes = size * self.word_size
+		with open(path, 'ab+') as fh:
+			if fh.tell() < n_bytes:
+				fh.truncate(n_bytes)
+			self._mmap = mmap.mmap(fh.fileno(), n_bytes) if n_bytes else None
+		return memoryview(self._mmap if self._mmap is not None else bytearray()).cast(self.typecode)
+
+	@property
+	def size(self) -> int:
+		return len(self.data)
+
+	def load_image(self, image, address: int = 0) -> None:
+		""" copy an image into memory from address. The image is a sequence
+		of words, raw words in the storage format (bytes, bytearray), or
+		the path of a file holding them """
+		if isinstance(image, (str, os.PathLike)):
+			with open(image, 'rb') as fh:
+				image = fh.read()
+		if isinstance(image, (bytes, bytearray, memoryview)):
+			self._check_raw()
+			with memoryview(self.data).cast('B') as raw:
+				start = address * self.word_size
+				if start + len(image) > len(raw) or address < 0:
+					raise ValueError(f"image of {len(image)} bytes does not fit at address {address}")
+				raw[start:start + len(image)] = image
+			return
+		words = list(image)
+		if address < 0 or address + len(words) > len(self.data):
+			raise ValueError(f"image of {len(words)} words does not fit at address {address}")
+		if isinstance(self.data, (array, memoryview)):
+			words = array(self.typecode, words)
+		self.data[address:address + len(words)] = words
+
+	def dump_image(self, address: int = 0, size: int = None) -> bytes:
+		""" return size words from address (all the words after it by
+		default) as raw bytes in the storage format """
+		self._check_raw()
+		if size is None:
+			size = len(self.data) - address
+		itemsize = self.word_size
+		with memoryview(self.data).cast('B') as raw:
+			return raw[address * itemsize:(address + size) * itemsize].tobytes()
+
+	def _check_raw(self) -> None:
+		if self.typecode is None:
+			raise ValueError("raw images need a memory with word_bits")
+
+	def flush(self) -> None:
+		""" write the contents of a file backed memory to the file """
+		if self._mmap is not None:
+			self._mmap.flush()
+
+	def close(self) -> None:
+		""" flush and unmap a file backed memory, which cannot be used after """
+		if self._mmap is not None:
+			self.data.release()
+			self._mmap.close()
+			self._mmap = None
+
+	def sample(self, params=None):
+		""" latch the address, load and in pins """
+		return self.pin('address'), self.pin('load'), self.pin('in')
+
+	def publish(self, state):
+		""" run the latched access """
+		pos, load, value = state
+		if load is True:
+			self.data[pos] = value if self.mask is None else value & self.mask
+		self.set_pin('out', self.data[pos])
 
 	def setup_wiring(self):
 		def f():
-			pos = self.pin('address')
-			if self.pin('load') is True:
-				self.data[pos] = self.pin('in')
-				self.set_pin('out', self.data[pos])
-			else:
-				self.set_pin('out', self.data[pos])
+			self.publish(self.sample())
 		return f
 
 	def on_tick(self, value):
@@ -100,31 +335,120 @@ class RAM(ClockedChip):
 
 
 class RAMMultiBank(ClockedChip):
+	"""Memory of n_banks banks of bank_size words (both powers of two), each
+	a RAM part. With interleaved, consecutive addresses are in consecutive
+	banks, otherwise every bank holds a contiguous block of addresses.
 
-	def __init__(self, clock: Clock, n_banks: int, bank_size: int):
-		super().__init__(['in', 'load', 'address'], ['out'], clock)
-		self.n_bank_bits = int(log2(n_banks))
-		self.n_banksize_bits = int(log2(bank_size))
-		self.mask = bin(int(''.join(['1' for x in range(int(log2(bank_size)))]),2) << int(log2(n_banks)))[2:]
-		self.invmask = bin(int(self.mask, 2) ^ int(''.join(['1' for x in range(int(log2(bank_size)))], 2)))[2:]
-		self.address_bits = self.n_bank_bits + self.n_banksize_bits
-		self.parts = {
-			f"bank{i}": RAM(clock, bank_size) for i in range(n_banks)
-		}
+	The accesses of the ports (pins in, load, address and out with one
+	port, in{k}, load{k}, address{k} and out{k} with more) are all served
+	on every tick, in port order, by driving the pins of the bank parts and
+	ticking them. Accesses to the same bank are not stalled: hits counts
+	the accesses of every bank and conflicts the accesses to a bank already
+	used in the same cycle, that a real banked memory would delay. Batch
+	reads and writes use the bank storage directly and leave the pins as
+	they are."""
+	__slots__ = ('n_banks', 'bank_size', 'ports', 'bank_shift', 'bank_mask', 'offset_shift',
+		'offset_mask', 'address_bits', 'word_mask', 'bank_names', 'hits', 'conflicts')
+	two_phase = True
+
+	def __init__(self, n_banks: int, bank_size: int, word_bits: int = 64, interleaved: bool = True, ports: int = 1):
+		for name, n in (('n_banks', n_banks), ('bank_size', bank_size)):
+			if n < 1 or n & (n - 1):
+				raise ValueError(f"{name} must be a power of two, not {n}")
+		suffixes = [''] if ports == 1 else [str(k) for k in range(ports)]
+		super().__init__([f"{name}{k}" for k in suffixes for name in ('in', 'load', 'address')],
+			[f"out{k}" for k in suffixes])
+		self.n_banks = n_banks
+		self.bank_size = bank_size
+		self.ports = ports
+		bank_bits = n_banks.bit_length() - 1
+		offset_bits = bank_size.bit_length() - 1
+		self.bank_shift, self.offset_shift = (0, bank_bits) if interleaved else (offset_bits, 0)
+		self.bank_mask = n_banks - 1
+		self.offset_mask = bank_size - 1
+		self.address_bits = bank_bits + offset_bits
+		self.pin_values[:] = [0] * len(self.pin_values)
+		for i in range(n_banks):
+			self.add_part(f"bank{i}", RAM(bank_size, word_bits))
+		self.word_mask = self.parts['bank0'].mask
+		self.bank_names = [f"bank{i}" for i in range(n_banks)]
+		self.hits = [0] * n_banks
+		self.conflicts = [0] * n_banks
+
+	@property
+	def size(self) -> int:
+		return self.n_banks * self.bank_size
+
+	@property
+	def banks(self) -> list:
+		""" the RAM parts, by bank number """
+		return [self.parts[name] for name in self.bank_names]
+
+	def decode(self, address: int):
+		""" return the (bank, offset) of address """
+		return self._decode_all([address])[0]
+
+	def _decode_all(self, addresses):
+		for address in addresses:
+			if address < 0 or address >> self.address_bits:
+				raise IndexError(f"address {address} out of a {self.size} words memory")
+		bank_shift, bank_mask = self.bank_shift, self.bank_mask
+		offset_shift, offset_mask = self.offset_shift, self.offset_mask
+		return [((a >> bank_shift) & bank_mask, (a >> offset_shift) & offset_mask) for a in addresses]
+
+	def _count(self, decoded) -> None:
+		""" count the accesses of one cycle """
+		used = [0] * self.n_banks
+		for bank, offset in decoded:
+			used[bank] += 1
+		for bank, n in enumerate(used):
+			if n:
+				self.hits[bank] += n
+				self.conflicts[bank] += n - 1
+
+	def read_batch(self, addresses) -> list:
+		""" read many addresses as accesses of one cycle """
+		decoded = self._decode_all(addresses)
+		self._count(decoded)
+		banks = [part.data for part in self.banks]
+		return [banks[bank][offset] for bank, offset in decoded]
+
+	def write_batch(self, addresses, values) -> None:
+		""" write values at addresses as accesses of one cycle, in order """
+		decoded = self._decode_all(addresses)
+		self._count(decoded)
+		banks = [part.data for part in self.banks]
+		mask = self.word_mask
+		for (bank, offset), value in zip(decoded, values):
+			banks[bank][offset] = value if mask is None else value & mask
+
+	def reset_counters(self) -> None:
+		self.hits[:] = [0] * self.n_banks
+		self.conflicts[:] = [0] * self.n_banks
+
+	def sample(self, params=None):
+		""" latch the (in, load, address) pins of every port """
+		values = self.pin_values
+		return [values[pos:pos + 3] for pos in range(0, 3 * self.ports, 3)]
+
+	def publish(self, state):
+		""" serve the latched accesses """
+		decoded = self._decode_all([address for value, load, address in state])
+		self._count(decoded)
+		outputs = self.layout.outputs
+		for k, ((value, load, address), (bank, offset)) in enumerate(zip(state, decoded)):
+			name = self.bank_names[bank]
+			part = self.parts[name]
+			part.set_pin('address', offset)
+			part.set_pin('in', value)
+			part.set_pin('load', load)
+			self.propagate_tick(name)
+			self.set_pin(outputs[k], part.pin('out'))
 
 	def setup_wiring(self):
 		def f():
-			address = self.pin('address')
-			bank = int(bin(address)[2:][-self.address_bits] & int(self.mask,2),2)
-			address_bit = int(bin(address)[2:][:],2)
-			if self.pin('load') is True:
-				pos = self.pin('address')
-				self.data[pos] = self.pin('in')
-				self.set_pin('out', self.data[pos])
-			else:
-				self.set_pin('out', self.pin('address'))
-			
+			self.publish(self.sample())
 		return f
 
 	def on_tick(self, value):
-		super().process()
\ No newline at end of file
+		self.wiring.resolve()
\ No newline at end of file
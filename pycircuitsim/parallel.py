@@ -0,0 +1,111 @@
+"""
+Multi-process simulation of independent inputs.
+
+ParallelRunner shards a stream of items (input vectors, stimulus programs,
+...) across a ProcessPoolExecutor. Every worker builds its own chip once,
+with the chip factory, and runs the job on all the items it is given:
+
+	with ParallelRunner(lambda: FullAdder(32)) as runner:
+		for outputs in runner.map(vectors):
+			...
+
+Results come back in the order of the items, while at most max_pending
+chunks are in flight, so items can come from an unbounded generator.
+The factory and the job are passed to the workers when they start: with
+the "spawn" and "forkserver" start methods they must be picklable
+(module level functions, not lambdas).
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional
+
+from .stream import chunks
+
+
+def evaluate(chip, inputs: Dict[str, Any]) -> Dict[str, Any]:
+	""" the default job: evaluate a combinational chip on an input vector """
+	return chip.evaluate(inputs)
+
+
+# the chip and job of the current worker process
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(factory: Callable[[], Any], job: Callable[[Any, Any], Any]) -> None:
+	_worker['chip'] = factory()
+	_worker['job'] = job
+
+
+def _run_chunk(items: List[Any]) -> List[Any]:
+	chip = _worker['chip']
+	job = _worker['job']
+	return [job(chip, item) for item in items]
+
+
+class ParallelRunner:
+	"""Runs job(chip, item) on every item, in worker processes each owning
+	one chip built by factory. workers=0 runs everything in this process."""
+
+	def __init__(self, factory: Callable[[], Any], job: Callable[[Any, Any], Any] = evaluate,
+		workers: Optional[int] = None, chunk_size: int = 256, max_pending: Optional[int] = None,
+		mp_context=None):
+		if chunk_size < 1:
+			raise ValueError(f"chunk_size must be positive, not {chunk_size}")
+		self.factory = factory
+		self.job = job
+		self.workers = (os.cpu_count() or 1) if workers is None else workers
+		self.chunk_size = chunk_size
+		self.max_pending = max_pending or 2 * max(self.workers, 1)
+		self.mp_context = mp_context
+		self._executor: Optional[ProcessPoolExecutor] = None
+		self._chip = None
+
+	def _start(self) -> None:
+		if self.workers == 0:
+			if self._chip is None:
+				self._chip = self.factory()
+		elif self._executor is None:
+			self._executor = ProcessPoolExecutor(self.workers, mp_context=self.mp_context,
+				initializer=_init_worker, initargs=(self.factory, self.job))
+
+	def close(self) -> None:
+		""" stop the worker processes """
+		if self._executor is not None:
+			self._executor.shutdown()
+			self._executor = None
+
+	def __enter__(self) -> 'ParallelRunner':
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.close()
+
+	def map(self, items: Iterable[Any]) -> Iterator[Any]:
+		""" yield job(chip, item) for every item, in order """
+		self._start()
+		if self._executor is None:
+			for item in items:
+				yield self.job(self._chip, item)
+			return
+		pending = deque()
+		for chunk in chunks(items, self.chunk_size):
+			if len(pending) >= self.max_pending:
+				yield from pending.popleft().result()
+			pending.append(self._executor.submit(_run_chunk, chunk))
+		while pending:
+			yield from pending.popleft().result()
+
+	def reduce(self, items: Iterable[Any], fn: Callable[[Any, Any], Any], initial: Any) -> Any:
+		""" fold fn(accumulated, result) over the results, in order """
+		accumulated = initial
+		for result in self.map(items):
+			accumulated = fn(accumulated, result)
+		return accumulated
+
+
+def run_parallel(factory: Callable[[], Any], items: Iterable[Any], job: Callable[[Any, Any], Any] = evaluate,
+	workers: Optional[int] = None, chunk_size: int = 256) -> List[Any]:
+	""" return job(chip, item) for every item, computed by worker processes """
+	with ParallelRunner(factory, job, workers, chunk_size) as runner:
+		return list(runner.map(items))
@@ -0,0 +1,163 @@
+"""
+Streaming stimulus and response.
+
+stream feeds an iterator of input dicts into a chip and returns a lazy
+iterator of output records. Nothing is read ahead: the next input is
+pulled only when the next output is asked for (at most one chunk when
+chunk_size is given), so a slow consumer slows down the producer and a
+sweep runs in constant memory.
+
+Inputs can be read from CSV files (one column per input pin) or from NPY
+files (a structured array with one field per pin, memory mapped), and
+results can be written to the same formats while they are produced:
+
+	write_csv("results.csv", stream(FullAdder(8), read_csv("vectors.csv"), chunk_size=4096))
+
+NPY support needs NumPy (the "numpy" extra).
+"""
+import csv
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+from .core import batch
+
+
+def chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+	""" yield lists of size items, the last one can be shorter """
+	if size < 1:
+		raise ValueError(f"chunk size must be positive, not {size}")
+	items = iter(items)
+	while True:
+		chunk = list(islice(items, size))
+		if not chunk:
+			return
+		yield chunk
+
+
+def _python(values) -> List[Any]:
+	return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+def stream(chip, inputs: Iterable[Dict[str, Any]], chunk_size: Optional[int] = None,
+	include_inputs: bool = False) -> Iterator[Dict[str, Any]]:
+	""" yield the outputs of chip for every input dict. With chunk_size,
+	inputs are evaluated chunk_size at a time with chip.evaluate_batch,
+	and every input dict must set the same pins: ValueError otherwise.
+	include_inputs adds the input values to every output record """
+	if chunk_size is None:
+		for values in inputs:
+			outputs = chip.evaluate(values)
+			yield {**values, **outputs} if include_inputs else outputs
+		return
+	names = None
+	count = 0
+	for chunk in chunks(inputs, chunk_size):
+		if names is None:
+			names = list(chunk[0])
+			keys = set(names)
+		for pos, values in enumerate(chunk):
+			if values.keys() != keys:
+				raise ValueError(f"input {count + pos} sets pins {sorted(values)}, not {sorted(names)}")
+		count += len(chunk)
+		columns = chip.evaluate_batch({name: [values[name] for values in chunk] for name in names})
+		columns = {name: _python(values) for name, values in columns.items()}
+		for pos, values in enumerate(chunk):
+			outputs = {name: column[pos] for name, column in columns.items()}
+			yield {**values, **outputs} if include_inputs else outputs
+
+
+def _parse(text: str):
+	""" CSV cell to value: True/False, an int (also 0x.., 0b..) or the text """
+	if text in ('True', 'true'):
+		return True
+	if text in ('False', 'false'):
+		return False
+	try:
+		return int(text, 0)
+	except ValueError:
+		return text
+
+
+def read_csv(path, columns: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+	""" yield one input dict per row of a CSV file with a header line.
+	columns selects the columns to read, all of them by default """
+	with open(path, newline='') as fh:
+		for row in csv.DictReader(fh):
+			names = columns or list(row)
+			yield {name: _parse(row[name]) for name in names}
+
+
+def write_csv(path, records: Iterable[Dict[str, Any]], fields: Optional[List[str]] = None) -> int:
+	""" write records to a CSV file while they are produced, return the
+	number of records. fields defaults to the keys of the first record """
+	count = 0
+	with open(path, 'w', newline='') as fh:
+		writer = None
+		for record in records:
+			if writer is None:
+				writer = csv.DictWriter(fh, fields or list(record))
+				writer.writeheader()
+			writer.writerow(record)
+			count += 1
+	return count
+
+
+def _numpy():
+	if batch.numpy is None:
+		raise ImportError("NPY files need NumPy: pip install numpy")
+	return batch.numpy
+
+
+def read_npy(path, columns: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+	""" yield one input dict per element of a structured array NPY file,
+	memory mapped so that it is never loaded whole """
+	numpy = _numpy()
+	data = numpy.load(path, mmap_mode='r')
+	names = columns or list(data.dtype.names or [])
+	if not names:
+		raise ValueError(f"{path} does not hold a structured array")
+	for start in range(0, len(data), 4096):
+		block = data[start:start + 4096]
+		fields = [block[name].tolist() for name in names]
+		for values in zip(*fields):
+			yield dict(zip(names, values))
+
+
+def _npy_header(numpy, dtype, rows: int, size: int = 0) -> bytes:
+	""" NPY 1.0 header of a rows long array, padded with spaces to size """
+	text = repr({'descr': numpy.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (rows,)})
+	body = len(text) + 1  # the final newline
+	total = size or -(-(10 + body) // 64) * 64
+	return b'\x93NUMPY\x01\x00' + (total - 10).to_bytes(2, 'little') + \
+		(text + ' ' * (total - 10 - body) + '\n').encode('latin1')
+
+
+def write_npy(path, records: Iterable[Dict[str, Any]], fields: Optional[List[str]] = None,
+	dtype=None, chunk_size: int = 4096) -> int:
+	""" write records to a structured array NPY file while they are
+	produced, chunk_size records at a time; return the number of records.
+	dtype defaults to bool fields for bools and int64 for the others """
+	numpy = _numpy()
+	count = 0
+	with open(path, 'wb') as fh:
+		header_size = 0
+		for chunk in chunks(records, chunk_size):
+			if dtype is None:
+				fields = fields or list(chunk[0])
+				dtype = [(name, '?' if isinstance(chunk[0][name], bool) else '<i8') for name in fields]
+			dtype = numpy.dtype(dtype)
+			fields = list(dtype.names)
+			if not header_size:
+				header = _npy_header(numpy, dtype, 10 ** 15)
+				header_size = len(header)
+				fh.write(header)
+			array = numpy.array([tuple(record[name] for name in fields) for record in chunk], dtype=dtype)
+			fh.write(array.tobytes())
+			count += len(chunk)
+		if not header_size:
+			dtype = numpy.dtype(dtype or [(name, '<i8') for name in fields or []])
+			fh.write(_npy_header(numpy, dtype, 0))
+		else:
+			fh.seek(0)
+			fh.write(_npy_header(numpy, dtype, count, header_size))
+	return count
@@ -1,30 +1,130 @@
-from typing import Dict,Any
+from typing import Dict, Any, List, Tuple, Optional
+
+from ..core.errors import CombinationalLoopError
 
 class Node:
-	pass
+	"""An expression node. Nodes combine with &, | , ^ and ~ into the
+	expressions of core.declarative"""
 
+	def __and__(self, other):
+		from ..core.declarative import And
+		return And(self, other)
 
-class InputNode:
-	pass
+	def __or__(self, other):
+		from ..core.declarative import Or
+		return Or(self, other)
+
+	def __xor__(self, other):
+		from ..core.declarative import Xor
+		return Xor(self, other)
 
+	def __invert__(self):
+		from ..core.declarative import Not
+		return Not(self)
 
-class FunctionNode:
+
+class InputNode(Node):
 	pass
 
 
-class Graph:
-	def __init__(self):
-		self.data = {}
+class FunctionNode(Node):
+	pass
 
-	def add_input_node(self, node):
-		self.data[node] = []
 
+class Graph:
+	"""Dependency graph: add_link(a, b) means that b reads what a computes.
+	Nodes are ranked in levels, every node coming after all of its
+	predecessors; the levels are computed once and kept until the graph
+	changes."""
 
-	def add_link(self, from_node, to_node, func_node):
-		pass
+	def __init__(self):
+		self.data: Dict[Any, List[Any]] = {}  # node -> successors
+		self.inputs: List[Any] = []
+		self.functions: Dict[Tuple[Any, Any], Any] = {}
+		self._levels: Optional[List[List[Any]]] = None
 
+	def add_node(self, node):
+		if node not in self.data:
+			self.data[node] = []
+			self._levels = None
 
-class Var:
+	def add_input_node(self, node):
+		self.add_node(node)
+		self.inputs.append(node)
+
+	def add_link(self, from_node, to_node, func_node=None):
+		self.add_node(from_node)
+		self.add_node(to_node)
+		self.data[from_node].append(to_node)
+		if func_node is not None:
+			self.functions[(from_node, to_node)] = func_node
+		self._levels = None
+
+	def successors(self, node) -> List[Any]:
+		return self.data[node]
+
+	def predecessors(self, node) -> List[Any]:
+		return [x for x, successors in self.data.items() if node in successors]
+
+	def levels(self) -> List[List[Any]]:
+		""" return the nodes grouped by rank: level 0 has the nodes without
+		predecessors, level n the nodes whose latest predecessor is in level
+		n - 1. Every level keeps the order the nodes were added in.
+		Raise CombinationalLoopError if the graph has a cycle """
+		if self._levels is None:
+			waiting = {node: 0 for node in self.data}
+			for successors in self.data.values():
+				for node in successors:
+					waiting[node] += 1
+			order = {node: pos for pos, node in enumerate(self.data)}
+			level = [node for node, count in waiting.items() if count == 0]
+			levels = []
+			while level:
+				levels.append(level)
+				ready = []
+				for node in level:
+					for successor in self.data[node]:
+						waiting[successor] -= 1
+						if waiting[successor] == 0:
+							ready.append(successor)
+				level = sorted(ready, key=order.get)
+			if sum(len(level) for level in levels) < len(self.data):
+				raise CombinationalLoopError(self.find_loop())
+			self._levels = levels
+		return self._levels
+
+	def rank(self) -> Dict[Any, int]:
+		""" return the level of every node """
+		return {node: pos for pos, level in enumerate(self.levels()) for node in level}
+
+	def topological_order(self) -> List[Any]:
+		return [node for level in self.levels() for node in level]
+
+	def find_loop(self) -> Optional[List[Any]]:
+		""" return the nodes of a cycle, first node repeated at the end, or None """
+		state: Dict[Any, int] = {}  # 1: on the current path, 2: done
+		for start in self.data:
+			if start in state:
+				continue
+			path = [start]
+			stack = [iter(self.data[start])]
+			state[start] = 1
+			while stack:
+				node = next(stack[-1], None)
+				if node is None:
+					state[path.pop()] = 2
+					stack.pop()
+				elif state.get(node) == 1:
+					return path[path.index(node):] + [node]
+				elif node not in state:
+					state[node] = 1
+					path.append(node)
+					stack.append(iter(self.data[node]))
+		return None
+
+
+class Var(Node):
+	"""A named constant"""
 
 	def __init__(self,name, value):
 		self.value = value
@@ -34,23 +134,41 @@ class Var:
 		ctx[self.name] = self.value
 		return self.value
 
+	def __repr__(self):
+		return f"Var({self.name!r}, {self.value!r})"
 
-class In:
+
+class In(InputNode):
+	"""The value of the var_name input"""
 
 	def __init__(self, var_name):
 		self.var_name = var_name
 
 	def resolve(self, ctx):
-		print(ctx)
 		return ctx[self.var_name]
 
+	def __repr__(self):
+		return f"In({self.var_name!r})"
+
 
-class Fn:
-	def __init__(self, fn):
+class Fn(FunctionNode):
+	"""fn applied to the values of the args nodes, or to the whole context
+	when there are no args. op names the function for the optimisations
+	of core.declarative"""
+
+	def __init__(self, fn, *args, op=None):
 		self.fn = fn
+		self.args = args
+		self.op = op
 
 	def resolve(self, ctx):
-		return self.fn(ctx)
+		if not self.args:
+			return self.fn(ctx)
+		return self.fn(*[arg.resolve(ctx) for arg in self.args])
+
+	def __repr__(self):
+		name = self.op or getattr(self.fn, '__name__', 'fn')
+		return f"{name}({', '.join(map(repr, self.args))})"
 
 
 
@@ -1,11 +1,16 @@
+import re
+
 import setuptools
 
 with open("README.md", "r") as fh:
     long_description = fh.read()
 
+with open("pycircuitsim/__init__.py", "r") as fh:
+    version = re.search(r'__version__ = "(.*)"', fh.read()).group(1)
+
 setuptools.setup(
     name="pycirctuisim-andreapollini",  # Replace with your own username
-    version="0.0.1",
+    version=version,
     author="Andrea Pollini",
     author_email="prof.andrea.pollini@gmail.com",
     description="An educational circuit simulator library",
@@ -19,4 +24,10 @@ setuptools.setup(
         "Operating System :: OS Independent",
     ],
     python_requires='>=3.8',
+    extras_require={
+        "numpy": ["numpy"],
+    },
+    entry_points={
+        "console_scripts": ["pycircuitsim-bench=pycircuitsim.bench:main"],
+    },
 )
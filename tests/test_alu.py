@@ -133,3 +133,28 @@ def test_alu_16():
 # 	chip.process()
 
 # 	assert chip.pin("out") == 0b1111111111111000
+
+
+def test_adder_carry_into_top_bit():
+	# the wiring used to force the carry into the top bit to False: 7 + 1 gave 0
+	adder = FullAdder(4)
+	assert adder.evaluate({'in0': 7, 'in1': 1}) == {'out0': 8}
+	assert adder.evaluate({'in0': 12, 'in1': 6}) == {'out0': 2}
+
+
+def test_multibit_outputs_do_not_accumulate():
+	# the per-bit functions add into the outputs, which used to keep the
+	# previous sum: every set_pin re-evaluates, so a + b came out doubled
+	adder = FullAdder(8)
+	adder.set_pin('in0', 3)
+	adder.set_pin('in1', 4)
+	adder.process()
+	assert adder.pin('out0') == 7
+
+	def copy_bits(chip, bit):
+		chip.set_pin('out0', chip.pin('out0') | (chip.pin('in0') >> bit & 1) << bit)
+
+	chip = MultiBitChip(4, 1, 1, copy_bits)
+	chip.set_pin('in0', 0b1010)
+	chip.set_pin('in0', 0b0101)
+	assert chip.pin('out0') == 0b0101
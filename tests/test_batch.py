@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+from pycircuitsim.core import batch
+from pycircuitsim.hardware.adder import FullAdder
+from pycircuitsim.hardware.logic_gates import Xor, MultiBitAnd, MultiBitOr, MultiBitNot
+
+
+def _operands(bits, n=500):
+	return [random.randint(0, 2 ** bits - 1) for i in range(n)], [random.randint(0, 2 ** bits - 1) for i in range(n)]
+
+
+def _check(chip, inputs):
+	result = chip.evaluate_batch(inputs)
+	for row in range(batch.batch_size(inputs)):
+		expected = chip.evaluate({name: values[row] for name, values in inputs.items()})
+		for name, values in result.items():
+			assert int(values[row]) == expected[name]
+
+
+@pytest.mark.parametrize('use_numpy', [False, True])
+def test_multibit(monkeypatch, use_numpy):
+	if use_numpy:
+		pytest.importorskip('numpy')
+	else:
+		monkeypatch.setattr(batch, 'numpy', None)
+
+	for bits in [8, 16, 64, 70]:
+		a, b = _operands(bits)
+		_check(MultiBitAnd(bits), {'a': a, 'b': b})
+		_check(MultiBitOr(bits), {'a': a, 'b': b})
+		_check(MultiBitNot(bits), {'a': a})
+
+	for bits in [4, 16]:
+		a, b = _operands(bits, 100)
+		_check(FullAdder(bits), {'in0': a, 'in1': b})
+
+
+def test_numpy_arrays():
+	numpy = pytest.importorskip('numpy')
+	a = numpy.arange(1000, dtype=numpy.uint16)
+	b = numpy.full(1000, 0xFF, dtype=numpy.uint16)
+	out = FullAdder(16).evaluate_batch({'in0': a, 'in1': b})['out0']
+	assert isinstance(out, numpy.ndarray)
+	assert (out == (a.astype(numpy.uint64) + 0xFF) & 0xFFFF).all()
+
+
+def test_missing_input_uses_pin_value():
+	chip = MultiBitAnd(8)
+	chip.set_pin('b', 0x0F)
+	out = chip.evaluate_batch({'a': [0xFF, 0x31]})['out']
+	assert [int(v) for v in out] == [0x0F, 0x01]
+
+
+def test_default_row_by_row():
+	out = Xor().evaluate_batch({'a': [False, True, True], 'b': [False, False, True]})['out']
+	assert [bool(v) for v in out] == [False, True, False]
+
+
+def test_different_lengths():
+	with pytest.raises(ValueError):
+		MultiBitOr(8).evaluate_batch({'a': [1, 2], 'b': [1]})
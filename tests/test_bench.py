@@ -0,0 +1,23 @@
+import json
+
+from pycircuitsim import bench
+
+
+def test_run_selected():
+	results = bench.run(['Xor*', 'FullAdder(4)*'], min_time=0.001, repeat=1)
+	assert [r['name'] for r in results['results']] == ['Xor.evaluate', 'FullAdder(4).evaluate']
+	assert all(r['ops'] > 0 and r['ops_per_second'] > 0 for r in results['results'])
+
+
+def test_benchmarks_build():
+	for name, factory in bench.BENCHMARKS:
+		factory()()
+
+
+def test_main_json(tmp_path, capsys):
+	output = tmp_path / "bench.json"
+	assert bench.main(['RAM*', '--min-time', '0.001', '--repeat', '1', '-o', str(output)]) == 0
+	results = json.loads(output.read_text())
+	assert [r['name'] for r in results['results']] == ['RAM(1024).read', 'RAM(1024).write']
+	bench.main(['CDP1802*', '--min-time', '0.001', '--repeat', '1'])
+	assert json.loads(capsys.readouterr().out)['results'][0]['name'] == 'CDP1802.Clock.tick'
@@ -0,0 +1,82 @@
+from itertools import product
+
+import pytest
+
+from pycircuitsim.core.bitslice import BitSlicedEvaluator, evaluate_vectors, exhaustive_words
+from pycircuitsim.core.chip import BooleanFunctionChip
+from pycircuitsim.core.errors import ChipWiringError
+from pycircuitsim.hardware.adder import FullAdder
+from pycircuitsim.hardware.logic_gates import Nand, Xor, MuxNWay, DemuxNWay
+
+
+def _scalar(chip, vectors):
+	results = []
+	for vector in vectors:
+		for name, value in vector.items():
+			chip.set_pin(name, value)
+		chip.process()
+		results.append({name: chip.pin(name) for name in chip.outPins.keys()})
+	return results
+
+
+def _exhaustive(names):
+	return [dict(zip(names, p)) for p in product([False, True], repeat=len(names))]
+
+
+def test_gates():
+	vectors = _exhaustive(['a', 'b'])
+	for chip in [Nand(), Xor()]:
+		assert BitSlicedEvaluator(chip).sliced
+		assert evaluate_vectors(chip, vectors) == _scalar(chip, vectors)
+
+
+def test_mux():
+	chip = MuxNWay(3)
+	vectors = _exhaustive(list(chip.inPins.keys()))
+	assert len(vectors) == 2048
+	assert evaluate_vectors(chip, vectors) == _scalar(chip, vectors)
+
+
+def test_demux():
+	chip = DemuxNWay(2)
+	vectors = _exhaustive(['in', 'sel0', 'sel1'])
+	assert evaluate_vectors(chip, vectors, width=3) == _scalar(chip, vectors)
+
+
+def test_booleanfunctionchip():
+	chip = BooleanFunctionChip(['a', 'b'], ['sum', 'carry'], {
+		(False, False): (False, False),
+		(True, False): (True, False),
+		(False, True): (True, False),
+		(True, True): (False, True)
+	})
+	vectors = _exhaustive(['a', 'b'])
+	assert evaluate_vectors(chip, vectors, width=None) == _scalar(chip, vectors)
+
+
+def test_missing_mapping():
+	chip = BooleanFunctionChip(['a'], ['out'], {(False,): (True,)})
+	assert evaluate_vectors(chip, [{'a': False}]) == [{'out': True}]
+	with pytest.raises(ChipWiringError):
+		evaluate_vectors(chip, [{'a': False}, {'a': True}])
+
+
+def test_multibit_falls_back_to_scalar():
+	evaluator = BitSlicedEvaluator(FullAdder(8))
+	assert not evaluator.sliced
+	assert evaluator.evaluate([{'in0': 3, 'in1': 4}, {'in0': 255, 'in1': 1}]) == [{'out0': 7}, {'out0': 0}]
+
+
+def test_exhaustive_words():
+	chip = Xor()
+	words = exhaustive_words(['a', 'b'])
+	assert words == {'a': 0b1010, 'b': 0b1100}
+	assert BitSlicedEvaluator(chip).evaluate_words(words, 4) == {'out': 0b0110}
+
+	chip = MuxNWay(2)
+	names = list(chip.inPins.keys())
+	n = 2 ** len(names)
+	out = BitSlicedEvaluator(chip).evaluate_words(exhaustive_words(names), n)['out']
+	for k in range(n):
+		sel = k & 0b11
+		assert out >> k & 1 == k >> (2 + sel) & 1
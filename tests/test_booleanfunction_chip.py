@@ -1,7 +1,10 @@
 from itertools import product
 import random
 
+import pytest
+
 from pycircuitsim.core.chip import BooleanFunctionChip, MultiBitChip, Chip
+from pycircuitsim.core.errors import ChipWiringError
 from pycircuitsim.hardware.adder import FullAdder
 
 def test_booleanfunctionchip():
@@ -129,4 +132,30 @@ def test_16bit_adder():
 		adder.process()
 
 		assert chip.pin('out0') == x + y
-		assert chip.pin('out0') == adder.pin('out0')
\ No newline at end of file
+		assert chip.pin('out0') == adder.pin('out0')
+
+def test_compiled_table_is_shared():
+	adder = FullAdder(8)
+	tables = {id(adder.parts[f'adder{b}'].table) for b in range(8)}
+	assert len(tables) == 1
+	assert adder.parts['adder0'].table is FullAdder(4).parts['adder3'].table
+
+	table = adder.parts['adder0'].table
+	assert table.rows[0b011] == (False, True)
+
+
+def test_compiled_table_missing_mapping():
+	chip = BooleanFunctionChip(['a', 'b'], ['out'], {(False, False): (True,)})
+	chip.set_pin('a', False)
+	assert chip.pin('out') == True
+	with pytest.raises(ChipWiringError):
+		chip.set_pin('a', True)
+	with pytest.raises(ChipWiringError):
+		chip.set_pin('a', 2)
+
+
+def test_non_boolean_mapping():
+	chip = BooleanFunctionChip(['a'], ['out'], {(2,): ('two',), (3,): ('three',)})
+	assert chip.table is None
+	chip.set_pin('a', 3)
+	assert chip.pin('out') == 'three'
@@ -0,0 +1,141 @@
+from pycircuitsim.arch.cdp1802core import CDP1802Core, CYCLES, DISPATCH
+from pycircuitsim.arch.cdp1802cosmac import CDP1802
+from pycircuitsim.hardware.clock import Clock
+
+
+# sum 10 + 9 + ... + 1 into M(0x50)
+SUM_PROGRAM = [
+	0xF8, 0x50, 0xA3,  # LDI 50; PLO R3
+	0xF8, 0x0A, 0xA4,  # LDI 0A; PLO R4
+	0xF8, 0x00, 0x53,  # LDI 0; STR R3
+	0xE3,  # loop: SEX 3
+	0x84,  # GLO R4
+	0xF4,  # ADD
+	0x53,  # STR R3
+	0x24,  # DEC R4
+	0x84,  # GLO R4
+	0x3A, 0x09,  # BNZ loop
+	0xC4,  # NOP
+	0x00,  # IDL
+]
+
+
+def _run(program, **registers):
+	cpu = CDP1802Core(memory_size=256)
+	cpu.load(program)
+	for name, value in registers.items():
+		setattr(cpu, name, value)
+	cpu.run(1000)
+	return cpu
+
+
+def test_dispatch_table():
+	assert len(DISPATCH) == 256 and len(CYCLES) == 256
+	assert CYCLES[0xC0] == 3 and CYCLES[0xCF] == 3 and CYCLES[0xF8] == 2
+
+
+def test_sum_program():
+	cpu = _run(SUM_PROGRAM)
+	assert cpu.memory[0x50] == 55
+	assert cpu.idle
+	assert cpu.instructions == 78
+	assert cpu.cycles == 2 * 77 + 3
+
+
+def test_arithmetic():
+	cpu = _run([0xF8, 0xF0, 0xFC, 0x20, 0x00])  # LDI F0; ADI 20
+	assert (cpu.D, cpu.DF) == (0x10, 1)
+	cpu = _run([0xF8, 0x10, 0xFF, 0x20, 0x00])  # LDI 10; SMI 20
+	assert (cpu.D, cpu.DF) == (0xF0, 0)
+	cpu = _run([0xF8, 0x10, 0xFD, 0x20, 0x00])  # LDI 10; SDI 20
+	assert (cpu.D, cpu.DF) == (0x10, 1)
+	cpu = _run([0xF8, 0x10, 0x7F, 0x05, 0x00], DF=0)  # LDI 10; SMBI 05 with borrow
+	assert (cpu.D, cpu.DF) == (0x0A, 1)
+	cpu = _run([0xF8, 0x81, 0x7E, 0x00], DF=0)  # LDI 81; SHLC
+	assert (cpu.D, cpu.DF) == (0x02, 1)
+	cpu = _run([0xF8, 0x81, 0x76, 0x00], DF=1)  # LDI 81; SHRC
+	assert (cpu.D, cpu.DF) == (0xC0, 1)
+	cpu = _run([0xF8, 0x0F, 0xFA, 0x3C, 0xF9, 0x40, 0xFB, 0xFF, 0x00])  # ANI, ORI, XRI
+	assert cpu.D == 0xB3
+
+
+def test_register_operations():
+	cpu = _run([0xF8, 0x12, 0xB5, 0xF8, 0x34, 0xA5, 0x15, 0x95, 0x00])  # PHI, PLO, INC, GHI
+	assert cpu.R[5] == 0x1235
+	assert cpu.D == 0x12
+
+
+def test_long_branch_and_skips():
+	cpu = _run([0xC0, 0x00, 0x10] + [0] * 13 + [0xF8, 0x00, 0xCE, 0xF8, 0x01, 0x00])  # LBR 0010; LDI 0; LSZ
+	assert cpu.D == 0
+	assert cpu.cycles == 3 + 2 + 3 + 2
+
+
+def test_mark_and_return():
+	program = [0xF8, 0x80, 0xA2, 0x79, 0xE2, 0x12, 0x70, 0x00]
+	cpu = _run(program, X=3, P=0)  # MARK stores X,P=30 at R2, then RET restores them
+	assert cpu.T == 0x30
+	assert cpu.memory[0x80] == 0x30
+	assert (cpu.X, cpu.P, cpu.IE) == (3, 0, 1)
+
+
+def test_input_output_and_q():
+	cpu = CDP1802Core(memory_size=256)
+	written = []
+	cpu.on_output = lambda port, value: written.append((port, value))
+	cpu.on_input = lambda port: 0x42
+	cpu.load([0xF8, 0x10, 0xA2, 0xE2, 0x63, 0x22, 0x6C, 0x7B, 0x00])  # OUT 3; INP 4; SEQ
+	cpu.memory[0x10] = 0x99
+	cpu.run(100)
+	assert written == [(3, 0x99)]
+	assert cpu.D == 0x42 and cpu.memory[0x10] == 0x42
+	assert cpu.Q == 1
+
+
+def test_interrupt():
+	cpu = CDP1802Core(memory_size=256)
+	cpu.P, cpu.X = 3, 4
+	assert cpu.interrupt()
+	assert (cpu.P, cpu.X, cpu.T, cpu.IE) == (1, 2, 0x43, 0)
+	assert not cpu.interrupt()
+
+
+def _gate_level(program):
+	gate = CDP1802([], [])
+	clock = Clock()
+	gate.connect_to_clock(clock)
+	gate.boot()
+	clock.tick()
+	gate.parts['mem'].data[:len(program)] = program
+	return gate, clock
+
+
+def test_gate_level_sum_program():
+	gate, clock = _gate_level(SUM_PROGRAM)
+	pcs, cycles = [], []
+	while not gate.idle:
+		cycles.append(gate.step())
+		pcs.append(gate.getR(0))
+	clock.tick()
+	# hand traced: the set up, then 10 times SEX..BNZ at 0x09-0x10, NOP, IDL
+	loop = [0x0A, 0x0B, 0x0C, 0x0D, 0x0E, 0x0F, 0x09]
+	assert pcs == [2, 3, 5, 6, 8, 9] + loop * 9 + loop[:-1] + [0x11, 0x12, 0x13]
+	assert cycles == [2] * 76 + [3, 2]
+	assert (gate.instructions, gate.cycles) == (78, 157)
+	assert gate.parts['mem'].data[0x50] == 55
+	assert [gate.getR(i) for i in range(5)] == [0x13, 0, 0, 0x50, 0]
+	assert (gate.P, gate.register('X'), gate.register('D'), gate.register('DF')) == (0, 3, 0, 0)
+
+
+def test_gate_level_input_output():
+	gate, clock = _gate_level([0xF8, 0x10, 0xA2, 0xE2, 0x63, 0x22, 0x6C, 0x00])  # OUT 3; INP 4
+	gate.parts['mem'].data[0x10] = 0x99
+	written = []
+	gate.on_output = lambda port, value: written.append((port, value))
+	gate.on_input = lambda port: 0x42
+	while not gate.idle:
+		gate.step()
+	clock.tick()
+	assert written == [(3, 0x99)]
+	assert gate.register('D') == 0x42
+	assert gate.parts['mem'].data[0x10] == 0x42
@@ -0,0 +1,58 @@
+import pytest
+
+from pycircuitsim.arch.cdp1802core import CDP1802Core
+from pycircuitsim.arch.cdp1802dual import DualModeCDP1802, BEHAVIOURAL, GATE
+
+
+# sum 10 + 9 + ... + 1 into M(0x50)
+SUM_PROGRAM = [
+	0xF8, 0x50, 0xA3, 0xF8, 0x0A, 0xA4, 0xF8, 0x00, 0x53,
+	0xE3, 0x84, 0xF4, 0x53, 0x24, 0x84, 0x3A, 0x09, 0xC4, 0x00,
+]
+
+
+def test_state_round_trip():
+	core = CDP1802Core(memory_size=256)
+	core.load(SUM_PROGRAM)
+	core.run(20)
+	state = core.export_state()
+	dual = DualModeCDP1802(memory_size=256, mode=GATE)
+	dual.gate.import_state(state)
+	assert dual.gate.export_state() == state
+
+
+def test_switch_mid_run():
+	reference = CDP1802Core(memory_size=256)
+	reference.load(SUM_PROGRAM)
+	reference.run(1000)
+
+	dual = DualModeCDP1802(memory_size=256)
+	dual.load(SUM_PROGRAM)
+	dual.run_until(40)
+	dual.switch(GATE)
+	assert dual.cpu is dual.gate
+	dual.run(10)
+	dual.switch(BEHAVIOURAL)
+	dual.run(1000)
+	assert dual.idle
+	assert dual.core.export_state() == reference.export_state()
+
+
+def test_gate_mode_from_start():
+	dual = DualModeCDP1802(memory_size=128, mode=GATE)
+	dual.load(SUM_PROGRAM)
+	dual.run(1000)
+	assert dual.gate.parts['mem'].data[0x50] == 55
+	dual.switch(BEHAVIOURAL)
+	assert dual.core.memory[0x50] == 55
+	assert dual.cycles == 157
+
+
+def test_memory_that_does_not_fit():
+	core = CDP1802Core(memory_size=256)
+	core.memory[200] = 1
+	dual = DualModeCDP1802(memory_size=128, mode=GATE)
+	with pytest.raises(ValueError):
+		dual.gate.import_state(core.export_state())
+	with pytest.raises(ValueError):
+		dual.switch('rtl')
@@ -0,0 +1,215 @@
+import pytest
+
+from pycircuitsim.core.chip import ClockedChip
+from pycircuitsim.hardware.clock import Clock, ClockScheduler
+from pycircuitsim.hardware.memory import Register, DataFlipFlop, RAM
+
+
+class Counter(ClockedChip):
+	__slots__ = ('ticks', 'log', 'name')
+
+	def __init__(self, name='counter', log=None):
+		super().__init__([], ['count'])
+		self.ticks = 0
+		self.name = name
+		self.log = log if log is not None else []
+
+	def setup_wiring(self):
+		pass
+
+	def on_tick(self, value):
+		self.ticks += 1
+		self.log.append((self.name, value))
+		self.set_pin('count', self.ticks)
+
+
+def test_idle_register_is_skipped():
+	clock = Clock()
+	register = Register(8)
+	clock.subscribe_to_tick(register)
+	register.set_value(5)
+	clock.tick()
+	clock.tick()
+	assert register.get_value() == 5
+	assert clock.skipped == 1
+	register.set_pin('load', False)
+	clock.tick()
+	assert clock.skipped == 1
+	register.set_pin('in', True)
+	register.set_pin('load', 1)
+	clock.tick()
+	register.set_pin('load', True)  # same value, other type
+	clock.tick()
+	assert register.get_value() is True
+	assert clock.skipped == 1
+
+
+def test_wake():
+	clock = Clock()
+	dff = DataFlipFlop()
+	clock.subscribe_to_tick(dff)
+	dff.set_pin('in', True)
+	clock.tick()
+	dff.set_pin('out', False)
+	clock.tick()
+	assert dff.pin('out') is False
+	clock.wake(dff)
+	clock.tick()
+	assert dff.pin('out') is True
+
+
+def test_run_fast_forward():
+	clock = Clock()
+	register = Register(8)
+	clock.subscribe_to_tick(register)
+	register.set_value(9)
+	clock.run(1_000_000)
+	assert clock.value == 1_000_000
+	assert clock.skipped == 999_999
+	assert register.get_value() == 9
+
+
+def test_run_ticks_every_cycle():
+	clock = Clock()
+	counter = Counter()
+	clock.subscribe_to_tick(counter)
+	clock.subscribe_to_tick(DataFlipFlop())
+	clock.run(100)
+	assert counter.ticks == 100
+	assert clock.value == 100
+
+
+def test_scheduler_domains():
+	log = []
+	scheduler = ClockScheduler()
+	scheduler.add_domain('cpu', period=1).subscribe_to_tick(Counter('cpu', log))
+	scheduler.add_domain('bus', period=4).subscribe_to_tick(Counter('bus', log))
+	scheduler.run(8)
+	assert scheduler.time == 8
+	assert scheduler['cpu'].value == 8
+	assert scheduler['bus'].value == 2
+	assert log[3:5] == [('cpu', 4), ('bus', 1)]
+	assert scheduler.next_time() == 9
+	with pytest.raises(ValueError):
+		scheduler.add_domain('cpu')
+	with pytest.raises(ValueError):
+		scheduler.add_domain('slow', period=0)
+
+
+def test_scheduler_single_domain():
+	scheduler = ClockScheduler()
+	clock = scheduler.add_domain('clk', period=3)
+	counter = Counter()
+	clock.subscribe_to_tick(counter)
+	scheduler.run(10)
+	assert counter.ticks == 3
+	assert scheduler.time == 9
+	assert scheduler.next_time() == 12
+	scheduler.add_domain('phase', period=2, phase=11)
+	scheduler.step()
+	assert scheduler.time == 11
+	assert scheduler['phase'].value == 1
+
+
+def test_scheduler_phase_after_start():
+	scheduler = ClockScheduler()
+	scheduler.add_domain('clk', period=3)
+	scheduler.run(9)
+	scheduler.add_domain('zero', period=4, phase=0)
+	scheduler.add_domain('three', period=4, phase=3)
+	scheduler.add_domain('now', period=3, phase=0)
+	assert sorted(time for time, *rest in scheduler._queue) == [11, 12, 12, 12]
+	assert scheduler.step() == 11
+	assert scheduler['three'].value == 1
+	assert scheduler.step() == 12
+	assert scheduler['zero'].value == scheduler['now'].value == 1
+
+
+class Follower(ClockedChip):
+	"""Samples the output of another chip on every tick"""
+	__slots__ = ('source',)
+	two_phase = True
+
+	def __init__(self, source):
+		super().__init__([], ['out'])
+		self.source = source
+
+	def setup_wiring(self):
+		pass
+
+	def sample(self, params=None):
+		return self.source.pin('out')
+
+	def publish(self, state):
+		self.set_pin('out', state)
+
+
+class LateFollower(Follower):
+	"""Reads the output of another chip in on_tick"""
+	__slots__ = ()
+	two_phase = False
+
+	def on_tick(self, value):
+		self.publish(self.sample())
+
+
+@pytest.mark.parametrize('follower_first', [False, True])
+@pytest.mark.parametrize('follower_class', [Follower, LateFollower])
+def test_two_phase_order_independent(follower_first, follower_class):
+	clock = Clock()
+	register = Register(8)
+	follower = follower_class(register)
+	for chip in ([follower, register] if follower_first else [register, follower]):
+		clock.subscribe_to_tick(chip)
+	seen = []
+	for value in [1, 2, 3]:
+		register.set_value(value)
+		clock.tick()
+		seen.append((register.get_value(), follower.pin('out')))
+	assert seen == [(1, False), (2, 1), (3, 2)]
+
+
+def test_ram_two_phase():
+	clock = Clock()
+	register = Register(8)
+	ram = RAM(4, 8)
+	clock.subscribe_to_tick(register)
+	clock.subscribe_to_tick(ram)
+	register.set_value(2)
+	ram.set_pin('in', 7)
+	ram.set_pin('load', True)
+	clock.tick()
+	assert register.get_value() == 2
+	assert list(ram.data) == [7, 0, 0, 0]
+
+
+def test_single_phase_order():
+	clock = Clock()
+	register = Register(8)
+	follower = LateFollower(register)
+	late = LateFollower(follower)
+	for chip in [follower, register, late]:
+		clock.subscribe_to_tick(chip)
+	register.set_value(1)
+	clock.tick()
+	assert (register.get_value(), follower.pin('out'), late.pin('out')) == (1, False, False)
+	register.set_value(2)
+	clock.tick()
+	# on_tick runs after the register sampled and before it published, and
+	# sees the single phase chips subscribed before it already updated
+	assert (register.get_value(), follower.pin('out'), late.pin('out')) == (2, 1, 1)
+
+
+def test_idle_state_is_kept_per_chip():
+	clock = Clock()
+	register = Register(8)
+	clock.subscribe_to_tick(register)
+	register.set_value(3)
+	clock.tick()
+	other = Register(8)
+	other.set_pin('in', 3)
+	other.set_pin('load', True)
+	clock._inputs[id(other)] = clock._inputs.pop(id(register))  # as if other reused the id
+	clock.subscribe_to_tick(other)
+	clock.tick()
+	assert other.get_value() == 3
@@ -0,0 +1,81 @@
+from itertools import product
+import random
+
+import pytest
+
+from pycircuitsim.core import codegen
+from pycircuitsim.core.chip import BooleanFunctionChip
+from pycircuitsim.core.codegen import compile_python
+from pycircuitsim.core.errors import ChipWiringError
+from pycircuitsim.hardware.adder import FullAdder
+from pycircuitsim.hardware.logic_gates import Nand, Xor, AndMultiWay, \
+	HalfAdder, DemuxNWay, MuxNWay, MultiBitAnd, MultiBitNot
+from pycircuitsim.hardware.memory import Register
+
+
+def _same_as_chip(chip, inputs):
+	compiled = compile_python(chip)
+	assert compiled.compiled
+	for values in inputs:
+		assert compiled.evaluate(values) == chip.evaluate(values)
+	return compiled
+
+
+def test_gates():
+	for chip in [Nand(), Xor(), HalfAdder()]:
+		_same_as_chip(chip, [{'a': a, 'b': b} for a, b in product([False, True], repeat=2)])
+
+
+def test_xor_source_is_straight_line():
+	source = compile_python(Xor()).source
+	assert 'pin' not in source and 'process' not in source
+	assert source.count('\n') == 7
+
+
+def test_multi_bit_chips():
+	rnd = random.Random(3)
+	_same_as_chip(FullAdder(16), [{'in0': rnd.getrandbits(16), 'in1': rnd.getrandbits(16)} for i in range(50)])
+	_same_as_chip(MultiBitAnd(8), [{'a': rnd.getrandbits(8), 'b': rnd.getrandbits(8)} for i in range(20)])
+	_same_as_chip(MultiBitNot(8), [{'a': rnd.getrandbits(8)} for i in range(20)])
+	names = [str(i) for i in range(4)]
+	_same_as_chip(AndMultiWay(4), [dict(zip(names, bits)) for bits in product([False, True], repeat=4)])
+
+
+def test_mux_demux():
+	_same_as_chip(MuxNWay(2), [{'in0': 1, 'in1': 2, 'in2': 3, 'in3': 4, 'sel0': s0, 'sel1': s1}
+		for s0, s1 in product([False, True], repeat=2)])
+	_same_as_chip(DemuxNWay(2), [{'in': True, 'sel0': s0, 'sel1': s1}
+		for s0, s1 in product([False, True], repeat=2)])
+
+
+def test_positional_call():
+	compiled = compile_python(FullAdder(8))
+	assert compiled.inputs == ['in0', 'in1']
+	assert compiled(200, 100) == (44,)
+
+
+def test_shared_per_class_and_parameters():
+	assert compile_python(FullAdder(16)).fn is compile_python(FullAdder(16)).fn
+	assert compile_python(FullAdder(16)).fn is not compile_python(FullAdder(8)).fn
+	assert compile_python(Xor()).fn is compile_python(Xor()).fn
+
+
+def test_missing_mapping():
+	chip = BooleanFunctionChip(['a'], ['out'], {(True,): (False,)})
+	compiled = compile_python(chip)
+	assert compiled.evaluate({'a': True}) == {'out': False}
+	with pytest.raises(ChipWiringError):
+		compiled.evaluate({'a': False})
+
+
+def test_fallback(monkeypatch):
+	monkeypatch.delitem(codegen.GENERATORS, 'not')
+	compiled = compile_python(Xor())
+	assert not compiled.compiled
+	assert compiled.evaluate({'a': True, 'b': False}) == {'out': True}
+	assert compiled(True, True) == (False,)
+
+
+def test_clocked_chips_are_rejected():
+	with pytest.raises(TypeError):
+		compile_python(Register())
@@ -0,0 +1,80 @@
+from itertools import product
+
+import pytest
+
+from pycircuitsim.core.declarative import DeclarativeChip, Circuit, inputs, \
+	And, Or, Xor, Not, Nand, Const
+from pycircuitsim.core.errors import ChipWiringError
+from pycircuitsim.core.netlist import compile_chip
+from pycircuitsim.utils.graph import Fn, In
+
+
+def test_xor_chip():
+	a, b = inputs('a', 'b')
+	chip = DeclarativeChip({'out': Or(And(a, Not(b)), And(Not(a), b))})
+	assert list(chip.inPins) == ['a', 'b']
+	for x, y in product([False, True], repeat=2):
+		chip.set_pin('a', x)
+		chip.set_pin('b', y)
+		assert chip.pin('out') == (x != y)
+
+
+def test_common_subexpressions():
+	a, b = inputs('a', 'b')
+	circuit = Circuit({'x': And(Not(a), b), 'y': Or(And(b, Not(a)), Not(a))})
+	# not a, and, or: the second And(b, Not(a)) and Not(a) are shared
+	assert len(circuit.steps) == 3
+
+
+def test_constant_folding():
+	a, b = inputs('a', 'b')
+	circuit = Circuit({
+		'x': And(a, Const(True)),
+		'y': Or(b, Not(Const(True))),
+		'z': Xor(a, a),
+		'w': Not(Not(b)),
+		'v': Or(a, Not(a)),
+	})
+	assert circuit.steps == []
+	assert circuit.evaluate({'a': True, 'b': False}) == \
+		{'x': True, 'y': False, 'z': False, 'w': False, 'v': True}
+
+
+def test_operators():
+	a, b, c = inputs('a', 'b', 'c')
+	chip = DeclarativeChip({'out': (a & ~b) | (c ^ a)})
+	for x, y, z in product([False, True], repeat=3):
+		assert chip.evaluate({'a': x, 'b': y, 'c': z}) == {'out': (x and not y) or (z != x)}
+
+
+def test_lowered_netlist():
+	a, b, c = inputs('a', 'b', 'c')
+	chip = DeclarativeChip({'sum': Xor(a, b, c), 'carry': Or(And(a, b), And(c, Xor(a, b)))})
+	netlist = compile_chip(chip)
+	assert all(op[0] != 'call' for op in netlist.ops)
+	for x, y, z in product([False, True], repeat=3):
+		values = {'a': x, 'b': y, 'c': z}
+		assert netlist.evaluate(values) == chip.evaluate(values)
+
+
+def test_custom_function():
+	a, b = inputs('a', 'b')
+	both = Fn(lambda x, y: x + y, a, b)
+	chip = DeclarativeChip({'out': both, 'n': Nand(a, b)})
+	assert chip.evaluate({'a': 2, 'b': 3}) == {'out': 5, 'n': False}
+	netlist = compile_chip(chip)
+	assert netlist.ops[0][0] == 'call'
+	assert netlist.evaluate({'a': 1, 'b': 1}) == {'out': 2, 'n': False}
+
+
+def test_declared_inputs():
+	a, b = inputs('a', 'b')
+	chip = DeclarativeChip({'out': Not(b)}, input_pins=['b', 'a'])
+	assert list(chip.inPins) == ['b', 'a']
+	with pytest.raises(ChipWiringError):
+		DeclarativeChip({'out': And(a, b)}, input_pins=['a'])
+
+
+def test_in_resolve_does_not_print(capsys):
+	assert In('a').resolve({'a': 1}) == 1
+	assert capsys.readouterr().out == ''
@@ -0,0 +1,56 @@
+from itertools import product
+import random
+
+import pytest
+
+from pycircuitsim.core.chip import BooleanFunctionChip
+from pycircuitsim.core.errors import ChipWiringError
+from pycircuitsim.core.events import EventSimulator
+from pycircuitsim.hardware.adder import FullAdder
+from pycircuitsim.hardware.logic_gates import Xor, AndMultiWay
+
+
+def test_xor():
+	sim = EventSimulator(Xor())
+	for a, b in product([False, True], repeat=2):
+		sim.set_pins({'a': a, 'b': b})
+		assert sim.pin('out') == (a ^ b)
+
+
+def test_unchanged_write_does_nothing():
+	sim = EventSimulator(Xor())
+	sim.set_pin('a', True)
+	evaluations = sim.evaluations
+	sim.set_pin('a', True)
+	assert sim.evaluations == evaluations
+
+
+def test_change_only_runs_readers():
+	chip = AndMultiWay(16)
+	sim = EventSimulator(chip)
+	sim.set_pins({str(i): True for i in range(16)})
+	assert sim.pin('out') is True
+
+	evaluations = sim.evaluations
+	sim.set_pin('15', False)
+	assert sim.pin('out') is False
+	assert sim.evaluations - evaluations < len(sim.netlist.ops) // 4
+
+
+def test_full_adder():
+	chip = FullAdder(16)
+	sim = EventSimulator(chip)
+	for x, y in [(random.randint(0, 0xFFFF), random.randint(0, 0xFFFF)) for i in range(100)]:
+		assert sim.evaluate({'in0': x, 'in1': y})['out0'] == (x + y) & 0xFFFF
+
+
+def test_table_mapping_not_found():
+	sim = EventSimulator(BooleanFunctionChip(['a'], ['out'], {(False,): (True,)}))
+	with pytest.raises(ChipWiringError):
+		sim.set_pin('a', True)
+
+
+def test_event_budget():
+	sim = EventSimulator(FullAdder(16), max_events=10)
+	with pytest.raises(ChipWiringError):
+		sim.set_pins({'in0': 0xFFFF, 'in1': 1})
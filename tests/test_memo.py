@@ -0,0 +1,105 @@
+from itertools import product
+import random
+
+import pytest
+
+from pycircuitsim.core.chip import NotClockedChip
+from pycircuitsim.core.memo import EvaluationCache
+from pycircuitsim.hardware.adder import FullAdder
+from pycircuitsim.hardware.logic_gates import And, Xor, MuxNWay, DemuxNWay
+from pycircuitsim.hardware.memory import Register
+
+
+def test_lru_eviction():
+	cache = EvaluationCache(2)
+	cache.put((1,), ('a',))
+	cache.put((2,), ('b',))
+	assert cache.get((1,)) == ('a',)
+	cache.put((3,), ('c',))
+	assert cache.get((2,)) is None
+	assert cache.get((1,)) == ('a',)
+	assert len(cache) == 2
+	assert (cache.hits, cache.misses) == (2, 1)
+	with pytest.raises(ValueError):
+		EvaluationCache(0)
+
+
+def test_memoized_xor():
+	chip = Xor()
+	cache = chip.memoize(8)
+	for i in range(3):
+		for a, b in product([False, True], repeat=2):
+			assert chip.evaluate({'a': a, 'b': b}) == {'out': a != b}
+	assert cache.misses == 4
+	assert cache.hits == 8
+
+
+def test_memoized_adder():
+	chip = FullAdder(8)
+	cache = chip.memoize(16)
+	rnd = random.Random(1)
+	operands = [(rnd.getrandbits(8), rnd.getrandbits(8)) for i in range(10)]
+	for i in range(5):
+		for a, b in operands:
+			assert chip.evaluate({'in0': a, 'in1': b}) == {'out0': (a + b) & 0xff}
+	assert cache.misses == 10
+	assert len(cache) == 10
+
+
+def test_memoized_mux_and_demux():
+	mux = MuxNWay(1)
+	demux = DemuxNWay(2)
+	mux.memoize()
+	demux.memoize()
+	for i in range(2):
+		assert mux.evaluate({'in0': 3, 'in1': 4, 'sel0': True}) == {'out': 4}
+		assert demux.evaluate({'in': True, 'sel0': True, 'sel1': False}) == \
+			{'out0': False, 'out1': True, 'out2': False, 'out3': False}
+	assert mux.cache.hits == 1 and demux.cache.hits == 1
+
+
+def test_memoize_off():
+	chip = Xor()
+	chip.memoize()
+	assert chip.memoize(None) is None
+	assert chip.cache is None
+	chip.set_pin('a', True)
+	assert chip.pin('out') is True
+
+
+class WithRegister(NotClockedChip):
+	def __init__(self):
+		super().__init__(['in'], ['out'])
+		self.add_part('reg', Register())
+
+	def setup_wiring(self):
+		def f():
+			self.link_pins('in', 'reg.in')
+			self.link_pins('reg.out', 'out')
+		return f
+
+
+def test_stateful_chips_are_bypassed():
+	chip = WithRegister()
+	assert chip.is_stateful()
+	assert chip.memoize() is None
+	assert not Xor().is_stateful()
+
+
+def test_unhashable_inputs():
+	chip = MuxNWay(1)
+	chip.memoize()
+	assert chip.evaluate({'in0': [1], 'in1': [2], 'sel0': False}) == {'out': [1]}
+
+
+def test_memoized_and_gate():
+	chip = And()
+	cache = chip.memoize()
+	for i in range(3):
+		chip.set_pin('a', True)
+		chip.set_pin('b', True)
+		assert chip.pin('out') is True
+	assert cache.hits > 0
+	chip.set_pin('a', 1)
+	chip.set_pin('b', 1)
+	assert chip.pin('out') == 1 and type(chip.pin('out')) is int
@@ -0,0 +1,171 @@
+from itertools import product
+import random
+
+import pytest
+
+from pycircuitsim.core.chip import BooleanFunctionChip, MultiBitChip, NotClockedChip
+from pycircuitsim.core.errors import ChipWiringError
+from pycircuitsim.core.netlist import compile_chip
+from pycircuitsim.hardware.adder import FullAdder
+from pycircuitsim.hardware.clock import Clock
+from pycircuitsim.hardware.logic_gates import Nand, Xor, AndMultiWay, \
+	HalfAdder, DemuxNWay, MuxNWay, MultiBitAnd, MultiBitOr, MultiBitNot
+from pycircuitsim.hardware.memory import Register
+from pycircuitsim.arch.cdp1802cosmac import CDP1802
+
+
+def _same_as_chip(chip, inputs):
+	netlist = compile_chip(chip)
+	for values in inputs:
+		for name, value in values.items():
+			chip.set_pin(name, value)
+		chip.process()
+		outputs = netlist.evaluate(values)
+		for name in chip.outPins.keys():
+			assert outputs[name] == chip.pin(name)
+	return netlist
+
+
+def test_gates():
+	for chip in [Nand(), Xor(), HalfAdder()]:
+		_same_as_chip(chip, [{'a': a, 'b': b} for a, b in product([False, True], repeat=2)])
+
+
+def test_structural_chips_are_flattened():
+	for chip in [Nand(), Xor(), AndMultiWay(4)]:
+		netlist = compile_chip(chip)
+		assert all(op[0] in ('copy', 'and', 'or', 'not') for op in netlist.ops)
+
+
+def test_xor_internal_signals():
+	netlist = compile_chip(Xor())
+	netlist.evaluate({'a': True, 'b': False})
+	assert netlist.pin('not1.out') is False
+	assert netlist.pin('and1.out') is True
+
+
+def test_andmultiway():
+	inputs = [{str(i): v for i, v in enumerate(p)} for p in product([False, True], repeat=4)]
+	_same_as_chip(AndMultiWay(4), inputs)
+
+
+def test_mux_demux():
+	inputs = [{'sel0': s0, 'sel1': s1, 'in0': False, 'in1': True, 'in2': True, 'in3': False}
+		for s0, s1 in product([False, True], repeat=2)]
+	_same_as_chip(MuxNWay(2), inputs)
+	inputs = [{'in': i, 'sel0': s0, 'sel1': s1} for i, s0, s1 in product([False, True], repeat=3)]
+	_same_as_chip(DemuxNWay(2), inputs)
+
+
+def test_multibit():
+	pairs = [{'a': random.randint(0, 0xFFFF), 'b': random.randint(0, 0xFFFF)} for i in range(50)]
+	_same_as_chip(MultiBitAnd(16), pairs)
+	_same_as_chip(MultiBitOr(8), pairs)
+	_same_as_chip(MultiBitNot(12), [{'a': p['a']} for p in pairs])
+
+
+def test_full_adder():
+	pairs = [{'in0': random.randint(0, 0xFF), 'in1': random.randint(0, 0xFF)} for i in range(200)]
+	netlist = _same_as_chip(FullAdder(8), pairs)
+	assert netlist.evaluate({'in0': 200, 'in1': 100})['out0'] == 44
+
+
+def test_opaque_chip():
+	def wiring(chip, bit):
+		chip.set_pin('out0', chip.pin('out0') | (chip.pin('in0') >> bit & 1) << bit)
+
+	chip = MultiBitChip(4, 1, 1, wiring)
+	netlist = compile_chip(chip)
+	assert [op[0] for op in netlist.ops] == ['call']
+	assert netlist.evaluate({'in0': 0xFF})['out0'] == 0xF
+
+
+def test_structural_xor():
+	netlist = compile_chip(Xor())
+	assert 'call' not in [op[0] for op in netlist.ops]
+
+
+class NestedHandle(NotClockedChip):
+	"""Writes a pin of a part of a part through a pin handle"""
+	__slots__ = ('handle',)
+
+	def __init__(self):
+		self.handle = None
+		super().__init__(['a'], ['out'])
+		self.add_part('nand', Nand())
+
+	def setup_wiring(self):
+		def f():
+			if self.handle is None:
+				self.handle = self.pin_ref('nand.and.a')
+			self.handle.write(True)
+			self.process_chip('nand')
+			self.link_pins('nand.out', 'out')
+		return f
+
+
+def test_nested_handle_is_not_structural():
+	chip = NestedHandle()
+	chip.process()
+	netlist = compile_chip(chip)
+	assert [op[0] for op in netlist.ops] == ['call']
+
+
+class CompilesWhileWired(NotClockedChip):
+	"""Compiles another chip in the middle of its wiring"""
+	__slots__ = ()
+
+	def __init__(self):
+		super().__init__(['a'], ['out'])
+		self.add_part('nand', Nand())
+
+	def setup_wiring(self):
+		def f():
+			self.link_pins('a', 'nand.a')
+			compile_chip(Nand())
+			self.link_pins('a', 'nand.b')
+			self.process_chip('nand')
+			self.link_pins('nand.out', 'out')
+		return f
+
+
+def test_nested_tracing():
+	netlist = compile_chip(CompilesWhileWired())
+	assert 'call' not in [op[0] for op in netlist.ops]
+	assert netlist.evaluate({'a': True})['out'] is False
+	assert netlist.evaluate({'a': False})['out'] is True
+
+
+def test_missing_mapping():
+	chip = BooleanFunctionChip(['a', 'b'], ['out'], {(False, False): (True,)})
+	netlist = compile_chip(chip)
+	assert netlist.evaluate({'a': False, 'b': False})['out'] is True
+	with pytest.raises(ChipWiringError):
+		netlist.evaluate({'a': True, 'b': False})
+
+
+def test_register():
+	clock = Clock()
+	chip = Register()
+	clock.subscribe_to_tick(chip)
+	netlist = compile_chip(chip)
+
+	for value, load in [(23, False), (23, True), (5, False), (7, True), (7, True)]:
+		chip.set_pin('in', value)
+		chip.set_pin('load', load)
+		clock.tick()
+		assert netlist.tick(inputs={'in': value, 'load': load})['out'] == chip.pin('out')
+
+
+def test_cosmac():
+	cosmac = CDP1802([], [])
+	netlist = compile_chip(cosmac)
+
+	netlist.set_pin('S.in4', 3)  # N
+	netlist.set_pin('S.load', 1 << 4)
+	netlist.set_pin('R.in2', 10)
+	netlist.set_pin('R.load', 1 << 2)
+	netlist.tick()
+	assert netlist.pin('S.out4') == 3
+	assert netlist.pin('R.out2') == 10
+	assert netlist.pin('R.out3') == 0
@@ -0,0 +1,89 @@
+from itertools import product
+import random
+
+from pycircuitsim.core.chip import BooleanFunctionChip
+from pycircuitsim.core.codegen import compile_python
+from pycircuitsim.core.bitslice import BitSlicedEvaluator
+from pycircuitsim.core.netlist import compile_chip
+from pycircuitsim.core.optimize import optimize, optimize_chip
+from pycircuitsim.core.schedule import LinkedChip
+from pycircuitsim.hardware.adder import FullAdder
+from pycircuitsim.hardware.logic_gates import Nand, Xor, Not, And, Or, HalfAdder, AndMultiWay, MuxNWay
+
+
+def _equivalent(chip, optimized, inputs):
+	for values in inputs:
+		assert optimized.evaluate(values) == chip.evaluate(values)
+
+
+def test_nand_and_xor_are_merged():
+	for chip, kind in [(Nand(), 'nand'), (Xor(), 'xor')]:
+		netlist, report = optimize(chip)
+		assert [op[0] for op in netlist.ops] == [kind]
+		assert report.gates_after == 1
+		_equivalent(chip, netlist, [{'a': a, 'b': b} for a, b in product([False, True], repeat=2)])
+	netlist, report = optimize(Xor())
+	assert report.removed == 4
+
+
+def test_constant_carry_is_folded():
+	chip = FullAdder(8)
+	netlist, report = optimize(chip)
+	assert 'const' not in [op[0] for op in netlist.ops]
+	tables = [op for op in netlist.ops if op[0] == 'table']
+	assert len(tables[0][1]) == 2 and all(len(op[1]) == 3 for op in tables[1:])
+	rnd = random.Random(2)
+	_equivalent(chip, netlist, [{'in0': rnd.getrandbits(8), 'in1': rnd.getrandbits(8)} for i in range(50)])
+
+
+def test_constant_inputs():
+	links = [('a', 'and.a'), ('one.out', 'and.b'), ('and.out', 'or.a'), ('zero.out', 'or.b'), ('or.out', 'out')]
+	zero = BooleanFunctionChip([], ['out'], {(): (False,)})
+	one = BooleanFunctionChip([], ['out'], {(): (True,)})
+	chip = LinkedChip(['a'], ['out'], {'zero': zero, 'one': one, 'and': And(), 'or': Or()}, links)
+	netlist, report = optimize(chip)
+	assert netlist.ops == []
+	assert netlist.evaluate({'a': True}) == {'out': True}
+	assert netlist.evaluate({'a': False}) == {'out': False}
+
+
+def test_dead_ops():
+	links = [('a', 'not1.a'), ('not1.out', 'out'), ('a', 'not2.a')]
+	chip = LinkedChip(['a'], ['out'], {'not1': Not(), 'not2': Not()}, links)
+	netlist, report = optimize(chip)
+	assert report.dead == 1
+	assert len(netlist.ops) == 1
+
+
+def test_optimized_chip():
+	chip = AndMultiWay(8)
+	flat, report = optimize_chip(chip)
+	assert flat.parts == {}
+	assert report.copies > 0
+	names = [str(i) for i in range(8)]
+	rnd = random.Random(1)
+	_equivalent(chip, flat, [{name: rnd.random() < 0.9 for name in names} for i in range(30)])
+	half = HalfAdder()
+	flat, report = optimize_chip(half)
+	for a, b in product([False, True], repeat=2):
+		flat.set_pin('a', a)
+		flat.set_pin('b', b)
+		assert flat.pin('sum') == half.evaluate({'a': a, 'b': b})['sum']
+
+
+def test_optimized_netlist_backends():
+	netlist, report = optimize(Nand())
+	assert BitSlicedEvaluator(netlist).sliced
+	flat, report = optimize_chip(Nand())
+	lowered = compile_chip(flat)
+	assert lowered.evaluate({'a': True, 'b': True}) == {'out': False}
+	assert compile_python(flat).evaluate({'a': True, 'b': False}) == {'out': True}
+
+
+def test_mux_with_constant_selection():
+	mux = MuxNWay(1)
+	netlist = compile_chip(mux)
+	netlist.ops.insert(0, ('const', True, netlist.slot('sel0')))
+	optimized, report = optimize(netlist)
+	assert optimized.ops == []
+	assert optimized.evaluate({'in0': 3, 'in1': 4}) == {'out': 4}
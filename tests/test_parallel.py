@@ -0,0 +1,47 @@
+import os
+import random
+
+from pycircuitsim.hardware.adder import FullAdder
+from pycircuitsim.parallel import ParallelRunner, run_parallel
+
+
+def _adder():
+	return FullAdder(8)
+
+
+def _owner(chip, item):
+	return os.getpid(), id(chip)
+
+
+def _vectors(n, seed=4):
+	rnd = random.Random(seed)
+	return [{'in0': rnd.getrandbits(8), 'in1': rnd.getrandbits(8)} for i in range(n)]
+
+
+def test_results_in_order():
+	vectors = _vectors(300)
+	results = run_parallel(_adder, vectors, workers=2, chunk_size=16)
+	assert results == [{'out0': (v['in0'] + v['in1']) & 0xff} for v in vectors]
+
+
+def test_chip_built_once_per_worker():
+	with ParallelRunner(_adder, _owner, workers=2, chunk_size=4) as runner:
+		owners = list(runner.map(range(200)))
+	chips = {}
+	for pid, chip in owners:
+		chips.setdefault(pid, set()).add(chip)
+	assert all(len(ids) == 1 for ids in chips.values())
+
+
+def test_streaming_generator_and_reduce():
+	def items():
+		for vector in _vectors(100, seed=9):
+			yield vector
+	with ParallelRunner(_adder, workers=2, chunk_size=8, max_pending=2) as runner:
+		total = runner.reduce(items(), lambda acc, out: acc + out['out0'], 0)
+	assert total == sum((v['in0'] + v['in1']) & 0xff for v in _vectors(100, seed=9))
+
+
+def test_in_process():
+	runner = ParallelRunner(_adder, workers=0)
+	assert list(runner.map(_vectors(5))) == run_parallel(_adder, _vectors(5), workers=1)
@@ -0,0 +1,115 @@
+import pytest
+
+from pycircuitsim.core.errors import IncorrectPinNameError
+from pycircuitsim.hardware.adder import FullAdder
+from pycircuitsim.hardware.logic_gates import And, Xor, DemuxNWay, MuxNWay
+from pycircuitsim.hardware.memory import Register
+
+
+def test_layout_is_shared():
+	assert And().layout is And().layout
+	assert FullAdder(8).parts['adder0'].layout is FullAdder(4).parts['adder3'].layout
+	assert DemuxNWay(2).layout is not DemuxNWay(3).layout
+
+
+def test_slots():
+	for chip in [And(), Xor(), FullAdder(4), DemuxNWay(2), MuxNWay(2), Register()]:
+		assert not hasattr(chip, '__dict__')
+
+
+def test_pin_values():
+	chip = And()
+	chip.set_pin('a', True)
+	chip.set_pin('b', True)
+	assert chip.pin_values == [True, True, True]
+	assert chip.layout.index['out'] == 2
+
+
+def test_pin_views():
+	chip = Xor()
+	assert list(chip.inPins.keys()) == ['a', 'b']
+	assert 'out' in chip.outPins and 'out' not in chip.inPins
+	chip.inPins['a'] = True
+	chip.process()
+	assert dict(chip.outPins) == {'out': True}
+	with pytest.raises(KeyError):
+		chip.outPins['a']
+
+
+def test_unknown_pin():
+	chip = Xor()
+	with pytest.raises(IncorrectPinNameError):
+		chip.pin('c')
+	with pytest.raises(IncorrectPinNameError):
+		chip.set_pin('c', True)
+	chip.process()
+	assert chip.pin('not1.out') is True
+
+
+def test_pin_ref():
+	chip = Xor()
+	a = chip.pin_ref('a')
+	out = chip.pin_ref('out')
+	a.set(True)
+	assert out.get() is True
+	assert chip.pin_ref('and1.out').get() is True
+	with pytest.raises(IncorrectPinNameError):
+		chip.pin_ref('and1.c')
+	with pytest.raises(IncorrectPinNameError):
+		chip.pin_ref('nand.out')
+
+
+def test_pin_ref_write():
+	chip = And()
+	a, b, out = chip.pin_ref('a'), chip.pin_ref('b'), chip.pin_ref('out')
+	a.write(True)
+	b.write(True)
+	assert out.get() is False
+	b.set(True)
+	assert out.get() is True
+
+
+def test_nested_pin_ref():
+	reg = Register()
+	ref = reg.pin_ref('mux.sel0')
+	assert ref.chip is reg.parts['mux']
+	adder = FullAdder(4)
+	assert adder.pin_ref('adder1.sum').chip is adder.parts['adder1']
+
+
+def test_register_load():
+	reg = Register()
+	reg.set_value(5)
+	reg.on_tick(0)
+	assert reg.get_value() == 5
+	reg.set_pin('load', False)
+	reg.set_pin('in', 7)
+	reg.on_tick(0)
+	assert reg.get_value() == 5
+
+
+def test_unused_layouts_are_released():
+	import gc
+	from pycircuitsim.core.pins import PinLayout
+	chip = MuxNWay(7)
+	key = (chip.layout.inputs, chip.layout.outputs)
+	assert key in PinLayout._shared
+	del chip
+	gc.collect()
+	assert key not in PinLayout._shared
+
+
+def test_mux_resets_its_output():
+	class Logged(MuxNWay):
+		__slots__ = ('resets',)
+
+		def reset_out_pins(self):
+			self.resets += 1
+			super().reset_out_pins()
+
+	mux = Logged(1)
+	mux.resets = 0
+	mux.set_pin('in1', 5)
+	mux.set_pin('sel0', True)
+	assert mux.pin('out') == 5
+	assert mux.resets == 2
@@ -0,0 +1,80 @@
+import pytest
+
+from pycircuitsim.core.chip import AbstractChip, CompositeChip, NotClockedChip, ClockedChip
+from pycircuitsim.core.errors import ChipError
+from pycircuitsim.core.profiling import Profiler
+from pycircuitsim.hardware.clock import Clock
+from pycircuitsim.hardware.logic_gates import Nand, Xor
+from pycircuitsim.hardware.memory import Register
+
+
+def test_counts_and_redundant_writes():
+	nand = Nand()
+	with Profiler() as profiler:
+		nand.set_pin('a', True)
+		nand.set_pin('b', True)
+		nand.set_pin('b', True)
+	stats = {s.label: s for s in profiler.stats.values()}
+	assert set(stats) == {'Nand#0', 'And#0', 'Not#0'}
+	assert stats['Nand#0'].evaluations == 3
+	assert stats['Nand#0'].writes == 6  # 3 inputs, 3 times out
+	assert stats['Nand#0'].redundant == 2  # b again and out
+	assert stats['And#0'].processes == 3
+	assert stats['Not#0'].processes == 3
+	nand_stats = stats['Nand#0']
+	assert nand_stats.cumulative >= nand_stats.self_time >= 0
+	assert nand_stats.cumulative >= sum(s.cumulative for s in stats.values() if s is not nand_stats)
+	assert profiler.by_class()['And'].processes == 3
+	assert nand.pin('out') is False
+
+
+def test_clocked_parts():
+	clock = Clock()
+	register = Register(8)
+	clock.subscribe_to_tick(register)
+	with Profiler() as profiler:
+		for value in [1, 2, 3]:
+			register.set_value(value)
+			clock.tick()
+	classes = profiler.by_class()
+	assert classes['DataFlipFlop'].ticks == 3
+	assert classes['Register'].writes >= 3
+	assert 'Register' in profiler.report()
+
+
+def test_disable_restores_methods():
+	originals = [AbstractChip.Wiring.resolve, AbstractChip.set_pin, CompositeChip.set_pin,
+		CompositeChip.process_chip, NotClockedChip.set_pin, ClockedChip.propagate_tick]
+	profiler = Profiler()
+	with profiler:
+		assert profiler.enabled
+		assert CompositeChip.process_chip is not originals[3]
+		with pytest.raises(ChipError):
+			Profiler().enable()
+	assert not profiler.enabled
+	assert [AbstractChip.Wiring.resolve, AbstractChip.set_pin, CompositeChip.set_pin,
+		CompositeChip.process_chip, NotClockedChip.set_pin, ClockedChip.propagate_tick] == originals
+	Nand().set_pin('a', True)
+	assert profiler.stats == {}
+
+
+def test_collapsed_stacks(tmp_path):
+	nand = Nand()
+	with Profiler() as profiler:
+		for a in [False, True]:
+			nand.set_pin('a', a)
+	lines = profiler.collapsed()
+	assert [line.split(' ')[0] for line in lines] == ['Nand#0', 'Nand#0;And#0', 'Nand#0;Not#0']
+	assert all(int(line.split(' ')[1]) > 0 for line in lines)
+	path = tmp_path / 'nand.folded'
+	profiler.write_collapsed(path, by_class=True)
+	assert path.read_text().splitlines()[1].startswith('Nand;And ')
+
+
+def test_xor_parts_are_seen():
+	xor = Xor()
+	with Profiler() as profiler:
+		xor.set_pin('a', True)
+	classes = profiler.by_class()
+	assert classes['Not'].processes == 2
+	assert classes['Or'].writes >= 3
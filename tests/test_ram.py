@@ -0,0 +1,170 @@
+from array import array
+
+import pytest
+
+from pycircuitsim.arch.cdp1802cosmac import CDP1802
+from pycircuitsim.core.snapshot import snapshot, restore
+from pycircuitsim.hardware.clock import Clock
+from pycircuitsim.hardware.memory import RAM, RAMMultiBank
+
+
+def _write(ram, address, value):
+	ram.set_pin('address', address)
+	ram.set_pin('in', value)
+	ram.set_pin('load', True)
+	ram.on_tick(0)
+	ram.set_pin('load', False)
+
+
+def _read(ram, address):
+	ram.set_pin('address', address)
+	ram.on_tick(0)
+	return ram.pin('out')
+
+
+@pytest.mark.parametrize('word_bits,storage', [(8, bytearray), (12, array), (16, array), (32, array), (64, array)])
+def test_word_width(word_bits, storage):
+	ram = RAM(16, word_bits)
+	assert isinstance(ram.data, storage)
+	assert ram.size == 16
+	_write(ram, 3, (1 << word_bits) - 1)
+	assert _read(ram, 3) == (1 << word_bits) - 1
+	_write(ram, 4, 1 << word_bits)  # masked to the word width
+	assert _read(ram, 4) == 0
+	_write(ram, 5, -1)
+	assert _read(ram, 5) == (1 << word_bits) - 1
+
+
+def test_untyped_words(tmp_path):
+	ram = RAM(4)
+	assert ram.data == [0, 0, 0, 0]
+	_write(ram, 1, 1 << 70)
+	_write(ram, 2, 'text')
+	assert _read(ram, 1) == 1 << 70
+	assert _read(ram, 2) == 'text'
+	ram.load_image([7, 8])
+	assert ram.data == [7, 8, 'text', 0]
+	with pytest.raises(ValueError):
+		ram.dump_image()
+	with pytest.raises(ValueError):
+		RAM(4, path=tmp_path / 'ram.bin')
+
+
+def test_word_width_range():
+	with pytest.raises(ValueError):
+		RAM(4, 0)
+	with pytest.raises(ValueError):
+		RAM(4, 65)
+
+
+def test_load_and_dump_image(tmp_path):
+	ram = RAM(8, 16)
+	ram.load_image([1, 2, 0x1234], 2)
+	assert list(ram.data) == [0, 0, 1, 2, 0x1234, 0, 0, 0]
+	assert ram.dump_image(3, 2) == b'\x02\x00\x34\x12'
+	ram.load_image(b'\xff\xff', 7)
+	assert _read(ram, 7) == 0xffff
+	image = tmp_path / 'image.bin'
+	image.write_bytes(ram.dump_image())
+	other = RAM(8, 16)
+	other.load_image(image)
+	assert list(other.data) == list(ram.data)
+	with pytest.raises(ValueError):
+		ram.load_image([1, 2], 7)
+	with pytest.raises(ValueError):
+		ram.load_image(b'\x00' * 4, 7)
+
+
+def test_file_backed(tmp_path):
+	path = tmp_path / 'mem.bin'
+	ram = RAM(1024, 32, path=path)
+	assert path.stat().st_size == 4096
+	_write(ram, 10, 0xdeadbeef)
+	ram.load_image([7, 8], 1000)
+	ram.close()
+	reopened = RAM(1024, 32, path=path)
+	assert _read(reopened, 10) == 0xdeadbeef
+	assert list(reopened.data[1000:1002]) == [7, 8]
+	saved = snapshot(reopened)
+	_write(reopened, 10, 0)
+	restore(reopened, saved)
+	assert _read(reopened, 10) == 0xdeadbeef
+	reopened.close()
+
+
+def test_cdp1802_firmware():
+	cpu = CDP1802([], [], 4096)
+	clock = Clock()
+	cpu.connect_to_clock(clock)
+	cpu.boot()
+	clock.tick()
+	# R3 = 0x50, M(R3) = 0x2a, idle
+	cpu.parts['mem'].load_image(bytes([0xF8, 0x50, 0xA3, 0xF8, 0x2A, 0x53, 0x00]))
+	while not cpu.idle:
+		cpu.step()
+	assert cpu.parts['mem'].dump_image(0x50, 1) == b'\x2a'
+	assert cpu.export_state()['memory'][0x50] == 0x2a
+
+
+def test_multibank_decoding():
+	interleaved = RAMMultiBank(4, 16)
+	assert [interleaved.decode(a) for a in (0, 1, 5, 63)] == [(0, 0), (1, 0), (1, 1), (3, 15)]
+	blocked = RAMMultiBank(4, 16, interleaved=False)
+	assert [blocked.decode(a) for a in (0, 1, 17, 63)] == [(0, 0), (0, 1), (1, 1), (3, 15)]
+	with pytest.raises(IndexError):
+		interleaved.decode(64)
+	with pytest.raises(ValueError):
+		RAMMultiBank(3, 16)
+
+
+def test_multibank_ports():
+	clock = Clock()
+	ram = RAMMultiBank(4, 16, word_bits=8)
+	clock.subscribe_to_tick(ram)
+	_write(ram, 6, 0x1ff)
+	assert _read(ram, 6) == 0xff
+	assert ram.parts['bank2'].data[1] == 0xff
+
+	ram = RAMMultiBank(4, 16, ports=2)
+	clock.subscribe_to_tick(ram)
+	ram.set_pin('address0', 9)
+	ram.set_pin('in0', 99)
+	ram.set_pin('load0', True)
+	ram.set_pin('address1', 10)
+	clock.tick()
+	assert ram.hits == [0, 1, 1, 0]
+	assert ram.conflicts == [0, 0, 0, 0]
+	ram.set_pin('load0', False)
+	ram.set_pin('address1', 13)  # bank 1 again
+	clock.tick()
+	assert (ram.pin('out0'), ram.pin('out1')) == (99, 0)
+	assert ram.hits == [0, 3, 1, 0]
+	assert ram.conflicts == [0, 1, 0, 0]
+
+
+def test_multibank_batches():
+	ram = RAMMultiBank(8, 128)
+	addresses = list(range(0, 1024, 3))
+	ram.write_batch(addresses, [a * 2 for a in addresses])
+	assert ram.read_batch(addresses) == [a * 2 for a in addresses]
+	assert sum(ram.hits) == 2 * len(addresses)
+	assert sum(ram.conflicts) == 2 * (len(addresses) - 8)
+	ram.reset_counters()
+	assert ram.read_batch(range(8)) == [0, 0, 0, 6, 0, 0, 12, 0]
+	assert ram.hits == [1] * 8
+	assert ram.conflicts == [0] * 8
+
+
+def test_multibank_uses_bank_parts():
+	clock = Clock()
+	ram = RAMMultiBank(2, 4, word_bits=8)
+	clock.subscribe_to_tick(ram)
+	_write(ram, 3, 0x33)
+	bank = ram.parts['bank1']
+	assert (bank.pin('address'), bank.pin('out')) == (1, 0x33)
+	bank.data = bytearray(4)
+	bank.data[1] = 0x44
+	assert _read(ram, 3) == 0x44
+	assert ram.read_batch([3]) == [0x44]
+	with pytest.raises(IndexError):
+		ram.decode(8)
@@ -0,0 +1,122 @@
+import pytest
+
+from pycircuitsim.arch.cdp1802cosmac import CDP1802
+from pycircuitsim.hardware.clock import Clock
+from pycircuitsim.hardware.memory import RegisterFile
+
+
+def _file(*args, **kwargs):
+	clock = Clock()
+	registers = RegisterFile(*args, **kwargs)
+	clock.subscribe_to_tick(registers)
+	return clock, registers
+
+
+def test_load_mask():
+	clock, registers = _file(4, 8)
+	registers.set_value(1, 0x12)
+	registers.set_value(3, 0x34)
+	assert registers.values() == [0, 0, 0, 0]
+	clock.tick()
+	assert registers.values() == [0, 0x12, 0, 0x34]
+	assert registers.pin('load') == 0b1010
+	registers.set_pin('in0', 7)  # not loaded
+	clock.tick()
+	assert registers.get_value(0) == 0
+	for i in range(4):
+		registers.set_value(i, i)
+	clock.tick()
+	assert registers.values() == [0, 1, 2, 3]
+
+
+def test_overflow():
+	clock, registers = _file(3, [4, 8, 1])
+	registers.set_value(1, 0xff)
+	with pytest.raises(OverflowError):
+		registers.set_value(0, 0x10)
+	with pytest.raises(OverflowError):
+		registers.set_value(2, 2)
+	with pytest.raises(OverflowError):
+		registers.set_value(1, -1)
+	with pytest.raises(ValueError):
+		RegisterFile(3, [4, 8])
+
+
+def test_loads_are_masked():
+	clock, registers = _file(3, [4, 8, 1])
+	registers.set_pin('in0', 0x1f)
+	registers.set_pin('load', 0b001)
+	clock.tick()
+	assert registers.values() == [0xf, 0, 0]
+	for i, value in enumerate([-1, 0x1ff, 3]):
+		registers.set_pin(f"in{i}", value)
+	registers.set_pin('load', 0b111)
+	clock.tick()
+	assert registers.values() == [0xf, 0xff, 1]
+
+
+def test_ports():
+	clock, registers = _file(8, 16, read_ports=2, write_ports=2)
+	registers.set_pin('waddr0', 2)
+	registers.set_pin('wdata0', 0x222)
+	registers.set_pin('wen0', True)
+	registers.set_pin('waddr1', 5)
+	registers.set_pin('wdata1', 0x555)
+	registers.set_pin('wen1', True)
+	registers.set_pin('raddr0', 2)
+	registers.set_pin('raddr1', 5)
+	clock.tick()
+	assert registers.pin('rdata0') == 0x222
+	assert registers.pin('rdata1') == 0x555
+	registers.set_value(2, 1)
+	registers.set_pin('wen1', False)
+	registers.set_pin('waddr0', 2)  # the port write comes after the load mask
+	clock.tick()
+	assert registers.get_value(2) == 0x222
+
+
+def test_two_phase():
+	clock = Clock()
+	first, second = RegisterFile(1, 8), RegisterFile(1, 8)
+	clock.subscribe_to_tick(second)
+	clock.subscribe_to_tick(first)
+	first.set_value(0, 1)
+	clock.tick()
+	second.set_pin('in0', first.get_value(0))
+	second.set_pin('load', 1)
+	first.set_value(0, 2)
+	clock.tick()
+	assert (first.get_value(0), second.get_value(0)) == (2, 1)
+	clock.tick()
+	assert clock.skipped == 2
+
+
+def test_cdp1802_registers():
+	cosmac = CDP1802([], [])
+	clock = Clock()
+	cosmac.connect_to_clock(clock)
+	cosmac.boot()
+	clock.tick()
+	assert (cosmac.P, cosmac.register('X'), cosmac.register('IE')) == (0, 0, 1)
+	for i in range(16):
+		cosmac.setR(i, i * 0x101)
+	cosmac.P = 3
+	clock.tick()
+	assert [cosmac.getR(i) for i in range(16)] == [i * 0x101 for i in range(16)]
+	assert cosmac.P == 3
+	assert cosmac.pin('R.out5') == 0x505
+
+
+def test_port_ranges():
+	clock, registers = _file(2, 8, read_ports=1, write_ports=1)
+	registers.set_pin('waddr0', 2)
+	registers.set_pin('wdata0', 0x1ff)
+	registers.set_pin('wen0', True)
+	with pytest.raises(IndexError):
+		clock.tick()
+	registers.set_pin('waddr0', 1)
+	clock.tick()
+	assert registers.values() == [0, 0xff]
+	registers.set_pin('raddr0', -1)
+	with pytest.raises(IndexError):
+		clock.tick()
@@ -0,0 +1,100 @@
+from itertools import product
+import random
+
+import pytest
+
+from pycircuitsim.core.errors import CombinationalLoopError
+from pycircuitsim.core.netlist import compile_chip
+from pycircuitsim.core.schedule import LevelisedNetlist, LinkedChip
+from pycircuitsim.hardware.adder import FullAdder
+from pycircuitsim.hardware.logic_gates import Not, And, Or, Xor, HalfAdder, MuxNWay
+from pycircuitsim.utils.graph import Graph
+
+
+def _xor_links():
+	# Xor wiring, listed in no particular order
+	return [
+		('or.out', 'out'),
+		('and1.out', 'or.a'),
+		('and2.out', 'or.b'),
+		('not2.out', 'and1.b'),
+		('a', 'and1.a'),
+		('b', 'and2.b'),
+		('not1.out', 'and2.a'),
+		('a', 'not1.a'),
+		('b', 'not2.a'),
+	]
+
+
+def _linked_xor():
+	parts = {'or': Or(), 'and1': And(), 'and2': And(), 'not1': Not(), 'not2': Not()}
+	return LinkedChip(['a', 'b'], ['out'], parts, _xor_links())
+
+
+def test_graph_levels():
+	graph = Graph()
+	graph.add_input_node('a')
+	graph.add_link('a', 'c')
+	graph.add_link('b', 'c')
+	graph.add_link('c', 'd')
+	graph.add_link('a', 'd')
+	assert graph.levels() == [['a', 'b'], ['c'], ['d']]
+	assert graph.rank()['d'] == 2
+	assert graph.topological_order() == ['a', 'b', 'c', 'd']
+	assert graph.predecessors('d') == ['a', 'c']
+	assert graph.find_loop() is None
+
+
+def test_graph_loop():
+	graph = Graph()
+	graph.add_link('a', 'b')
+	graph.add_link('b', 'c')
+	graph.add_link('c', 'b')
+	with pytest.raises(CombinationalLoopError) as error:
+		graph.levels()
+	assert error.value.loop == ['b', 'c', 'b']
+
+
+def test_linked_chip():
+	chip = _linked_xor()
+	assert chip.levels == [['not1', 'not2'], ['and1', 'and2'], ['or']]
+	for a, b in product([False, True], repeat=2):
+		assert chip.evaluate({'a': a, 'b': b}) == {'out': a != b}
+
+
+def test_linked_chip_replaced_part():
+	chip = _linked_xor()
+	assert chip.evaluate({'a': True, 'b': True}) == {'out': False}
+	chip.add_part('or', And())  # xor becomes a constant False
+	for a, b in product([False, True], repeat=2):
+		assert chip.evaluate({'a': a, 'b': b}) == {'out': False}
+	chip.add_part('or', Or())
+	assert chip.evaluate({'a': True, 'b': False}) == {'out': True}
+
+
+def test_linked_chip_loop():
+	links = [('a', 'and1.a'), ('and2.out', 'and1.b'), ('and1.out', 'and2.a'), ('and2.out', 'out')]
+	with pytest.raises(CombinationalLoopError):
+		LinkedChip(['a'], ['out'], {'and1': And(), 'and2': And()}, links)
+
+
+def test_linked_chip_netlist():
+	netlist = compile_chip(_linked_xor())
+	for a, b in product([False, True], repeat=2):
+		assert netlist.evaluate({'a': a, 'b': b}) == {'out': a != b}
+
+
+def test_levelised_netlist():
+	assert len(LevelisedNetlist(Xor()).levels) == 7
+	for chip in [Xor(), HalfAdder()]:
+		levelised = LevelisedNetlist(chip)
+		for a, b in product([False, True], repeat=2):
+			assert levelised.evaluate({'a': a, 'b': b}) == chip.evaluate({'a': a, 'b': b})
+	rnd = random.Random(5)
+	adder = FullAdder(16)
+	levelised = LevelisedNetlist(adder)
+	for i in range(20):
+		values = {'in0': rnd.getrandbits(16), 'in1': rnd.getrandbits(16)}
+		assert levelised.evaluate(values) == adder.evaluate(values)
+	mux = MuxNWay(1)
+	assert LevelisedNetlist(mux).evaluate({'in0': 1, 'in1': 2, 'sel0': True}) == {'out': 2}
@@ -0,0 +1,161 @@
+import pytest
+
+from pycircuitsim.arch.cdp1802cosmac import CDP1802
+from pycircuitsim.core.errors import ChipError
+from pycircuitsim.core.snapshot import Snapshot, snapshot, restore, PAGE_SIZE
+from pycircuitsim.hardware.clock import Clock
+from pycircuitsim.hardware.memory import Register, RAM
+
+
+# sum 10 + 9 + ... + 1 into M(0x50)
+SUM_PROGRAM = [
+	0xF8, 0x50, 0xA3, 0xF8, 0x0A, 0xA4, 0xF8, 0x00, 0x53,
+	0xE3, 0x84, 0xF4, 0x53, 0x24, 0x84, 0x3A, 0x09, 0xC4, 0x00,
+]
+
+
+def _booted(memory_size=1024):
+	cpu = CDP1802([], [], memory_size)
+	clock = Clock()
+	cpu.connect_to_clock(clock)
+	cpu.boot()
+	clock.tick()
+	cpu.parts['mem'].data[:len(SUM_PROGRAM)] = SUM_PROGRAM
+	return cpu, clock
+
+
+def _run(cpu, clock):
+	while not cpu.idle:
+		cpu.step()
+	clock.tick()
+	return cpu.export_state()
+
+
+def test_register_round_trip():
+	clock = Clock()
+	register = Register(8)
+	clock.subscribe_to_tick(register)
+	register.set_value(42)
+	clock.tick()
+	saved = snapshot(register, clock)
+	register.set_value(7)
+	clock.tick()
+	assert register.get_value() == 7
+	restore(register, saved, clock)
+	assert register.get_value() == 42
+	assert register.last_out == 42
+	assert register.parts['dff'].data == 42
+	assert clock.value == 1
+
+
+def test_fork_from_booted_state():
+	cpu, clock = _booted()
+	booted = snapshot(cpu, clock)
+	reference = _run(cpu, clock)
+	for i in range(3):
+		restore(cpu, booted, clock)
+		assert cpu.parts['mem'].data[0x50] == 0
+		assert _run(cpu, clock) == reference
+
+
+def test_restore_into_new_chip():
+	cpu, clock = _booted()
+	_run(cpu, clock)
+	data = snapshot(cpu, clock).to_bytes()
+	other, other_clock = CDP1802([], [], 1024), Clock()
+	restore(other, Snapshot.from_bytes(data), other_clock)
+	assert other.export_state() == cpu.export_state()
+	assert other_clock.value == clock.value
+
+
+def test_compact_encoding():
+	ram = RAM(64 * PAGE_SIZE)
+	saved = snapshot(ram)
+	assert len(saved.to_bytes()) < 200
+	ram.data[3 * PAGE_SIZE] = 9
+	changed = snapshot(ram, base=saved)
+	pages = changed.state[0]['data'].pages
+	assert pages[0] is saved.state[0]['data'].pages[0]
+	assert pages[3] is not saved.state[0]['data'].pages[3]
+	delta = changed.to_bytes(base=saved)
+	assert len(delta) <= len(changed.to_bytes())
+	decoded = Snapshot.from_bytes(delta, base=saved)
+	ram.data[3 * PAGE_SIZE] = 0
+	restore(ram, decoded)
+	assert ram.data[3 * PAGE_SIZE] == 9
+	with pytest.raises(ChipError):
+		Snapshot.from_bytes(delta)
+
+
+def test_delta_encoding():
+	ram = RAM(16 * PAGE_SIZE)
+	ram.load_image(range(16 * PAGE_SIZE))
+	saved = snapshot(ram)
+	ram.data[5] = 0
+	full = snapshot(ram).to_bytes()
+	delta = snapshot(ram, base=saved).to_bytes(base=saved)
+	assert len(delta) * 10 < len(full)
+	restore(ram, saved)
+	restore(ram, Snapshot.from_bytes(delta, base=saved))
+	assert list(ram.data[:7]) == [0, 1, 2, 3, 4, 0, 6]
+
+
+def test_values_round_trip():
+	register = Register(8)
+	register.last_out = -12345678901234567890
+	register.set_pin('in', 'text')
+	register.set_pin('load', 1.5)
+	data = snapshot(register).to_bytes()
+	other = Register(8)
+	restore(other, Snapshot.from_bytes(data))
+	assert other.last_out == -12345678901234567890
+	assert other.pin('in') == 'text'
+	assert other.pin('load') == 1.5
+
+
+def test_structure_mismatch():
+	saved = snapshot(Register(8))
+	with pytest.raises(ChipError):
+		restore(RAM(4), saved)
+	with pytest.raises(ChipError):
+		restore(RAM(8), snapshot(RAM(4)))
+	with pytest.raises(ChipError):
+		Snapshot.from_bytes(b'nothing')
+
+
+def test_page_value_types():
+	cpu = CDP1802([], [], 1024)
+	saved = snapshot(cpu)
+	cpu.EF[:] = [0, 0, 0, 0]
+	changed = snapshot(cpu, base=saved)
+	restore(cpu, Snapshot.from_bytes(saved.to_bytes()))
+	assert all(flag is False for flag in cpu.EF)
+	restore(cpu, Snapshot.from_bytes(changed.to_bytes(base=saved), base=saved))
+	assert all(type(flag) is int for flag in cpu.EF)
+	restore(cpu, saved)
+	assert all(flag is False for flag in cpu.EF)
+
+
+def test_mutable_state_is_copied():
+	register = Register(8)
+	register.last_out = {'value': 1}
+	saved = snapshot(register)
+	register.last_out['value'] = 2
+	restore(register, saved)
+	assert register.last_out == {'value': 1}
+	register.last_out['value'] = 3
+	restore(register, saved)
+	assert register.last_out == {'value': 1}
+
+
+def test_restore_wakes_the_clock():
+	clock = Clock()
+	register = Register(8)
+	clock.subscribe_to_tick(register)
+	register.set_value(5)
+	saved = snapshot(register, clock)  # load set, out not loaded yet
+	clock.tick()
+	restore(register, saved, clock)
+	assert register.get_value() is False
+	clock.tick()  # same inputs as the last tick, but the register must load
+	assert register.get_value() == 5
@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from pycircuitsim.core import batch
+from pycircuitsim.hardware.adder import FullAdder
+from pycircuitsim.hardware.logic_gates import Xor
+from pycircuitsim.stream import stream, chunks, read_csv, write_csv, read_npy, write_npy
+
+
+def _vectors(n, seed=7):
+	rnd = random.Random(seed)
+	for i in range(n):
+		yield {'in0': rnd.getrandbits(8), 'in1': rnd.getrandbits(8)}
+
+
+def test_chunks():
+	assert list(chunks(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+	with pytest.raises(ValueError):
+		list(chunks(range(3), 0))
+
+
+@pytest.mark.parametrize('chunk_size', [None, 1, 16])
+def test_stream_outputs(chunk_size):
+	vectors = list(_vectors(50))
+	results = list(stream(FullAdder(8), iter(vectors), chunk_size=chunk_size))
+	assert results == [{'out0': (v['in0'] + v['in1']) & 0xff} for v in vectors]
+
+
+def test_stream_is_lazy():
+	pulled = []
+
+	def inputs():
+		for v in _vectors(100):
+			pulled.append(v)
+			yield v
+
+	results = stream(FullAdder(8), inputs(), chunk_size=10)
+	assert pulled == []
+	next(results)
+	assert len(pulled) == 10
+
+
+def test_stream_include_inputs():
+	results = list(stream(Xor(), [{'a': 1, 'b': 0}, {'a': 1, 'b': 1}], include_inputs=True))
+	assert results == [{'a': 1, 'b': 0, 'out': True}, {'a': 1, 'b': 1, 'out': False}]
+
+
+def test_csv_round_trip(tmp_path):
+	vectors = tmp_path / 'vectors.csv'
+	assert write_csv(vectors, _vectors(40)) == 40
+	results = tmp_path / 'results.csv'
+	assert write_csv(results, stream(FullAdder(8), read_csv(vectors), chunk_size=8, include_inputs=True)) == 40
+	for row in read_csv(results):
+		assert row['out0'] == (row['in0'] + row['in1']) & 0xff
+
+
+def test_read_csv_values(tmp_path):
+	path = tmp_path / 'values.csv'
+	path.write_text("a,b,c,d\nTrue,0x10,7,x\n")
+	assert list(read_csv(path)) == [{'a': True, 'b': 16, 'c': 7, 'd': 'x'}]
+	assert list(read_csv(path, ['c'])) == [{'c': 7}]
+
+
+def test_npy_round_trip(tmp_path):
+	numpy = pytest.importorskip('numpy')
+	path = tmp_path / 'results.npy'
+	count = write_npy(path, stream(FullAdder(8), _vectors(100), include_inputs=True), chunk_size=32)
+	assert count == 100
+	data = numpy.load(path)
+	assert data.shape == (100,)
+	assert list(data.dtype.names) == ['in0', 'in1', 'out0']
+	assert all(row['out0'] == (row['in0'] + row['in1']) & 0xff for row in read_npy(path))
+
+
+def test_npy_bools_and_empty(tmp_path):
+	numpy = pytest.importorskip('numpy')
+	path = tmp_path / 'xor.npy'
+	write_npy(path, stream(Xor(), [{'a': 0, 'b': 1}, {'a': 1, 'b': 1}]))
+	assert numpy.load(path)['out'].tolist() == [True, False]
+	empty = tmp_path / 'empty.npy'
+	assert write_npy(empty, [], fields=['out']) == 0
+	assert numpy.load(empty).shape == (0,)
+
+
+def test_chunks_need_the_same_pins():
+	inputs = [{'a': 1, 'b': 0}, {'a': 1, 'b': 1}, {'a': 0}]
+	results = stream(Xor(), inputs, chunk_size=2)
+	assert next(results) == {'out': True}
+	with pytest.raises(ValueError, match="input 2"):
+		list(results)
+	assert [r['out'] for r in stream(Xor(), inputs)] == [True, False, True]
+
+
+def test_npy_without_numpy(tmp_path, monkeypatch):
+	monkeypatch.setattr(batch, 'numpy', None)
+	with pytest.raises(ImportError, match="NumPy"):
+		write_npy(tmp_path / 'out.npy', [{'out': 1}])
+	with pytest.raises(ImportError, match="NumPy"):
+		next(read_npy(tmp_path / 'out.npy'))
+
+
+def test_stream_from_npy(tmp_path):
+	pytest.importorskip('numpy')
+	path = tmp_path / 'vectors.npy'
+	assert write_npy(path, _vectors(50)) == 50
+	results = list(stream(FullAdder(8), read_npy(path), chunk_size=16, include_inputs=True))
+	assert len(results) == 50
+	assert all(r['out0'] == (r['in0'] + r['in1']) & 0xff for r in results)
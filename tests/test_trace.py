@@ -0,0 +1,118 @@
+import io
+
+import pytest
+
+from pycircuitsim.arch.cdp1802cosmac import CDP1802
+from pycircuitsim.core.errors import ChipError
+from pycircuitsim.core.trace import Tracer
+from pycircuitsim.hardware.clock import Clock
+from pycircuitsim.hardware.memory import Register, DataFlipFlop
+
+
+def _register():
+	clock = Clock()
+	register = Register(8)
+	clock.subscribe_to_tick(register)
+	return clock, register
+
+
+def test_wildcard_selection():
+	clock, register = _register()
+	tracer = Tracer(register, ['out', 'dff.*'])
+	assert tracer.paths == ['out', 'dff.in', 'dff.out']
+	with pytest.raises(ChipError):
+		Tracer(register, 'nothing*')
+
+
+def test_records_changes_only():
+	clock, register = _register()
+	tracer = Tracer(register, 'out').attach(clock)
+	register.set_pin('load', True)
+	for value in [3, 3, 5, 5, 5, 7]:
+		register.set_pin('in', value)
+		clock.tick()
+	assert list(tracer.changes()) == [(0, 'out', False), (2, 'out', 3), (6, 'out', 5), (12, 'out', 7)]
+
+
+def test_detached_clock_does_not_sample():
+	clock, register = _register()
+	tracer = Tracer(register, 'out').attach(clock)
+	tracer.detach()
+	assert clock.tracer is None
+	register.set_pin('load', True)
+	register.set_pin('in', 9)
+	clock.tick()
+	assert len(tracer) == 1
+
+
+def test_ring_buffer_overwrites_oldest():
+	clock = Clock()
+	dff = DataFlipFlop()
+	clock.subscribe_to_tick(dff)
+	tracer = Tracer(dff, 'out', capacity=4).attach(clock)
+	for i in range(10):
+		dff.set_pin('in', i % 2 == 0)
+		clock.tick()
+	assert len(tracer) == 4
+	assert tracer.dropped == 7
+	assert [time for time, path, value in tracer.changes()] == [14, 16, 18, 20]
+
+
+def test_vcd_output():
+	clock, register = _register()
+	tracer = Tracer(register, ['load', 'out', 'dff.out'], widths={'*out': 8}, capacity=2)
+	vcd = io.StringIO()
+	tracer.open(vcd).attach(clock)
+	register.set_pin('load', True)
+	for value in [1, 2]:
+		register.set_pin('in', value)
+		clock.tick()
+		clock.tok()
+	tracer.close()
+	text = vcd.getvalue()
+	header, body = text.split("$enddefinitions $end\n")
+	assert "$var wire 1 ! load $end" in header
+	assert "$var wire 8 \" out $end" in header
+	assert "$scope module dff $end\n$var wire 8 # out $end\n$upscope $end" in header
+	assert body.split('\n') == [
+		'#0', '0!', 'b0 "', 'b0 #',
+		'#2', '1!', 'b1 "', 'b1 #',
+		'#4', 'b10 "', 'b10 #', '',
+	]
+
+
+def test_vcd_truncates_to_declared_width():
+	clock, register = _register()
+	tracer = Tracer(register, ['load', 'out'], widths={'out': 4})
+	vcd = io.StringIO()
+	tracer.open(vcd).attach(clock)
+	tracer.flush()  # declares out on 4 bits
+	register.set_pin('load', True)
+	register.set_pin('in', 0x5a)
+	clock.tick()
+	tracer.close()
+	header, body = vcd.getvalue().split("$enddefinitions $end\n")
+	assert "$var wire 4 \" out $end" in header
+	assert body.split('\n') == ['#0', '0!', 'b0 "', '#2', '1!', 'b1010 "', '']
+
+
+def test_flush_without_file():
+	clock, register = _register()
+	with pytest.raises(ChipError):
+		Tracer(register).flush()
+
+
+def test_cdp1802_trace(tmp_path):
+	cosmac = CDP1802([], [])
+	clock = Clock()
+	cosmac.connect_to_clock(clock)
+	tracer = Tracer(cosmac, ['S.out*', 'R.out*']).attach(clock)
+	path = tmp_path / 'cpu.vcd'
+	tracer.open(path)
+	cosmac.boot()
+	for i in range(10):
+		clock.tick()
+	tracer.close()
+	text = path.read_text()
+	assert "$scope module R $end" in text
+	assert text.count('#') >= 2